@@ -0,0 +1,220 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Optional
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import MovingWindowRateLimiter
+
+# Admission control for note generation. Jobs are weighed in cost units (one
+# LLM call ≈ 1; a short video costs 1, a 3-hour lecture about 20), and each
+# user gets a rolling cost budget, per-tier job limits and a cap on the cost of
+# their jobs in flight. Counters live in the rate-limit storage, so with
+# RATE_LIMIT_STORAGE_URI=redis://... they apply across all workers. Within a
+# worker, admitted jobs share ADMISSION_CAPACITY through weighted fair queuing.
+ADMISSION_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+# Cost units per user per window
+ADMISSION_BUDGET = os.getenv("ADMISSION_BUDGET", "60/hour")
+# Jobs per user per tier, e.g. "long=4/hour,medium=15/hour"; unlisted tiers are unlimited
+ADMISSION_TIER_LIMITS = os.getenv("ADMISSION_TIER_LIMITS", "long=4/hour")
+# Cost of one user's queued and running jobs at once
+ADMISSION_USER_CONCURRENCY = int(os.getenv("ADMISSION_USER_CONCURRENCY", "24"))
+# Cost of jobs running at once in this worker
+ADMISSION_CAPACITY = int(os.getenv("ADMISSION_CAPACITY", "30"))
+# Seconds /api/generate waits for the metadata probe before pricing the job at DEFAULT_JOB_COST
+ADMISSION_PROBE_TIMEOUT = float(os.getenv("ADMISSION_PROBE_TIMEOUT", "5"))
+
+# Cost when the video's length is unknown (metadata probe failed)
+DEFAULT_JOB_COST = 4
+# Gemini watching the video directly (no captions)
+DIRECT_JOB_COST = 3
+# In-flight holds expire after this long if a worker dies without releasing them
+HOLD_TTL = 3 * 3600
+# Retry-After when only the in-flight cap is exceeded
+CONCURRENCY_RETRY_AFTER = 30
+
+
+class AdmissionDenied(Exception):
+    """The user is over a quota; retry_after is in seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, int(retry_after))
+
+
+def job_cost(plan: Optional[dict], direct: bool = False) -> int:
+    """Cost units of a job from its estimated plan ({"tier", "chunks"})."""
+    if direct:
+        return DIRECT_JOB_COST
+    if not plan:
+        return DEFAULT_JOB_COST
+    if plan["tier"] == "short":
+        return 1
+    # One call per chunk plus the merge
+    return plan["chunks"] + 1
+
+
+def _parse_tier_limits(spec: str) -> dict:
+    """Parse "long=4/hour,medium=15/hour" into {tier: RateLimitItem}."""
+    tier_limits = {}
+    for part in spec.split(","):
+        tier, _, limit = part.partition("=")
+        if tier.strip() and limit.strip():
+            try:
+                tier_limits[tier.strip()] = parse(limit.strip())
+            except ValueError:
+                print(f"⚠️ Ignoring invalid ADMISSION_TIER_LIMITS entry: {part!r}")
+    return tier_limits
+
+
+@lru_cache(maxsize=1)
+def _limiter() -> tuple:
+    storage = storage_from_string(ADMISSION_STORAGE_URI)
+    return storage, MovingWindowRateLimiter(storage)
+
+
+_budget = parse(ADMISSION_BUDGET)
+_tier_limits = _parse_tier_limits(ADMISSION_TIER_LIMITS)
+
+
+def _hold_key(user: str) -> str:
+    return f"admission/inflight/{user}"
+
+
+def _retry_after(limiter, item, *identifiers) -> int:
+    stats = limiter.get_window_stats(item, *identifiers)
+    return stats.reset_time - time.time()
+
+
+def check_budget(user: str):
+    """Raise AdmissionDenied if the user's budget can't fit even the cheapest job.
+
+    A read-only check that lets over-budget requests be refused before the
+    metadata probe. Storage errors fail open.
+    """
+    try:
+        _, limiter = _limiter()
+        if not limiter.test(_budget, "budget", user):
+            raise AdmissionDenied("Generation budget used up, try again later",
+                                  _retry_after(limiter, _budget, "budget", user))
+    except AdmissionDenied:
+        raise
+    except Exception as e:
+        print(f"⚠️ Budget check failed, continuing: {e}")
+
+
+def admit(user: str, cost: int, tier: Optional[str] = None):
+    """Charge a job to the user's quotas, or raise AdmissionDenied.
+
+    On success the job's cost is held against the user's in-flight cap until
+    release() is called. Storage errors fail open.
+    """
+    try:
+        storage, limiter = _limiter()
+        tier_item = _tier_limits.get(tier)
+        if tier_item is not None and not limiter.test(tier_item, "tier", tier, user):
+            raise AdmissionDenied(f"Too many {tier} videos, try again later",
+                                  _retry_after(limiter, tier_item, "tier", tier, user))
+        if not limiter.test(_budget, "budget", user, cost=cost):
+            raise AdmissionDenied("Generation budget used up, try again later",
+                                  _retry_after(limiter, _budget, "budget", user))
+
+        held = storage.incr(_hold_key(user), HOLD_TTL, amount=cost)
+        # A single job larger than the cap is still allowed when nothing else runs
+        if held > ADMISSION_USER_CONCURRENCY and held != cost:
+            storage.incr(_hold_key(user), HOLD_TTL, amount=-cost)
+            raise AdmissionDenied("Too many videos in progress, wait for one to finish",
+                                  CONCURRENCY_RETRY_AFTER)
+
+        limiter.hit(_budget, "budget", user, cost=cost)
+        if tier_item is not None:
+            limiter.hit(tier_item, "tier", tier, user)
+    except AdmissionDenied:
+        raise
+    except Exception as e:
+        print(f"⚠️ Admission check failed, admitting: {e}")
+
+
+def release(user: str, cost: int):
+    """Return a finished job's cost to the user's in-flight cap."""
+    try:
+        storage, _ = _limiter()
+        if storage.incr(_hold_key(user), HOLD_TTL, amount=-cost) < 0:
+            # The hold expired while the job ran
+            storage.clear(_hold_key(user))
+    except Exception as e:
+        print(f"⚠️ Admission release failed: {e}")
+
+
+class FairScheduler:
+    """Weighted fair queuing of jobs across users within one worker.
+
+    Each job gets a virtual finish tag: the later of the scheduler's virtual
+    time and the user's previous finish tag, plus cost / weight. Jobs start in
+    tag order while their cost fits in the free capacity, so a user who queues
+    many long videos only delays their own later jobs.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_use = 0
+        self.virtual_time = 0.0
+        self.finish_tags = {}
+        self.queue = []
+        self._seq = itertools.count()
+
+    def busy(self, cost: int) -> bool:
+        """True if a job of this cost would have to wait."""
+        return bool(self.queue) or self.in_use + min(cost, self.capacity) > self.capacity
+
+    @asynccontextmanager
+    async def slot(self, user: str, cost: int, weight: float = 1.0):
+        cost = min(cost, self.capacity)
+        start = max(self.virtual_time, self.finish_tags.get(user, 0.0))
+        finish = start + cost / weight
+        self.finish_tags[user] = finish
+        granted = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.queue, (finish, next(self._seq), start, cost, granted))
+        self._dispatch()
+        try:
+            await granted
+        except asyncio.CancelledError:
+            if granted.done() and not granted.cancelled():
+                self._release(cost)
+            else:
+                granted.cancel()
+                self._dispatch()
+            raise
+        try:
+            yield
+        finally:
+            self._release(cost)
+
+    def _release(self, cost: int):
+        self.in_use -= cost
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.queue:
+            _, _, start, cost, granted = self.queue[0]
+            if granted.done():
+                heapq.heappop(self.queue)
+                continue
+            if self.in_use + cost > self.capacity:
+                break
+            heapq.heappop(self.queue)
+            self.in_use += cost
+            self.virtual_time = max(self.virtual_time, start)
+            granted.set_result(None)
+        if not self.queue and self.in_use == 0:
+            # Idle: nobody's backlog is left to account for
+            self.finish_tags.clear()
+
+
+scheduler = FairScheduler(ADMISSION_CAPACITY)
@@ -0,0 +1,170 @@
+import gzip
+import hashlib
+import os
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json
+    orjson = None
+
+# Response helpers for the heavy JSON endpoints (history, task polling):
+# one-pass serialization, negotiated compression of large API bodies and ETag
+# revalidation, so an unchanged poll costs a 304 with no body.
+
+# Bodies smaller than this are sent as-is (compression wouldn't pay for itself)
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = 6
+# Brotli's fast levels compress JSON/markdown better than gzip -6 at similar speed
+BROTLI_QUALITY = 5
+
+_COMPRESSIBLE_TYPES = (b"application/json", b"text/")
+
+
+def _parse_accept_encoding(header: str) -> dict:
+    """{coding: q} from an Accept-Encoding header ("br;q=1.0, gzip;q=0.5, *;q=0")."""
+    qualities = {}
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[coding] = q
+    return qualities
+
+
+def negotiate_encoding(header: str, available) -> str:
+    """The coding in `available` (in server preference order) the client ranks highest.
+
+    Codings the client refuses (q=0), explicitly or through "*;q=0", are never
+    chosen; "" means send the body uncompressed.
+    """
+    qualities = _parse_accept_encoding(header)
+    wildcard = qualities.get("*", 0.0)
+    best, best_q = "", 0.0
+    for encoding in available:
+        q = qualities.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def _accepted_encoding(scope) -> str:
+    for name, value in scope["headers"]:
+        if name == b"accept-encoding":
+            return negotiate_encoding(value.decode("latin-1"), ("br", "gzip") if brotli is not None else ("gzip",))
+    return ""
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """Brotli/gzip for JSON and text responses above COMPRESSION_MIN_BYTES.
+
+    Only complete (non-streaming) bodies are compressed; responses that
+    already carry a Content-Encoding (precompressed assets) and partial
+    content (206 / Content-Range) pass through.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _accepted_encoding(scope)
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                content_type = headers.get(b"content-type", b"")
+                partial = message["status"] == 206 or b"content-range" in headers
+                if b"content-encoding" in headers or partial or not content_type.startswith(_COMPRESSIBLE_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            if passthrough or start is None:
+                await send(message)
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body") or len(body) < self.minimum_size:
+                # Streaming or small: send unchanged
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            compressed = _compress(body, encoding)
+            vary = [v for k, v in start.get("headers", []) if k == b"vary"]
+            headers = [(k, v) for k, v in start.get("headers", []) if k not in (b"content-length", b"vary")]
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", b", ".join(vary + [b"Accept-Encoding"])),
+            ]
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON without jsonable_encoder: pydantic models are serialized by
+    pydantic-core (None fields omitted), everything else by orjson (stdlib
+    json if not installed)."""
+
+    def render(self, content) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content, exclude_none=True)
+        if orjson is not None:
+            return orjson.dumps(content)
+        return super().render(content)
+
+
+def etag_json_response(request: Request, content) -> Response:
+    """JSON response with a weak ETag over its body; 304 when the client already has it.
+
+    Weak because the bytes on the wire differ per Content-Encoding.
+    """
+    response = FastJSONResponse(content)
+    etag = 'W/"' + hashlib.sha256(response.body).hexdigest()[:20] + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return response
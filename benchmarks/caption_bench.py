@@ -0,0 +1,153 @@
+"""Caption decoding micro-benchmark over the synthetic fixtures in caption_fixtures/.
+
+Each fixture is a short hand-written track in one of YouTube's formats
+(rolling auto-generated VTT, manual srv1 XML, auto-generated JSON3), not a
+recording of a real video. It is repeated until the track covers --hours of
+video, then decoded with captions.parse_caption_stream and, for comparison,
+with the old inline parsers that get_transcript used before.
+
+The decoder is slower than the legacy parsers (about 1.2-2x on VTT and JSON3,
+2-3x on timedtext XML) because it does work they skipped: HTML entity
+decoding (the legacy XML output keeps "&#x27;" escapes), whitespace cleanup
+and rolling-caption de-duplication, which together cost about as much as the
+XML parse itself. What it buys is bounded memory and cleaner text.
+
+Usage (from the repo root):
+    python benchmarks/caption_bench.py
+    python benchmarks/caption_bench.py --hours 6 --runs 5 --memory
+
+Reports per format: body size, output size, best-of-N time, throughput and
+(with --memory) traced peak allocation.
+"""
+import argparse
+import json
+import re
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from captions import parse_caption_stream  # noqa: E402
+
+FIXTURES = ROOT / "benchmarks" / "caption_fixtures"
+CHUNK_BYTES = 65536
+
+
+def _scale_vtt(text: str, times: int) -> str:
+    header, _, body = text.partition("\n\n")
+    return header + "\n\n" + "\n\n".join([body.strip("\n")] * times) + "\n"
+
+
+def _scale_xml(text: str, times: int) -> str:
+    head, _, rest = text.partition("<transcript>")
+    body, _, _ = rest.partition("</transcript>")
+    return f"{head}<transcript>{body * times}</transcript>"
+
+
+def _scale_json3(text: str, times: int) -> str:
+    doc = json.loads(text)
+    doc["events"] = doc["events"] * times
+    return json.dumps(doc, separators=(",", ":"))
+
+
+# fixture file, format, scaler, seconds of video covered by one copy
+FIXTURE_SPECS = [
+    ("auto_rolling.en.vtt", "vtt", _scale_vtt, 37.65),
+    ("manual.en.srv1.xml", "xml", _scale_xml, 37.5),
+    ("auto.en.json3", "json3", _scale_json3, 37.5),
+]
+
+
+# ═══════ Previous inline parsers (baseline) ═══════
+
+def legacy_xml(body: bytes) -> str:
+    root = ET.fromstring(body.decode())
+    return " ".join(e.text.strip() for e in root.iter("text") if e.text)
+
+
+def legacy_json3(body: bytes) -> str:
+    texts = []
+    for event in json.loads(body.decode()).get("events", []):
+        for seg in event.get("segs", []):
+            t = seg.get("utf8", "").strip()
+            if t and t != "\n":
+                texts.append(t)
+    return " ".join(texts)
+
+
+def legacy_vtt(body: bytes) -> str:
+    text_lines = []
+    for line in body.decode().split("\n"):
+        line = line.strip()
+        if not line or "-->" in line or line.startswith(("WEBVTT", "Kind:", "Language:")) or line.isdigit():
+            continue
+        clean = re.sub(r"<[^>]+>", "", line)
+        if clean.strip():
+            text_lines.append(clean.strip())
+    return " ".join(text_lines)
+
+
+LEGACY = {"vtt": legacy_vtt, "xml": legacy_xml, "json3": legacy_json3}
+
+
+def _chunks(body: bytes):
+    for i in range(0, len(body), CHUNK_BYTES):
+        yield body[i:i + CHUNK_BYTES]
+
+
+def measure(fn, runs: int, memory: bool) -> dict:
+    """Best-of-N wall time, plus one traced run for peak memory if requested."""
+    best = float("inf")
+    output = ""
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = fn()
+        best = min(best, time.perf_counter() - start)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"seconds": best, "peak": peak, "chars": len(output)}
+
+
+def run(args) -> list:
+    rows = []
+    for filename, fmt, scale, seconds_per_copy in FIXTURE_SPECS:
+        copies = max(1, int(args.hours * 3600 / seconds_per_copy))
+        body = scale((FIXTURES / filename).read_text(encoding="utf-8"), copies).encode()
+        for name, fn in (
+            ("legacy", lambda: LEGACY[fmt](body)),
+            ("decoder", lambda: parse_caption_stream(_chunks(body), fmt)),
+        ):
+            result = measure(fn, args.runs, args.memory)
+            rows.append({"format": fmt, "parser": name, "body_bytes": len(body), **result})
+    return rows
+
+
+def print_report(rows: list):
+    header = f"{'format':<8}{'parser':<9}{'body MB':>9}{'out chars':>11}{'best ms':>10}{'MB/s':>8}{'peak MB':>9}"
+    print(header)
+    print("─" * len(header))
+    for r in rows:
+        mb = r["body_bytes"] / 1e6
+        peak = f"{r['peak'] / 1e6:.1f}" if r["peak"] is not None else "-"
+        print(f"{r['format']:<8}{r['parser']:<9}{mb:>9.2f}{r['chars']:>11}{r['seconds'] * 1000:>10.1f}"
+              f"{mb / r['seconds']:>8.1f}{peak:>9}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--hours", type=float, default=3.0, help="video length each track is scaled to")
+    parser.add_argument("--runs", type=int, default=3, help="timed runs per parser (best is reported)")
+    parser.add_argument("--memory", action="store_true", help="also trace peak memory (one extra run)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    print_report(run(parse_args()))
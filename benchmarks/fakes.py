@@ -0,0 +1,195 @@
+"""Offline stand-ins for Gemini, Groq and Firestore used by the benchmarks.
+
+The fake LLM clients mirror the small slice of each SDK that main.py calls
+(`client.aio.models.generate_content` and AsyncGroq's
+`client.chat.completions.create`).
+They sleep for a configurable latency and raise 429 or generic errors at
+configurable rates. A seeded RNG keeps every run reproducible.
+"""
+import asyncio
+import random
+import threading
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+
+@dataclass
+class FakeProviderConfig:
+    latency_ms: float = 800.0      # mean latency per call
+    jitter_ms: float = 200.0       # uniform +/- jitter
+    rate_429: float = 0.0          # probability of a rate-limit error
+    failure_rate: float = 0.0      # probability of a generic error
+    empty_rate: float = 0.0        # probability of an empty completion
+    seed: int = 7
+
+
+class _FakeProvider:
+    """Shared latency / error injection and call accounting."""
+
+    def __init__(self, name: str, config: FakeProviderConfig):
+        self.name = name
+        self.config = config
+        self._rng = random.Random(f"{name}:{config.seed}")
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors_429 = 0
+        self.failures = 0
+        self.prompt_chars = 0
+        self.by_model = {}
+
+    def _start(self, model: str, prompt: str) -> tuple:
+        with self._lock:
+            self.calls += 1
+            self.prompt_chars += len(prompt)
+            self.by_model[model] = self.by_model.get(model, 0) + 1
+            roll = self._rng.random()
+            jitter = self._rng.uniform(-1, 1) * self.config.jitter_ms
+        return roll, max(0.0, self.config.latency_ms + jitter) / 1000
+
+    async def _acall(self, model: str, prompt: str) -> str:
+        roll, delay = self._start(model, prompt)
+        await asyncio.sleep(delay)
+        return self._finish(roll, prompt)
+
+    def _finish(self, roll: float, prompt: str) -> str:
+        if roll < self.config.rate_429:
+            with self._lock:
+                self.errors_429 += 1
+            raise RuntimeError("429 RESOURCE_EXHAUSTED: fake quota exceeded")
+        roll -= self.config.rate_429
+        if roll < self.config.failure_rate:
+            with self._lock:
+                self.failures += 1
+            raise RuntimeError(f"fake {self.name} failure")
+        roll -= self.config.failure_rate
+        if roll < self.config.empty_rate:
+            return ""
+        return _fake_notes(prompt)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors_429": self.errors_429,
+                "failures": self.failures,
+                "prompt_chars": self.prompt_chars,
+                "by_model": dict(self.by_model),
+            }
+
+
+def _fake_notes(prompt: str) -> str:
+    """Deterministic markdown whose size grows (sub-linearly) with the prompt."""
+    points = max(3, min(12, len(prompt) // 2500))
+    lines = ["# 📺 Video Notes", "", "## 📌 Key Points"]
+    for i in range(1, points + 1):
+        lines.append(f"### {i}️⃣ Point {i}")
+        lines.append(f"- 📝 **Explanation:** Synthetic explanation {i} ({len(prompt)} prompt chars).")
+    return "\n".join(lines)
+
+
+class FakeGeminiClient:
+    """Quacks like google.genai.Client for generate_content."""
+
+    def __init__(self, config: FakeProviderConfig):
+        self.provider = _FakeProvider("gemini", config)
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self._generate_content_async))
+
+    async def _generate_content_async(self, model, contents, config=None):
+        return SimpleNamespace(text=await self.provider._acall(model, str(contents)))
+
+
+class FakeGroqClient:
+    """Quacks like groq.AsyncGroq for chat.completions.create."""
+
+    def __init__(self, config: FakeProviderConfig):
+        self.provider = _FakeProvider("groq", config)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, model, messages, max_tokens=None, temperature=None, **kwargs):
+        prompt = "\n".join(m["content"] for m in messages)
+        content = await self.provider._acall(model, prompt)
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+# ═══════ In-memory Firestore ═══════
+
+class _Snapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class _Document:
+    def __init__(self, store, path):
+        self._store = store
+        self._path = path
+
+    @property
+    def id(self):
+        return self._path[-1]
+
+    def collection(self, name):
+        return _Collection(self._store, self._path + (name,))
+
+    def get(self):
+        with self._store.lock:
+            data = self._store.docs.get(self._path)
+            return _Snapshot(self.id, dict(data) if data is not None else None)
+
+    def set(self, data, merge=False):
+        with self._store.lock:
+            self._store.writes += 1
+            if merge and self._path in self._store.docs:
+                self._store.docs[self._path].update(data)
+            else:
+                self._store.docs[self._path] = dict(data)
+
+    def delete(self):
+        with self._store.lock:
+            self._store.docs.pop(self._path, None)
+
+
+class _Collection:
+    def __init__(self, store, path, order=None):
+        self._store = store
+        self._path = path
+        self._order = order
+
+    def document(self, doc_id):
+        return _Document(self._store, self._path + (doc_id,))
+
+    def order_by(self, field, direction="ASCENDING"):
+        return _Collection(self._store, self._path, (field, str(direction).upper().endswith("DESCENDING")))
+
+    def stream(self):
+        with self._store.lock:
+            depth = len(self._path) + 1
+            items = [
+                _Snapshot(path[-1], dict(data))
+                for path, data in self._store.docs.items()
+                if len(path) == depth and path[:-1] == self._path
+            ]
+        if self._order:
+            field, descending = self._order
+            items.sort(key=lambda s: s.to_dict().get(field) or "", reverse=descending)
+        return iter(items)
+
+
+class FakeFirestore:
+    """Just enough of firestore.Client for main.py's helpers."""
+
+    def __init__(self):
+        self.docs = {}
+        self.writes = 0
+        self.lock = threading.Lock()
+
+    def collection(self, name):
+        return _Collection(self, (name,))
@@ -0,0 +1,70 @@
+"""Deterministic transcript fixtures for the SHORT / MEDIUM / LONG tiers.
+
+The text imitates YouTube auto-captions: lecture-style sentences mixed with
+filler words, `[Music]` / `[Applause]` markers and phrases repeated across
+rolling captions. The same seed always yields the same transcript, so
+benchmark runs are comparable across commits.
+"""
+import random
+
+# Target lengths in characters, chosen to land well inside each tier
+# (SHORT_THRESHOLD = 12K, LONG_THRESHOLD = 50K in main.py)
+TIER_LENGTHS = {
+    "short": 8_000,
+    "medium": 35_000,
+    "long": 140_000,
+}
+
+# 11-character ids so they pass extract_video_id
+TIER_VIDEO_IDS = {
+    "short": "benchSHORT0",
+    "medium": "benchMEDIUM",
+    "long": "benchLONG00",
+}
+
+_TOPICS = [
+    "gradient descent", "the cell membrane", "supply and demand", "binary search trees",
+    "photosynthesis", "the French revolution", "neural networks", "compound interest",
+    "plate tectonics", "recursion", "the immune system", "linear regression",
+]
+_TEMPLATES = [
+    "So today we're going to talk about {topic} and why it matters.",
+    "The key idea behind {topic} is that small steps add up over time.",
+    "If you remember one thing about {topic}, remember how it connects to {other}.",
+    "Let's look at an example of {topic} that you might see in the real world.",
+    "A common mistake with {topic} is confusing it with {other}.",
+    "Now notice what happens to {topic} when we change just one variable.",
+    "This is exactly where {topic} becomes useful in practice.",
+    "You can think of {topic} a bit like {other}, but not quite.",
+]
+_FILLERS = ["um", "uh", "you know", "like", "so", "basically", "right", "okay"]
+_MARKERS = ["[Music]", "[Applause]", "[Laughter]"]
+
+
+def make_transcript(tier: str, seed: int = 42) -> str:
+    """Build a caption-style transcript of roughly TIER_LENGTHS[tier] characters."""
+    rng = random.Random(f"{tier}:{seed}")
+    target = TIER_LENGTHS[tier]
+    parts = []
+    size = 0
+    previous = ""
+    while size < target:
+        roll = rng.random()
+        if roll < 0.04:
+            piece = rng.choice(_MARKERS)
+        elif roll < 0.10 and previous:
+            piece = previous  # rolling-caption repeat
+        else:
+            topic, other = rng.sample(_TOPICS, 2)
+            piece = rng.choice(_TEMPLATES).format(topic=topic, other=other)
+            if rng.random() < 0.35:
+                piece = f"{rng.choice(_FILLERS)} {piece[0].lower()}{piece[1:]}"
+            previous = piece
+        parts.append(piece)
+        size += len(piece) + 1
+    return " ".join(parts)[:target]
+
+
+def all_fixtures(seed: int = 42) -> dict:
+    """Return {tier: transcript} for every tier."""
+    return {tier: make_transcript(tier, seed) for tier in TIER_LENGTHS}
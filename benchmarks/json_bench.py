@@ -0,0 +1,128 @@
+"""JSON response serialization benchmark on realistic ~50 KB note bodies.
+
+Builds a completed task payload (one note) and a history payload (--items
+notes) of generated markdown notes (headings, tables, emojis, non-ASCII
+text), then times producing the response body with:
+
+    default   FastAPI's path for a returned dict: jsonable_encoder + JSONResponse (stdlib json)
+    orjson    FastJSONResponse on the plain dict
+    pydantic  FastJSONResponse on the response model: validation + serialization in pydantic-core
+
+Usage (from the repo root):
+    python benchmarks/json_bench.py
+    python benchmarks/json_bench.py --items 50 --runs 20
+
+Reports best-of-N time per payload and path, throughput and body size.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+import main  # noqa: E402
+from api_responses import FastJSONResponse  # noqa: E402
+
+NOTE_BYTES = 50_000
+_WORDS = ("gradient descent learning rate model training loss function neural network layer "
+          "activation über café naïve résumé données modèle apprentissage 学习 模型 数据").split()
+_EMOJIS = "📌🧠⚡🎯🎓📺✅💡"
+
+
+def make_notes(rng: random.Random, size: int = NOTE_BYTES) -> str:
+    """Markdown notes shaped like the model's output."""
+    parts = ["# 📺 Video Notes\n\n## 🎯 Main Topic\n"]
+    length = 0
+    section = 1
+    while length < size:
+        parts.append(f"\n## {rng.choice(_EMOJIS)} Section {section}\n")
+        for n in range(1, 6):
+            sentence = " ".join(rng.choices(_WORDS, k=rng.randint(12, 30)))
+            parts.append(f"{n}. **{sentence.split()[0].title()}** — {sentence}.\n")
+        parts.append("\n| Concept | Meaning |\n|---|---|\n")
+        for _ in range(4):
+            parts.append(f"| {rng.choice(_WORDS)} | {' '.join(rng.choices(_WORDS, k=8))} |\n")
+        section += 1
+        length = sum(len(p.encode()) for p in parts)
+    return "".join(parts)
+
+
+def make_payloads(items: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    history = [
+        {
+            "id": f"{rng.getrandbits(64):016x}",
+            "title": "Video Notes",
+            "video_id": "dQw4w9WgXcQ",
+            "youtube_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+            "language": "English",
+            "notes": make_notes(rng),
+            "transcript_length": rng.randint(5_000, 150_000),
+            "created_at": "2026-01-01T12:00:00",
+        }
+        for _ in range(items)
+    ]
+    task = {
+        "status": "completed",
+        "updated_at": "2026-01-01T12:00:00",
+        "result": {"notes": history[0]["notes"], "video_id": "dQw4w9WgXcQ", "note_id": history[0]["id"],
+                   "title": "Video Notes"},
+        "step_durations": {"fetching_transcript": 1.2, "generating_notes_short_video": 8.4},
+    }
+    return {
+        "task": (task, main.TaskStatusResponse),
+        "history": ({"history": history}, main.HistoryResponse),
+    }
+
+
+def best_of(fn, runs: int) -> tuple:
+    best = float("inf")
+    body = b""
+    for _ in range(runs):
+        start = time.perf_counter()
+        body = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, len(body)
+
+
+def run(args) -> list:
+    rows = []
+    for name, (payload, model) in make_payloads(args.items, args.seed).items():
+        paths = (
+            ("default", lambda: JSONResponse(jsonable_encoder(payload)).body),
+            ("orjson", lambda: FastJSONResponse(payload).body),
+            ("pydantic", lambda: FastJSONResponse(model.model_validate(payload)).body),
+        )
+        for path, fn in paths:
+            seconds, size = best_of(fn, args.runs)
+            rows.append({"payload": name, "path": path, "seconds": seconds, "bytes": size})
+    return rows
+
+
+def print_report(rows: list):
+    header = f"{'payload':<9}{'path':<10}{'body KB':>9}{'best ms':>10}{'MB/s':>9}{'speedup':>9}"
+    print(header)
+    print("─" * len(header))
+    baseline = {}
+    for r in rows:
+        baseline.setdefault(r["payload"], r["seconds"])
+        print(f"{r['payload']:<9}{r['path']:<10}{r['bytes'] / 1000:>9.1f}{r['seconds'] * 1000:>10.2f}"
+              f"{r['bytes'] / 1e6 / r['seconds']:>9.1f}{baseline[r['payload']] / r['seconds']:>8.1f}x")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--items", type=int, default=20, help="notes in the history payload")
+    parser.add_argument("--runs", type=int, default=10, help="timed runs per path (best is reported)")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    print_report(run(parse_args()))
@@ -0,0 +1,212 @@
+"""Offline throughput benchmark for main.process_note_generation.
+
+Runs the real pipeline (tiering, chunking, prompts, fallbacks, merge,
+history/task writes) against deterministic fixtures, fake Gemini/Groq
+clients, an in-memory Firestore (history) and an in-memory state store
+(tasks, leases, checkpoints, chunk cache). No network access and no API quota.
+
+Usage (from the repo root):
+    python benchmarks/pipeline_bench.py
+    python benchmarks/pipeline_bench.py --jobs 20 --concurrency 8 --gemini-429 0.2
+    python benchmarks/pipeline_bench.py --tiers long --model qwen --groq-failure 0.3
+
+Reports per tier: p50/p95 job latency, jobs per minute and upstream calls
+per job. Inter-chunk pacing delays are disabled unless --pacing is given.
+Every job starts with a cold chunk cache unless --warm-cache is given.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+os.environ.setdefault("PREWARM_ON_STARTUP", "0")
+
+import main  # noqa: E402
+import state_store  # noqa: E402
+from fakes import FakeFirestore, FakeGeminiClient, FakeGroqClient, FakeProviderConfig  # noqa: E402
+from fixtures import TIER_VIDEO_IDS, all_fixtures  # noqa: E402
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+# Collections that let one job reuse another's LLM output
+CACHE_COLLECTIONS = ("chunk_cache", "direct_notes", "video_descriptions")
+
+
+class CountingMemoryStore(state_store.MemoryStore):
+    """MemoryStore that counts writes, so task/checkpoint traffic shows up in the report.
+
+    Unless `keep_caches` is set, writes to the cross-job caches are counted but
+    not stored, so every job runs the full pipeline (all jobs in a tier share
+    one video and would otherwise hit each other's chunk notes).
+    """
+
+    def __init__(self, keep_caches: bool = False):
+        super().__init__()
+        self.writes = 0
+        self.keep_caches = keep_caches
+
+    def set(self, collection, doc_id, data, merge=False):
+        self.writes += 1
+        if collection in CACHE_COLLECTIONS and not self.keep_caches:
+            return
+        super().set(collection, doc_id, data, merge=merge)
+
+    def update_if(self, collection, doc_id, update_fn):
+        updates = super().update_if(collection, doc_id, update_fn)
+        if updates is not None:
+            self.writes += 1
+        return updates
+
+
+def install_fakes(args) -> dict:
+    """Point main.py at fakes; returns the objects for later accounting."""
+    fixtures = all_fixtures(args.seed)
+    transcripts = {TIER_VIDEO_IDS[tier]: text for tier, text in fixtures.items()}
+
+    gemini = FakeGeminiClient(FakeProviderConfig(
+        latency_ms=args.gemini_latency, jitter_ms=args.gemini_latency * 0.25,
+        rate_429=args.gemini_429, failure_rate=args.gemini_failure, seed=args.seed,
+    ))
+    groq = FakeGroqClient(FakeProviderConfig(
+        latency_ms=args.groq_latency, jitter_ms=args.groq_latency * 0.25,
+        rate_429=args.groq_429, failure_rate=args.groq_failure, seed=args.seed,
+    ))
+    db = FakeFirestore()
+
+    main.GEMINI_API_KEY = main.GEMINI_API_KEY or "fake-gemini-key"
+    main.GROQ_API_KEY = main.GROQ_API_KEY or "fake-groq-key"
+    main.get_gemini_client = lambda: gemini
+    main.get_groq_client = lambda: groq
+    main.gemini_generation_config = lambda: None  # fakes ignore it; avoids importing google.genai
+    main.get_db = lambda: db
+    store = CountingMemoryStore(keep_caches=args.warm_cache)
+    state_store.set_store(store)
+
+    def fake_get_transcript(video_id, *args, **kwargs):
+        return transcripts[video_id], "en"
+
+    main.get_transcript = fake_get_transcript
+    # No network: behave as if the metadata probe got no answer
+    main.probe_video = lambda video_id: None
+
+    if not args.pacing:
+        main.MEDIUM_CHUNK_DELAY = 0
+        main.LONG_CHUNK_DELAY = 0
+
+    return {"gemini": gemini, "groq": groq, "db": db, "store": store, "fixtures": fixtures}
+
+
+async def run_tier(tier: str, args, fakes: dict) -> dict:
+    """Run args.jobs jobs for one tier with bounded concurrency."""
+    gemini_before = fakes["gemini"].provider.snapshot()
+    groq_before = fakes["groq"].provider.snapshot()
+    writes_before = fakes["db"].writes + fakes["store"].writes
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    failures = 0
+
+    async def one_job(n: int):
+        nonlocal failures
+        async with semaphore:
+            task_id = f"bench-{tier}-{n}-{uuid.uuid4().hex[:6]}"
+            req = main.GenerateRequest(
+                youtube_url=f"https://www.youtube.com/watch?v={TIER_VIDEO_IDS[tier]}",
+                output_language=args.language,
+                model=args.model,
+            )
+            start = time.perf_counter()
+            fields = main.new_task_fields(
+                {"youtube_url": req.youtube_url, "output_language": req.output_language, "model": req.model},
+                f"bench{n}@example.com", args.role,
+            )
+            main.update_task_status(task_id, "queued", fields=fields)
+            await main.process_note_generation(task_id, req, f"bench{n}@example.com", args.role)
+            latencies.append(time.perf_counter() - start)
+            task = state_store.get_store().get("tasks", task_id) or {}
+            if task.get("status") != "completed":
+                failures += 1
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one_job(n) for n in range(args.jobs)))
+    wall = time.perf_counter() - wall_start
+
+    gemini_after = fakes["gemini"].provider.snapshot()
+    groq_after = fakes["groq"].provider.snapshot()
+    return {
+        "tier": tier,
+        "chars": len(fakes["fixtures"][tier]),
+        "jobs": args.jobs,
+        "failed": failures,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "jobs_per_min": args.jobs / wall * 60 if wall else 0.0,
+        "gemini_calls": (gemini_after["calls"] - gemini_before["calls"]) / args.jobs,
+        "groq_calls": (groq_after["calls"] - groq_before["calls"]) / args.jobs,
+        "errors_429": (gemini_after["errors_429"] - gemini_before["errors_429"])
+                      + (groq_after["errors_429"] - groq_before["errors_429"]),
+        "db_writes": (fakes["db"].writes + fakes["store"].writes - writes_before) / args.jobs,
+    }
+
+
+def print_report(rows: list):
+    header = (f"{'tier':<7}{'chars':>8}{'jobs':>6}{'fail':>6}{'p50 s':>9}{'p95 s':>9}"
+              f"{'jobs/min':>10}{'gemini/job':>12}{'groq/job':>10}{'429s':>6}{'writes/job':>12}")
+    print(header)
+    print("─" * len(header))
+    for r in rows:
+        print(f"{r['tier']:<7}{r['chars']:>8}{r['jobs']:>6}{r['failed']:>6}{r['p50']:>9.2f}{r['p95']:>9.2f}"
+              f"{r['jobs_per_min']:>10.1f}{r['gemini_calls']:>12.1f}{r['groq_calls']:>10.1f}"
+              f"{r['errors_429']:>6}{r['db_writes']:>12.1f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--tiers", default="short,medium,long", help="comma-separated tiers to run")
+    parser.add_argument("--jobs", type=int, default=10, help="jobs per tier")
+    parser.add_argument("--concurrency", type=int, default=5, help="jobs in flight at once")
+    parser.add_argument("--executor-workers", type=int, default=None,
+                        help="size of the default thread pool (None = asyncio default)")
+    parser.add_argument("--model", default="gemini", choices=["gemini", "qwen"])
+    parser.add_argument("--language", default="English")
+    parser.add_argument("--role", default="student")
+    parser.add_argument("--gemini-latency", type=float, default=800.0, help="mean ms per Gemini call")
+    parser.add_argument("--gemini-429", type=float, default=0.0, help="Gemini 429 probability")
+    parser.add_argument("--gemini-failure", type=float, default=0.0, help="Gemini error probability")
+    parser.add_argument("--groq-latency", type=float, default=500.0, help="mean ms per Groq call")
+    parser.add_argument("--groq-429", type=float, default=0.0, help="Groq 429 probability")
+    parser.add_argument("--groq-failure", type=float, default=0.0, help="Groq error probability")
+    parser.add_argument("--pacing", action="store_true", help="keep the real inter-chunk delays")
+    parser.add_argument("--warm-cache", action="store_true",
+                        help="let jobs reuse each other's cached chunk notes (measures cache hits, not the pipeline)")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+async def amain(args):
+    if args.executor_workers:
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(args.executor_workers))
+    fakes = install_fakes(args)
+    rows = []
+    for tier in [t.strip() for t in args.tiers.split(",") if t.strip()]:
+        print(f"⏱️  Running {args.jobs} {tier} jobs...", file=sys.stderr)
+        rows.append(await run_tier(tier, args, fakes))
+    print_report(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(amain(parse_args()))
@@ -0,0 +1,122 @@
+"""Cold-start benchmark: import-time profile of `main` and time to first /api/health.
+
+Usage (from the repo root):
+    python benchmarks/startup_bench.py                 # print summary
+    python benchmarks/startup_bench.py --top 30 --output benchmarks/results/startup.json
+
+The import profile comes from `python -X importtime -c "import main"` and is
+summarised by top-level package. The health check starts a real Uvicorn
+process and polls /api/health until it answers. Record the JSON output for
+each release to track cold-start latency over time.
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile_imports(runs: int = 3) -> dict:
+    """Run `-X importtime` in fresh interpreters; keep the fastest run."""
+    best = None
+    for _ in range(runs):
+        env = dict(os.environ, PREWARM_ON_STARTUP="0")
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=ROOT, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"import main failed:\n{proc.stderr[-2000:]}")
+
+        modules = []
+        for line in proc.stderr.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if match:
+                self_us, cumulative_us, indent, name = match.groups()
+                modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+        total_us = sum(m[1] for m in modules)
+        if best is None or total_us < best["total_us"]:
+            best = {"total_us": total_us, "modules": modules}
+
+    # Attribute self-time to top-level packages (yt_dlp, google, groq, ...)
+    by_package = defaultdict(int)
+    for name, self_us, _, _ in best["modules"]:
+        by_package[name.split(".")[0]] += self_us
+    best["by_package"] = dict(sorted(by_package.items(), key=lambda kv: -kv[1]))
+    return best
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_health(timeout: float = 60.0) -> float:
+    """Seconds from spawning Uvicorn until /api/health returns 200."""
+    port = _free_port()
+    env = dict(os.environ, PREWARM_ON_STARTUP=os.getenv("PREWARM_ON_STARTUP", "1"))
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.02)
+        raise TimeoutError(f"/api/health did not answer within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--runs", type=int, default=3, help="import profiles to take (fastest wins)")
+    parser.add_argument("--top", type=int, default=15, help="modules/packages to list")
+    parser.add_argument("--skip-health", action="store_true", help="only profile imports")
+    parser.add_argument("--output", help="write the summary as JSON to this path")
+    args = parser.parse_args()
+
+    profile = profile_imports(args.runs)
+    print(f"📦 import main: {profile['total_us'] / 1000:.1f} ms total self-time")
+    print("\nBy top-level package:")
+    for package, self_us in list(profile["by_package"].items())[: args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+    print("\nSlowest modules (cumulative):")
+    slowest = sorted(profile["modules"], key=lambda m: -m[2])[: args.top]
+    for name, _, cumulative_us, _ in slowest:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    summary = {
+        "python": sys.version.split()[0],
+        "import_total_ms": round(profile["total_us"] / 1000, 2),
+        "by_package_ms": {k: round(v / 1000, 2) for k, v in profile["by_package"].items()},
+    }
+    if not args.skip_health:
+        health_s = time_to_health()
+        summary["time_to_health_s"] = round(health_s, 3)
+        print(f"\n🩺 Time to first /api/health: {health_s:.2f}s")
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(summary, indent=2))
+        print(f"\n💾 Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
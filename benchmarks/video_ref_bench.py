@@ -0,0 +1,155 @@
+"""Video-reference parsing micro-benchmark: video_ref against the previous extract_video_id.
+
+A reproducible mix of link shapes (canonical watch URLs, youtu.be, shorts,
+embeds, links with playlist/timestamp/tracking params, URL-encoded links,
+invalid input) is parsed one by one with both implementations, and in bulk
+with video_ref.parse_video_refs.
+
+Usage (from the repo root):
+    python benchmarks/video_ref_bench.py
+    python benchmarks/video_ref_bench.py --urls 50000 --runs 5
+
+Reports best-of-N time per implementation, µs per URL and URLs per second.
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlparse
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from video_ref import VideoRefError, parse_video_id, parse_video_refs  # noqa: E402
+
+_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_-"
+
+# Link shapes and how often they appear in the mix
+SHAPES = [
+    ("https://www.youtube.com/watch?v={id}", 40),
+    ("https://youtu.be/{id}", 20),
+    ("https://youtu.be/{id}?si=AbCdEfGh12345678", 8),
+    ("https://www.youtube.com/shorts/{id}", 6),
+    ("https://www.youtube.com/watch?v={id}&list=PLx0sYbCqOb8TBPRdmBHs5Iftvv9TPboYG&index=3", 6),
+    ("https://m.youtube.com/watch?v={id}&t=1m30s", 5),
+    ("https://www.youtube.com/embed/{id}?start=42", 4),
+    ("https%3A%2F%2Fwww.youtube.com%2Fwatch%3Fv%3D{id}", 4),
+    ("www.youtube.com/watch?feature=share&v={id}", 4),
+    ("https://vimeo.com/123456789", 3),
+]
+
+
+# ═══════ Previous implementation (baseline) ═══════
+
+def legacy_extract_video_id(url: str) -> str:
+    """extract_video_id as it was before video_ref (HTTPException replaced by ValueError)."""
+    # Step 1: Decode any URL-encoded characters (%3F -> ?, %3D -> =, etc.)
+    url = unquote(url).strip()
+    
+    # Step 2: Try parsing as a proper URL first (most reliable)
+    try:
+        parsed = urlparse(url)
+        if parsed.hostname in ('www.youtube.com', 'youtube.com', 'm.youtube.com'):
+            if parsed.path == '/watch':
+                qs = parse_qs(parsed.query)
+                if 'v' in qs:
+                    vid = qs['v'][0]
+                    if re.match(r'^[a-zA-Z0-9_-]{11}$', vid):
+                        return vid
+            # Handle /embed/, /shorts/, /v/ paths
+            for prefix in ('/embed/', '/shorts/', '/v/'):
+                if parsed.path.startswith(prefix):
+                    vid = parsed.path[len(prefix):].split('/')[0].split('?')[0]
+                    if re.match(r'^[a-zA-Z0-9_-]{11}$', vid):
+                        return vid
+        elif parsed.hostname == 'youtu.be':
+            vid = parsed.path.lstrip('/').split('/')[0].split('?')[0]
+            if re.match(r'^[a-zA-Z0-9_-]{11}$', vid):
+                return vid
+    except Exception:
+        pass
+    
+    # Step 3: Fallback regex patterns for edge cases
+    patterns = [
+        r'(?:youtube\.com\/watch\?v=)([a-zA-Z0-9_-]{11})',
+        r'(?:youtu\.be\/)([a-zA-Z0-9_-]{11})',
+        r'(?:youtube\.com\/embed\/)([a-zA-Z0-9_-]{11})',
+        r'(?:youtube\.com\/shorts\/)([a-zA-Z0-9_-]{11})',
+        r'(?:youtube\.com\/v\/)([a-zA-Z0-9_-]{11})',
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, url)
+        if match:
+            return match.group(1)
+    raise ValueError("Invalid YouTube URL")
+
+def _legacy(url):
+    try:
+        return legacy_extract_video_id(url)
+    except ValueError:
+        return None
+
+
+def _current(url):
+    try:
+        return parse_video_id(url)
+    except VideoRefError:
+        return None
+
+
+def make_urls(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    shapes = [shape for shape, _ in SHAPES]
+    weights = [weight for _, weight in SHAPES]
+    return [
+        rng.choices(shapes, weights)[0].format(id="".join(rng.choices(_ALPHABET, k=11)))
+        for _ in range(count)
+    ]
+
+
+def best_of(fn, runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(args) -> list:
+    urls = make_urls(args.urls, args.seed)
+    legacy = [_legacy(u) for u in urls]
+    current = [_current(u) for u in urls]
+    # The old parser rejects some valid links (e.g. no scheme and v= not first)
+    recovered = sum(1 for a, b in zip(legacy, current) if a is None and b is not None)
+    mismatches = sum(1 for a, b in zip(legacy, current) if a is not None and a != b)
+    print(f"{len(urls)} URLs, {sum(1 for b in current if b)} valid, "
+          f"{recovered} accepted only by video_ref, {mismatches} mismatches")
+    return [
+        ("legacy", best_of(lambda: [_legacy(u) for u in urls], args.runs)),
+        ("video_ref", best_of(lambda: [_current(u) for u in urls], args.runs)),
+        ("bulk", best_of(lambda: parse_video_refs(urls, unique=False), args.runs)),
+    ]
+
+
+def print_report(rows: list, count: int):
+    header = f"{'parser':<11}{'best ms':>10}{'us/url':>9}{'urls/s':>12}"
+    print(header)
+    print("─" * len(header))
+    for name, seconds in rows:
+        print(f"{name:<11}{seconds * 1000:>10.1f}{seconds * 1e6 / count:>9.2f}{count / seconds:>12.0f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--urls", type=int, default=20000, help="URLs in the mix")
+    parser.add_argument("--runs", type=int, default=3, help="timed runs per parser (best is reported)")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print_report(run(args), args.urls)
@@ -0,0 +1,135 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from metrics import record_cache
+
+# Caption track selection by output language. For a requested language the
+# order is: a native track in that language (manual before auto-generated),
+# then YouTube's server-side translation of another track (`tlang`), then the
+# English / first track, which leaves the translation to the LLM. Track lists
+# (signed URLs from the player response) are cached per video for a while so
+# retries, resumed tasks and requests in other languages don't refetch them.
+
+# Output language names (as sent by the dashboard) → YouTube language codes
+LANGUAGE_CODES = {
+    "english": "en", "hindi": "hi", "tamil": "ta", "telugu": "te", "malayalam": "ml",
+    "kannada": "kn", "bengali": "bn", "marathi": "mr", "gujarati": "gu", "urdu": "ur",
+    "punjabi": "pa", "odia": "or", "nepali": "ne", "spanish": "es", "french": "fr",
+    "german": "de", "italian": "it", "dutch": "nl", "portuguese": "pt", "russian": "ru",
+    "ukrainian": "uk", "polish": "pl", "turkish": "tr", "arabic": "ar", "persian": "fa",
+    "japanese": "ja", "korean": "ko", "chinese": "zh-Hans", "vietnamese": "vi", "thai": "th",
+    "indonesian": "id", "malay": "ms", "filipino": "fil", "swahili": "sw",
+}
+_CODE_RE = re.compile(r"[a-z]{2,3}(?:-[A-Za-z]{2,4})?")
+
+# Signed caption URLs expire after a few hours; keep track lists well inside that
+TRACK_CACHE_TTL = float(os.getenv("TRACK_CACHE_TTL", "1800"))
+TRACK_CACHE_SIZE = 512
+
+
+def language_code(language: Optional[str]) -> Optional[str]:
+    """YouTube language code for an output language ("Hindi" → "hi"); None if unknown."""
+    if not language:
+        return None
+    name = language.strip()
+    code = LANGUAGE_CODES.get(name.lower())
+    if code:
+        return code
+    return name if _CODE_RE.fullmatch(name) else None
+
+
+def same_language(a: Optional[str], b: Optional[str]) -> bool:
+    """True if two language codes share their primary subtag ("pt-BR" and "pt")."""
+    return bool(a and b) and a.split("-")[0].lower() == b.split("-")[0].lower()
+
+
+class TrackChoice(NamedTuple):
+    track: dict
+    tlang: Optional[str]   # set when YouTube should translate the track
+    language: str          # language of the text this choice yields
+
+    @property
+    def url(self) -> str:
+        base = self.track.get("baseUrl", "")
+        return f"{base}&tlang={self.tlang}" if self.tlang else base
+
+
+def rank_tracks(tracks: list, target: Optional[str] = None) -> list:
+    """TrackChoices to try in order for innertube-style track dicts.
+
+    Each dict has "languageCode", optionally "kind" ("asr" = auto-generated)
+    and "isTranslatable". Without a target the English track comes first.
+    """
+    manual_first = sorted(tracks, key=lambda t: t.get("kind") == "asr")
+    choices = []
+    if target:
+        choices += [TrackChoice(t, None, t.get("languageCode", ""))
+                    for t in manual_first if same_language(t.get("languageCode"), target)][:1]
+        if not choices:
+            choices += [TrackChoice(t, target, target) for t in manual_first if t.get("isTranslatable")][:1]
+    choices += [TrackChoice(t, None, t.get("languageCode", ""))
+                for t in manual_first if same_language(t.get("languageCode"), "en")][:1]
+    if manual_first:
+        choices.append(TrackChoice(manual_first[0], None, manual_first[0].get("languageCode", "")))
+    unique = []
+    for choice in choices:
+        if choice not in unique:
+            unique.append(choice)
+    return unique
+
+
+def rank_subtitle_languages(tracks: dict, target: Optional[str] = None) -> list:
+    """Language keys to try in yt-dlp's {"subtitles": ..., "automatic_captions": ...}.
+
+    Returns (key, entries, automatic) tuples. yt-dlp already lists YouTube's
+    translations among the automatic captions, under the target language's key.
+    """
+    subtitles = tracks.get("subtitles") or {}
+    automatic = tracks.get("automatic_captions") or {}
+    order = []
+    if target:
+        order += [(key, subtitles[key], False) for key in subtitles if same_language(key, target)][:1]
+        order += [(key, automatic[key], True) for key in automatic if same_language(key, target)][:1]
+    fallback = subtitles or automatic
+    if fallback:
+        key = next((k for k in fallback if same_language(k, "en")), next(iter(fallback)))
+        order.append((key, fallback[key], fallback is automatic))
+    unique = []
+    seen = set()
+    for key, entries, is_automatic in order:
+        if (key, is_automatic) not in seen:
+            seen.add((key, is_automatic))
+            unique.append((key, entries, is_automatic))
+    return unique
+
+
+# ═══════ Track list cache ═══════
+
+_tracks: "OrderedDict[str, tuple]" = OrderedDict()
+_tracks_lock = threading.Lock()
+
+
+def remember_tracks(video_id: str, tracks: list, egress=None):
+    """Cache a video's caption tracks and the egress identity whose URLs they are."""
+    if not tracks:
+        return
+    with _tracks_lock:
+        _tracks[video_id] = (tracks, egress, time.monotonic() + TRACK_CACHE_TTL)
+        _tracks.move_to_end(video_id)
+        while len(_tracks) > TRACK_CACHE_SIZE:
+            _tracks.popitem(last=False)
+
+
+def cached_tracks(video_id: str) -> Optional[tuple]:
+    """(tracks, egress) cached for a video, or None."""
+    with _tracks_lock:
+        cached = _tracks.get(video_id)
+        if cached is not None and cached[2] <= time.monotonic():
+            del _tracks[video_id]
+            cached = None
+    record_cache("caption_tracks", cached is not None)
+    return cached[:2] if cached else None
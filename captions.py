@@ -0,0 +1,287 @@
+import codecs
+import html
+import io
+import json
+import re
+import xml.etree.ElementTree as ET
+from collections import deque
+from typing import Iterable, Iterator
+
+# Caption decoding for every format get_transcript sees (timedtext XML / srv3,
+# JSON3, WebVTT, plain snippet lists). Parsers consume the HTTP body as an
+# iterator of byte chunks (e.g. httpx `iter_bytes()`) and yield raw cue text as
+# it is decoded, so a multi-hour track is never held as a full response string,
+# element tree or JSON document. decode_segments() then cleans cues in batches
+# (tags, HTML entities, whitespace) and drops rolling-caption repeats, and
+# join_segments() writes the result into a single buffer.
+
+# Tags never span a batch separator
+_TAG_RE = re.compile(r"<[^>\x00]*>")
+_EVENTS_RE = re.compile(r'"events"\s*:\s*\[')
+_SEPARATORS = " \t\r\n,"
+_XML_CUE_TAGS = ("text", "p")
+_BATCH_SEP = "\x00"
+_VTT_SKIP_PREFIXES = ("WEBVTT", "Kind:", "Language:", "NOTE", "STYLE", "REGION")
+
+# Cues cleaned per regex/unescape pass
+CLEAN_BATCH = 1024
+# Words of already-emitted text compared against each new cue
+_OVERLAP_WINDOW = 32
+# A cue starting with this many words of the previous text is treated as a roll-over
+_MIN_OVERLAP = 4
+# A cue identical to one of this many previous cues is dropped
+_REPEAT_LOOKBACK = 2
+
+
+class CaptionParseError(ValueError):
+    """The caption body isn't in the expected format."""
+
+
+def _decode(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Incrementally UTF-8 decode byte chunks (multi-byte characters may straddle chunks)."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+# ═══════ Format parsers (raw cue text) ═══════
+
+class _CueTarget:
+    """XMLParser target collecting the text of <text>/<p> elements.
+
+    No element tree is built, so memory stays flat however long the track is
+    and each cue costs only the parser callbacks.
+    """
+
+    def __init__(self):
+        self.cues = []
+        self._depth = 0
+        self._parts = []
+
+    def start(self, tag, attrib):
+        if tag in _XML_CUE_TAGS:
+            self._depth += 1
+
+    def data(self, data):
+        if self._depth:
+            self._parts.append(data)
+
+    def end(self, tag):
+        if tag in _XML_CUE_TAGS:
+            self._depth -= 1
+            if not self._depth:
+                self.cues.append("".join(self._parts))
+                self._parts.clear()
+
+    def close(self):
+        return None
+
+
+def iter_timedtext_xml(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Cues of a timedtext XML track (<text> in format 1, <p>/<s> in srv3)."""
+    target = _CueTarget()
+    parser = ET.XMLParser(target=target)
+    try:
+        for chunk in chunks:
+            parser.feed(chunk)
+            if target.cues:
+                yield from target.cues
+                target.cues.clear()
+        parser.close()
+    except ET.ParseError as e:
+        raise CaptionParseError(f"Invalid timedtext XML: {e}") from e
+    yield from target.cues
+
+
+def iter_json3(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Cues of a JSON3 track, decoding one event object at a time.
+
+    Segments of an event carry their own spacing (" world"), so they are
+    concatenated as-is.
+    """
+    decoder = json.JSONDecoder()
+    pieces = _decode(chunks)
+    buffer = ""
+    exhausted = False
+
+    def more() -> bool:
+        nonlocal buffer, exhausted
+        try:
+            buffer += next(pieces)
+            return True
+        except StopIteration:
+            exhausted = True
+            return False
+
+    # Skip everything up to the start of the "events" array
+    while True:
+        match = _EVENTS_RE.search(buffer)
+        if match:
+            buffer = buffer[match.end():]
+            break
+        # Keep a short tail in case the key straddles two chunks
+        buffer = buffer[-32:]
+        if not more():
+            raise CaptionParseError("No events array in JSON3 captions")
+
+    pos = 0
+    while True:
+        while pos < len(buffer) and buffer[pos] in _SEPARATORS:
+            pos += 1
+        if pos >= len(buffer):
+            buffer, pos = "", 0
+            if not more():
+                raise CaptionParseError("Truncated JSON3 captions")
+            continue
+        if buffer[pos] == "]":
+            return
+        try:
+            event, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Most likely the event continues in the next chunk
+            buffer, pos = buffer[pos:], 0
+            if exhausted or not more():
+                raise CaptionParseError("Invalid or truncated JSON3 event")
+            continue
+        pos = end
+        if pos > 65536:
+            buffer, pos = buffer[pos:], 0
+        segs = event.get("segs")
+        if segs:
+            yield "".join(seg.get("utf8", "") for seg in segs)
+
+
+def _iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    partial = ""
+    for text in _decode(chunks):
+        lines = (partial + text).split("\n")
+        partial = lines.pop()
+        yield from lines
+    if partial:
+        yield partial
+
+
+def iter_vtt(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Cue text lines of a WebVTT track, read line by line."""
+    for line in _iter_lines(chunks):
+        line = line.strip()
+        if not line or "-->" in line or line.isdigit() or line.startswith(_VTT_SKIP_PREFIXES):
+            continue
+        yield line
+
+
+_PARSERS = {
+    "xml": iter_timedtext_xml,
+    "srv1": iter_timedtext_xml,
+    "srv2": iter_timedtext_xml,
+    "srv3": iter_timedtext_xml,
+    "ttml": iter_timedtext_xml,
+    "json3": iter_json3,
+    "vtt": iter_vtt,
+}
+
+
+# ═══════ Cleanup and de-duplication ═══════
+
+def clean_batch(cues: list) -> list:
+    """Strip tags, decode HTML entities and collapse whitespace for many cues at once.
+
+    The cues are joined so each regex/unescape runs once per batch instead of
+    once per cue. Timedtext XML is double-escaped (``&amp;#39;``), so entities
+    are decoded even after the XML parser has run.
+    """
+    text = _BATCH_SEP.join(cues)
+    if "<" in text:
+        text = _TAG_RE.sub("", text)
+    if "&" in text:
+        text = html.unescape(text)
+    return [" ".join(cue.split()) for cue in text.split(_BATCH_SEP)]
+
+
+class RollingDeduper:
+    """Drop the repetition auto-captions produce as lines roll up the screen.
+
+    A cue equal to one of the last few cues is skipped, and a cue that starts
+    with the tail of the text emitted so far (at least _MIN_OVERLAP words) only
+    contributes its new words.
+    """
+
+    def __init__(self):
+        self.recent = deque(maxlen=_REPEAT_LOOKBACK)
+        self.tail = deque(maxlen=_OVERLAP_WINDOW)
+
+    def feed(self, cue: str) -> str:
+        if cue in self.recent:
+            return ""
+        self.recent.append(cue)
+        words = cue.split(" ")
+        first = words[0]
+        if len(words) >= _MIN_OVERLAP and first in self.tail:
+            tail = list(self.tail)
+            # Only positions where the overlap fits inside this cue
+            start = max(0, len(tail) - len(words))
+            while True:
+                try:
+                    start = tail.index(first, start)
+                except ValueError:
+                    break
+                overlap = len(tail) - start
+                if overlap < _MIN_OVERLAP:
+                    break
+                if tail[start:] == words[:overlap]:
+                    words = words[overlap:]
+                    break
+                start += 1
+        self.tail.extend(words)
+        return " ".join(words)
+
+
+def decode_segments(raw: Iterable[str], dedupe: bool = True) -> Iterator[str]:
+    """Clean raw cue text in batches and (optionally) drop rolling-caption repeats."""
+    deduper = RollingDeduper() if dedupe else None
+    batch = []
+
+    def flush():
+        for cue in clean_batch(batch):
+            if cue and deduper is not None:
+                cue = deduper.feed(cue)
+            if cue:
+                yield cue
+        batch.clear()
+
+    for cue in raw:
+        batch.append(cue)
+        if len(batch) >= CLEAN_BATCH:
+            yield from flush()
+    if batch:
+        yield from flush()
+
+
+def join_segments(segments: Iterable[str]) -> str:
+    """Space-join segments into a single growing buffer."""
+    buffer = io.StringIO()
+    first = True
+    for segment in segments:
+        if not first:
+            buffer.write(" ")
+        buffer.write(segment)
+        first = False
+    return buffer.getvalue()
+
+
+def decode_snippets(texts: Iterable[str], dedupe: bool = True) -> str:
+    """Plain text from already-split caption snippets (e.g. youtube-transcript-api)."""
+    return join_segments(decode_segments(texts, dedupe))
+
+
+def parse_caption_stream(chunks: Iterable[bytes], fmt: str, dedupe: bool = True) -> str:
+    """Decode a caption body in `fmt` ("xml", "json3", "vtt", "srv3", ...) to plain text."""
+    parser = _PARSERS.get(fmt)
+    if parser is None:
+        raise CaptionParseError(f"Unsupported caption format: {fmt}")
+    return join_segments(decode_segments(parser(chunks), dedupe))
@@ -0,0 +1,274 @@
+import atexit
+import itertools
+import os
+import re
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Optional
+
+from http_client import make_http_client
+from metrics import record_egress
+
+# Egress identities: the proxy + cookie jar pairs that every YouTube request
+# (innertube, caption downloads, youtube-transcript-api, yt-dlp) goes out
+# through. Proxies and jars are paired round-robin into max(proxies, jars)
+# identities, so a jar always travels with the same IP. Each identity has its
+# own connection pool and its own backoff: a block signal (429/403, "confirm
+# you're not a bot") rests that identity and the request moves to the next one.
+# Cookies are parsed once into memory; yt-dlp gets one cookie file per jar.
+YOUTUBE_PROXIES = [
+    p.strip() for p in re.split(r"[,\n]", os.getenv("YOUTUBE_PROXIES") or os.getenv("YOUTUBE_PROXY") or "")
+    if p.strip()
+]
+# Inline Netscape cookies (one jar) and/or paths of cookies.txt files (one jar each)
+YOUTUBE_COOKIES = os.getenv("YOUTUBE_COOKIES", "")
+YOUTUBE_COOKIES_FILES = [p.strip() for p in os.getenv("YOUTUBE_COOKIES_FILES", "").split(",") if p.strip()]
+# least_blocked: identity blocked longest ago first (then least recently used); round_robin: strict rotation
+EGRESS_STRATEGY = os.getenv("EGRESS_STRATEGY", "least_blocked")
+# Identities tried per request before the block is reported to the caller
+EGRESS_ATTEMPTS = int(os.getenv("EGRESS_ATTEMPTS", "3"))
+# Rest after a block; doubles with every consecutive block, reset by a success
+EGRESS_BACKOFF = float(os.getenv("EGRESS_BACKOFF", "60"))
+EGRESS_MAX_BACKOFF = 1800.0
+
+BLOCK_STATUSES = (403, 429)
+_BLOCK_MARKERS = (
+    "not a bot", "too many requests", "http error 429", "http error 403", "403 forbidden",
+    "requestblocked", "ipblocked", "blocking requests from your ip",
+)
+
+
+class EgressBlocked(Exception):
+    """YouTube refused the request because of who sent it (IP or cookies)."""
+
+
+def is_block_signal(error) -> bool:
+    """True if an error means the identity is blocked, not that the video or request is bad."""
+    if isinstance(error, EgressBlocked):
+        return True
+    if type(error).__name__ in ("RequestBlocked", "IpBlocked"):  # youtube-transcript-api
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in _BLOCK_MARKERS)
+
+
+def parse_netscape_cookies(text: str) -> list:
+    """(domain, path, secure, expires, name, value) tuples from a cookies.txt body."""
+    cookies = []
+    for line in text.splitlines():
+        if line.startswith("#HttpOnly_"):
+            line = line[len("#HttpOnly_"):]
+        elif not line.strip() or line.startswith("#"):
+            continue
+        fields = line.rstrip("\r\n").split("\t")
+        if len(fields) != 7:
+            continue
+        domain, _, path, secure, expires, name, value = fields
+        try:
+            expires = int(float(expires or 0))
+        except ValueError:
+            expires = 0
+        cookies.append((domain, path, secure.upper() == "TRUE", expires, name, value))
+    return cookies
+
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class EgressIdentity:
+    """One proxy + cookie jar, with its clients and block history."""
+
+    def __init__(self, name: str, proxy: Optional[str] = None, cookies_text: str = ""):
+        self.name = name
+        self.proxy = proxy
+        self.cookies_text = cookies_text
+        self.cookies = parse_netscape_cookies(cookies_text) if cookies_text else []
+        self.blocked_until = 0.0
+        self.last_blocked_at = 0.0
+        self.last_used_at = 0.0
+        self.backoff = EGRESS_BACKOFF
+        self.consecutive_blocks = 0
+        self.successes = 0
+        self.blocks = 0
+        self._lock = threading.Lock()
+        self._http = None
+        self._session = None
+        self._cookie_file = None
+
+    def __repr__(self):
+        return f"<EgressIdentity {self.name}>"
+
+    @property
+    def http(self):
+        """httpx client bound to this identity's proxy and cookies (own keep-alive pool)."""
+        if self._http is None:
+            with self._lock:
+                if self._http is None:
+                    client = make_http_client(proxy=self.proxy)
+                    for domain, path, _, _, name, value in self.cookies:
+                        client.cookies.set(name, value, domain=domain, path=path)
+                    self._http = client
+        return self._http
+
+    @property
+    def session(self):
+        """requests.Session for youtube-transcript-api (its http_client argument)."""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    session = requests.Session()
+                    if self.proxy:
+                        session.proxies = {"http": self.proxy, "https": self.proxy}
+                    for domain, path, secure, expires, name, value in self.cookies:
+                        session.cookies.set(name, value, domain=domain, path=path, secure=secure,
+                                            expires=expires or None)
+                    self._session = session
+        return self._session
+
+    @property
+    def cookie_file(self) -> Optional[str]:
+        """The jar written to a temp file once, for yt-dlp's cookiefile option."""
+        if self.cookies_text and self._cookie_file is None:
+            with self._lock:
+                if self._cookie_file is None:
+                    try:
+                        fd, path = tempfile.mkstemp(suffix=".txt", text=True)
+                        with os.fdopen(fd, "w") as f:
+                            f.write(self.cookies_text)
+                        atexit.register(_remove_file, path)
+                        self._cookie_file = path
+                    except Exception as e:
+                        print(f"⚠️ Failed to create cookie file for {self.name}: {e}")
+        return self._cookie_file
+
+
+class EgressPool:
+    """Picks identities for requests and rests the ones YouTube is blocking."""
+
+    def __init__(self, identities: list, strategy: str = EGRESS_STRATEGY):
+        self.identities = identities
+        self.strategy = strategy
+        self._rotation = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.identities)
+
+    def candidates(self, limit: int = EGRESS_ATTEMPTS, prefer: Optional[EgressIdentity] = None) -> list:
+        """Up to `limit` identities to try in order.
+
+        Resting identities are only used once no rested one is left, soonest
+        available first, so requests never stall on an exhausted pool.
+        `prefer` (e.g. the identity that fetched a signed caption URL) goes
+        first unless it is resting.
+        """
+        now = time.monotonic()
+        with self._lock:
+            ready = [i for i in self.identities if i.blocked_until <= now]
+            resting = sorted((i for i in self.identities if i.blocked_until > now), key=lambda i: i.blocked_until)
+            if self.strategy == "round_robin":
+                if ready:
+                    start = next(self._rotation) % len(ready)
+                    ready = ready[start:] + ready[:start]
+            else:
+                ready.sort(key=lambda i: (i.last_blocked_at, i.last_used_at))
+            if prefer is not None and prefer in ready:
+                ready.remove(prefer)
+                ready.insert(0, prefer)
+            order = (ready + resting)[:max(1, limit)]
+            # Claimed now, so concurrent callers spread over the pool
+            order[0].last_used_at = now
+        return order
+
+    def report_success(self, identity: EgressIdentity):
+        with self._lock:
+            identity.successes += 1
+            identity.consecutive_blocks = 0
+            identity.backoff = EGRESS_BACKOFF
+        record_egress(identity.name, "ok")
+
+    def report_block(self, identity: EgressIdentity, reason: str = ""):
+        now = time.monotonic()
+        with self._lock:
+            identity.blocks += 1
+            identity.consecutive_blocks += 1
+            identity.last_blocked_at = now
+            identity.blocked_until = now + identity.backoff
+            rest = identity.backoff
+            identity.backoff = min(identity.backoff * 2, EGRESS_MAX_BACKOFF)
+        record_egress(identity.name, "blocked")
+        print(f"🚧 Egress {identity.name} blocked ({reason[:80]}), resting {rest:.0f}s")
+
+    def call(self, fn: Callable, prefer: Optional[EgressIdentity] = None, limit: int = EGRESS_ATTEMPTS):
+        """fn(identity) through the pool, moving to the next identity on a block signal.
+
+        Other errors are re-raised at once (they aren't the identity's fault);
+        if every identity tried was blocked, the last block error is raised.
+        """
+        last_error = None
+        for identity in self.candidates(limit, prefer):
+            identity.last_used_at = time.monotonic()
+            try:
+                result = fn(identity)
+            except Exception as e:
+                if not is_block_signal(e):
+                    raise
+                self.report_block(identity, str(e))
+                last_error = e
+                continue
+            self.report_success(identity)
+            return result
+        raise last_error
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                i.name: {
+                    "proxy": bool(i.proxy),
+                    "cookies": len(i.cookies),
+                    "resting_seconds": round(max(0.0, i.blocked_until - now), 1),
+                    "successes": i.successes,
+                    "blocks": i.blocks,
+                }
+                for i in self.identities
+            }
+
+
+def _load_jars() -> list:
+    jars = [YOUTUBE_COOKIES] if YOUTUBE_COOKIES.strip() else []
+    for path in YOUTUBE_COOKIES_FILES:
+        try:
+            with open(path, encoding="utf-8") as f:
+                jars.append(f.read())
+        except OSError as e:
+            print(f"⚠️ Skipping cookie file {path}: {e}")
+    return jars
+
+
+@lru_cache(maxsize=1)
+def get_egress_pool() -> EgressPool:
+    """Process-wide pool built from YOUTUBE_PROXIES / YOUTUBE_COOKIES(_FILES).
+
+    With nothing configured it holds one direct identity (no proxy, no cookies).
+    """
+    jars = _load_jars()
+    count = max(len(YOUTUBE_PROXIES), len(jars), 1)
+    identities = [
+        EgressIdentity(
+            f"egress-{n}",
+            proxy=YOUTUBE_PROXIES[n % len(YOUTUBE_PROXIES)] if YOUTUBE_PROXIES else None,
+            cookies_text=jars[n % len(jars)] if jars else "",
+        )
+        for n in range(count)
+    ]
+    if count > 1:
+        print(f"🌐 Egress pool: {len(YOUTUBE_PROXIES)} proxies, {len(jars)} cookie jars, {count} identities")
+    return EgressPool(identities)
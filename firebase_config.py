@@ -1,14 +1,16 @@
 import json
 import os
+import threading
 
-import firebase_admin
-from firebase_admin import credentials, firestore
 from dotenv import load_dotenv
 load_dotenv()
 
 
 def _init_firebase():
     """Initialize Firebase - supports both file-based and env-var-based credentials."""
+    import firebase_admin
+    from firebase_admin import credentials
+
     try:
         firebase_admin.get_app()
         return  # Already initialized
@@ -50,12 +52,30 @@ def _init_firebase():
         print("⚠️ Firebase credentials not found. Set FIREBASE_CREDENTIALS_JSON env var with your service account JSON.")
 
 
-_init_firebase()
+_db = None
+_db_attempted = False
+_db_lock = threading.Lock()
 
 
 def get_db():
-    try:
-        return firestore.client()
-    except Exception as e:
-        print(f"❌ Error connecting to Firestore: {e}")
-        return None
+    """Return the Firestore client, initializing Firebase on first use.
+
+    Nothing happens at import time, so each worker process initializes
+    Firebase exactly once, after it has been forked.
+    """
+    global _db, _db_attempted
+    if _db_attempted:
+        return _db
+    # Callers arriving during initialization wait here for its result
+    with _db_lock:
+        if not _db_attempted:
+            try:
+                _init_firebase()
+                from firebase_admin import firestore
+                _db = firestore.client()
+            except Exception as e:
+                print(f"❌ Error connecting to Firestore: {e}")
+            finally:
+                # Only set once _db is final, so the lock-free check above is safe
+                _db_attempted = True
+    return _db
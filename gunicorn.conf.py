@@ -0,0 +1,29 @@
+"""Gunicorn config for multi-worker deployments.
+
+    gunicorn main:app -c gunicorn.conf.py
+
+Each worker imports the app and runs its own startup hook, so Firebase is
+initialized once per worker. For limits and task state to be shared, set
+RATE_LIMIT_STORAGE_URI to a Redis-compatible server and leave STATE_STORE on
+Firestore (or SQLite when all workers run on one host).
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Note generation for long videos runs in-process after the response is sent
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "60"))
+keepalive = 5
+
+# Import the app in each worker (after fork), never in the master
+preload_app = False
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's samples when Prometheus multiprocess mode is on."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,227 @@
+import html
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Callable, Optional
+
+# Local SQLite FTS5 index over saved notes (title + notes). Firestore stays the
+# source of truth: the index is filled incrementally on save/delete and each
+# user's rows are rebuilt from Firestore on first search and after the TTL, so
+# notes saved by other hosts show up too.
+HISTORY_INDEX_PATH = os.getenv(
+    "HISTORY_INDEX_PATH",
+    os.path.join(tempfile.gettempdir(), "yt_transcripter_search.db"),
+)
+HISTORY_INDEX_TTL = int(os.getenv("HISTORY_INDEX_TTL", "3600"))
+
+# Title matches count five times as much as matches in the notes body
+_TITLE_WEIGHT = 5.0
+_NOTES_WEIGHT = 1.0
+_SNIPPET_TOKENS = 24
+# Sentinels around matches; swapped for <mark> after HTML-escaping the text
+_MARK_START, _MARK_END = "\x02", "\x03"
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    email TEXT NOT NULL,
+    note_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    notes TEXT NOT NULL,
+    video_id TEXT,
+    language TEXT,
+    youtube_url TEXT,
+    created_at TEXT,
+    UNIQUE (email, note_id)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+    title, notes, content='notes', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS notes_ai AFTER INSERT ON notes BEGIN
+    INSERT INTO notes_fts(rowid, title, notes) VALUES (new.id, new.title, new.notes);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_ad AFTER DELETE ON notes BEGIN
+    INSERT INTO notes_fts(notes_fts, rowid, title, notes) VALUES ('delete', old.id, old.title, old.notes);
+END;
+CREATE TABLE IF NOT EXISTS indexed_users (
+    email TEXT PRIMARY KEY,
+    synced_at REAL NOT NULL
+);
+"""
+
+
+def build_match_query(text: str) -> str:
+    """Turn free text into a safe FTS5 query: every word must match, the last as a prefix."""
+    terms = _TERM_RE.findall(text.lower())
+    if not terms:
+        return ""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _highlight(fragment: str) -> str:
+    """HTML-escape an FTS5 fragment and wrap matches in <mark>."""
+    return (html.escape(fragment or "")
+            .replace(_MARK_START, "<mark>")
+            .replace(_MARK_END, "</mark>"))
+
+
+class HistoryIndex:
+    """Ranked (BM25) full-text search over every user's notes history."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _insert(self, conn, email: str, item: dict):
+        conn.execute("DELETE FROM notes WHERE email = ? AND note_id = ?", (email, item["id"]))
+        conn.execute(
+            "INSERT INTO notes (email, note_id, title, notes, video_id, language, youtube_url, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (email, item["id"], item.get("title") or "", item.get("notes") or "",
+             item.get("video_id"), item.get("language"), item.get("youtube_url"), item.get("created_at")),
+        )
+
+    def add(self, email: str, item: dict):
+        """Index (or re-index) one history item."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._insert(conn, email, item)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def remove(self, email: str, note_id: str):
+        self._conn().execute("DELETE FROM notes WHERE email = ? AND note_id = ?", (email, note_id))
+
+    def rebuild_user(self, email: str, items: list):
+        """Replace a user's indexed notes with `items` in one transaction."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM notes WHERE email = ?", (email,))
+            for item in items:
+                if item.get("id"):
+                    self._insert(conn, email, item)
+            conn.execute(
+                "INSERT OR REPLACE INTO indexed_users (email, synced_at) VALUES (?, ?)",
+                (email, time.time()),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def is_fresh(self, email: str) -> bool:
+        row = self._conn().execute(
+            "SELECT synced_at FROM indexed_users WHERE email = ?", (email,)
+        ).fetchone()
+        return bool(row) and time.time() - row[0] < HISTORY_INDEX_TTL
+
+    def ensure_user(self, email: str, load_history: Callable[[str], list]):
+        """Rebuild a user's rows from the source of truth if never synced or stale."""
+        if not self.is_fresh(email):
+            self.rebuild_user(email, load_history(email))
+
+    def search(self, email: str, text: str, page: int = 1, page_size: int = 20) -> dict:
+        """Best matches first, with highlighted title and a highlighted notes snippet."""
+        match = build_match_query(text)
+        result = {"query": text, "page": page, "page_size": page_size, "total": 0, "results": []}
+        if not match:
+            return result
+
+        conn = self._conn()
+        # CROSS JOIN keeps the FTS match as the outer loop; with a plain JOIN the
+        # planner walks every row of the user's notes and re-runs the match per row.
+        result["total"] = conn.execute(
+            "SELECT count(*) FROM notes_fts CROSS JOIN notes ON notes.id = notes_fts.rowid"
+            " WHERE notes_fts MATCH ? AND notes.email = ?",
+            (match, email),
+        ).fetchone()[0]
+        if not result["total"]:
+            return result
+
+        rows = conn.execute(
+            "SELECT notes.note_id, notes.title, notes.video_id, notes.language, notes.youtube_url,"
+            " notes.created_at, bm25(notes_fts, ?, ?) AS rank,"
+            " highlight(notes_fts, 0, ?, ?),"
+            " snippet(notes_fts, 1, ?, ?, '…', ?)"
+            " FROM notes_fts CROSS JOIN notes ON notes.id = notes_fts.rowid"
+            " WHERE notes_fts MATCH ? AND notes.email = ?"
+            " ORDER BY rank LIMIT ? OFFSET ?",
+            (_TITLE_WEIGHT, _NOTES_WEIGHT, _MARK_START, _MARK_END, _MARK_START, _MARK_END,
+             _SNIPPET_TOKENS, match, email, page_size, (page - 1) * page_size),
+        ).fetchall()
+        for note_id, title, video_id, language, youtube_url, created_at, rank, title_hl, snippet in rows:
+            result["results"].append({
+                "id": note_id,
+                "title": title,
+                "title_highlight": _highlight(title_hl),
+                "snippet": _highlight(snippet),
+                "video_id": video_id,
+                "language": language,
+                "youtube_url": youtube_url,
+                "created_at": created_at,
+                "score": round(-rank, 4),
+            })
+        return result
+
+
+_index: Optional[HistoryIndex] = None
+_index_attempted = False
+_index_lock = threading.Lock()
+
+
+def get_history_index() -> Optional[HistoryIndex]:
+    """Return the process-wide search index, or None if SQLite lacks FTS5."""
+    global _index, _index_attempted
+    if _index_attempted:
+        return _index
+    with _index_lock:
+        if not _index_attempted:
+            try:
+                _index = HistoryIndex(HISTORY_INDEX_PATH)
+            except sqlite3.Error as e:
+                print(f"⚠️ History search index unavailable: {e}")
+            _index_attempted = True
+    return _index
+
+
+def index_history_item(email: str, item: dict):
+    """Add a saved note to the search index (never fails the caller)."""
+    index = get_history_index()
+    if index is None:
+        return
+    try:
+        index.add(email, item)
+    except Exception as e:
+        print(f"⚠️ Failed to index note {item.get('id')}: {e}")
+
+
+def unindex_history_item(email: str, note_id: str):
+    """Drop a deleted note from the search index (never fails the caller)."""
+    index = get_history_index()
+    if index is None:
+        return
+    try:
+        index.remove(email, note_id)
+    except Exception as e:
+        print(f"⚠️ Failed to unindex note {note_id}: {e}")
@@ -0,0 +1,23 @@
+import os
+from typing import Optional
+
+import httpx
+
+# Default timeout for YouTube requests (innertube, caption downloads)
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))
+# Connection limit per client (one client per egress identity, see egress.py)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+
+
+def make_http_client(proxy: Optional[str] = None) -> httpx.Client:
+    """A pooled keep-alive client, optionally sending everything through `proxy`.
+
+    httpx.Client is thread-safe; one is shared by request handlers and the
+    yt-dlp worker threads.
+    """
+    return httpx.Client(
+        timeout=HTTP_TIMEOUT,
+        limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=20),
+        proxy=proxy,
+    )
+
@@ -1,39 +1,61 @@
 import asyncio
 import functools
-import json
 import os
 import re
 import hashlib
+import math
+import importlib
 import secrets
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from pathlib import Path
-import shutil
 import uuid
-import httpx
-from urllib.parse import unquote, urlparse, parse_qs
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-import tempfile
 
 from dotenv import load_dotenv
-from groq import Groq
-from firebase_admin import firestore
-from firebase_config import get_db, firebase_admin
+from firebase_config import get_db
+from state_store import get_store
+from provider_health import model_health
+from history_search import get_history_index, index_history_item, unindex_history_item
+from captions import CaptionParseError, decode_snippets, parse_caption_stream
+from caption_language import (
+    cached_tracks, language_code, rank_subtitle_languages, rank_tracks, remember_tracks, same_language,
+)
+from egress import EgressBlocked, get_egress_pool, is_block_signal
+from ytdlp_extractor import fetch_subtitle_tracks
+from video_metadata import INNERTUBE_CLIENTS, caption_tracks, fetch_player_response, probe_video
+from video_index import build_video_index, load_video_index
+from api_responses import CompressionMiddleware, FastJSONResponse, etag_json_response
+from static_assets import ASSETS_URL, asset_response, page_response
+from photos import PHOTOS_DIR, PHOTOS_URL, ImmutableStaticFiles, UploadSizeLimitMiddleware, save_photo
+from video_ref import VideoRefError, parse_video_id
+from transcript_compress import TRANSCRIPT_COMPRESSION, TRANSCRIPT_MIN_KEEP, compress_transcript
+from admission import (ADMISSION_PROBE_TIMEOUT, DEFAULT_JOB_COST, AdmissionDenied, admit, check_budget,
+                       job_cost, release, scheduler)
+from task_recovery import (
+    LeaseLost, claim_task, load_checkpoint, new_task_fields, recovery_loop, save_checkpoint,
+    task_heartbeat,
+)
+from metrics import (
+    close_task_step, discard_task_step, record_cache, record_fallback, record_hedge, record_retry,
+    record_tokens, render_metrics, span,
+)
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
 from fastapi import FastAPI, HTTPException, Depends, Request, UploadFile, File, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
+from typing import List, Optional, Union
 from jose import JWTError, jwt
-from youtube_transcript_api import YouTubeTranscriptApi
-import yt_dlp
-from google import genai
-from google.genai import types
+# Heavy SDKs (yt_dlp, groq, google.genai, youtube_transcript_api, firebase_admin)
+# are imported on first use to keep cold start fast; see prewarm().
 
 load_dotenv()
 
@@ -42,7 +64,6 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_HOURS = 24
 # USERS_FILE removed in favor of Firestore
 # HISTORY_DIR removed in favor of Firestore
-UPLOADS_DIR = Path("static/uploads")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 SMTP_EMAIL = os.getenv("SMTP_EMAIL")
@@ -50,8 +71,12 @@ SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
 SMTP_SERVER = "smtp.gmail.com"
 SMTP_PORT = 587
 
+# Rate limiter storage. "memory://" is per-process; set a shared backend such as
+# "redis://host:6379" when running several workers so limits apply app-wide.
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+
 # Rate Limiter
-limiter = Limiter(key_func=get_remote_address)
+limiter = Limiter(key_func=get_remote_address, storage_uri=RATE_LIMIT_STORAGE_URI)
 app = FastAPI(
     title="YouTube Transcripter",
     description="AI-powered notes generator from YouTube videos",
@@ -67,9 +92,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-# Database
-db = get_db()
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(UploadSizeLimitMiddleware)
 
 def send_inactivity_email(to_email: str):
     """Send an email to inactive users."""
@@ -120,7 +144,14 @@ def verify_password(password: str, stored_hash: str) -> bool:
 # CORS middleware is configured above with the app declaration
 
 # Serve static files
+@app.get(ASSETS_URL + "/{path:path}", include_in_schema=False)
+async def static_asset(path: str, request: Request):
+    """Fingerprinted CSS/JS (immutable, precompressed)."""
+    return asset_response(path, request)
+
 app.mount("/static", StaticFiles(directory="static"), name="static")
+# Content-addressed photo thumbnails, cached forever by browsers
+app.mount(PHOTOS_URL, ImmutableStaticFiles(directory=PHOTOS_DIR, check_dir=False), name="photos")
 
 class SignUpRequest(BaseModel):
     email: str
@@ -136,6 +167,13 @@ class GenerateRequest(BaseModel):
     output_language: str = "English"
     model: str = "gemini"  # "gemini" or "qwen"
 
+class AskRequest(BaseModel):
+    youtube_url: str
+    question: str
+    output_language: str = "English"
+    model: str = "gemini"  # "gemini" or "qwen"
+    top_k: int = 4
+
 class ProfileUpdateRequest(BaseModel):
     name: str = ""
     dob: str = ""
@@ -143,11 +181,43 @@ class ProfileUpdateRequest(BaseModel):
     role: str = "student"
     photo_url: str = ""
 
+# Response models for the heavy endpoints: validated and serialized in one
+# pydantic-core pass (FastJSONResponse). Unknown stored fields are dropped.
+
+class TaskResult(BaseModel):
+    step: Optional[str] = None      # while processing
+    notes: Optional[str] = None     # when completed
+    video_id: Optional[str] = None
+    note_id: Optional[str] = None
+    title: Optional[str] = None
+
+class TaskStatusResponse(BaseModel):
+    status: str
+    updated_at: Optional[str] = None
+    result: Optional[TaskResult] = None
+    error: Optional[str] = None
+    step_durations: dict = {}
+    video: Optional[dict] = None
+
+class HistoryItem(BaseModel):
+    id: str = ""
+    title: str = ""
+    video_id: str = ""
+    youtube_url: str = ""
+    language: str = "English"
+    notes: str = ""
+    transcript_length: int = 0
+    created_at: Union[str, datetime, None] = None
+
+class HistoryResponse(BaseModel):
+    history: List[HistoryItem]
+
 
 # ═══════ Database Helpers (Firestore) ═══════
 
 def get_user(email: str) -> dict:
     """Get user document from Firestore."""
+    db = get_db()
     if not db:
         return {}
     doc_ref = db.collection("users").document(email)
@@ -158,46 +228,68 @@ def get_user(email: str) -> dict:
 
 def save_user(email: str, data: dict):
     """Save user document to Firestore."""
+    db = get_db()
     if not db:
         return
-    db.collection("users").document(email).set(data, merge=True)
+    with span("firestore_write", "users"):
+        db.collection("users").document(email).set(data, merge=True)
 
 def get_user_history(email: str) -> list:
     """Get history sub-collection for a user."""
+    db = get_db()
     if not db:
         return []
     history_ref = db.collection("users").document(email).collection("history")
+    from firebase_admin import firestore
     docs = history_ref.order_by("created_at", direction=firestore.Query.DESCENDING).stream()
     return [d.to_dict() for d in docs]
 
 def save_history_item(email: str, item: dict):
     """Save history item to sub-collection."""
+    db = get_db()
     if not db:
         print("❌ DB is None in save_history_item")
         return
     print(f"💾 Saving history for {email}: {item['id']}")
     try:
-        db.collection("users").document(email).collection("history").document(item["id"]).set(item)
+        with span("firestore_write", "history"):
+            db.collection("users").document(email).collection("history").document(item["id"]).set(item)
         print("✅ History saved successfully")
+        index_history_item(email, item)
     except Exception as e:
         print(f"❌ Failed to save history: {e}")
 
 def delete_history_item_db(email: str, note_id: str):
     """Delete history item from sub-collection."""
+    db = get_db()
     if not db:
         return
     db.collection("users").document(email).collection("history").document(note_id).delete()
+    unindex_history_item(email, note_id)
 
-def update_task_status(task_id: str, status: str, result: dict = None, error: str = None):
-    """Update task status in Firestore."""
-    if not db:
-        return
+def update_task_status(task_id: str, status: str, result: dict = None, error: str = None, fields: dict = None):
+    """Update task status in the shared state store (visible to every worker)."""
     data = {"status": status, "updated_at": datetime.utcnow().isoformat()}
     if result:
         data["result"] = result
     if error:
         data["error"] = error
-    db.collection("tasks").document(task_id).set(data, merge=True)
+    if fields:
+        data.update(fields)
+    if status in ("completed", "failed"):
+        data["checkpoint"] = None  # chunk checkpoints are only needed to resume
+
+    # Label each finished step with how long it took
+    next_step = result.get("step") if result and status == "processing" else None
+    if next_step or status in ("completed", "failed"):
+        finished = close_task_step(task_id, next_step)
+        if finished:
+            data["step_durations"] = finished
+    try:
+        with span("firestore_write", "tasks"):
+            get_store().set("tasks", task_id, data, merge=True)
+    except Exception as e:
+        print(f"⚠️ Failed to update task {task_id}: {e}")
 
 # ═══════ Transcript Chunking Helpers ═══════
 
@@ -207,6 +299,17 @@ LONG_THRESHOLD = 50000     # > 50K chars ≈ > 60 min video
 CHUNK_SIZE = 10000         # ~10K chars per chunk ≈ ~2500 tokens
 CHUNK_OVERLAP = 500        # 500 char overlap to avoid cutting mid-sentence
 
+# Pause between chunk LLM calls (seconds) to stay under provider rate limits
+MEDIUM_CHUNK_DELAY = 2
+LONG_CHUNK_DELAY = 3
+
+def estimate_plan(transcript_chars: int) -> dict:
+    """Tier and chunk count a transcript of this size will get (used before it is fetched)."""
+    if transcript_chars <= SHORT_THRESHOLD:
+        return {"tier": "short", "chunks": 1}
+    tier = "medium" if transcript_chars <= LONG_THRESHOLD else "long"
+    return {"tier": tier, "chunks": math.ceil(transcript_chars / (CHUNK_SIZE - CHUNK_OVERLAP))}
+
 def chunk_transcript(transcript: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> list:
     """Split a long transcript into overlapping chunks, breaking at sentence boundaries."""
     if len(transcript) <= chunk_size:
@@ -237,6 +340,144 @@ def chunk_transcript(transcript: str, chunk_size: int = CHUNK_SIZE, overlap: int
     
     return chunks
 
+# ═══════ Chunk Notes Cache ═══════
+
+# Map-stage (per-chunk) notes are written without the audience modifier and in
+# English, so they can be reused across output languages and roles: a
+# regeneration in another language or for another role only re-runs the merge.
+# Transcripts already in the output language are the exception (see
+# generate_task_notes); their chunk notes are cached under a per-language variant.
+CHUNK_NOTES_LANGUAGE = "English"
+# Bump when CHUNK_SUMMARY_PROMPT / KEY_POINTS_PROMPT change to invalidate the cache
+CHUNK_PROMPT_VERSION = "v1"
+# Cached chunk notes expire after this long; expired entries are ignored on
+# read and deleted by a periodic sweep (every CACHE_SWEEP_INTERVAL seconds)
+CHUNK_CACHE_TTL_DAYS = float(os.getenv("CHUNK_CACHE_TTL_DAYS", "30"))
+CACHE_SWEEP_INTERVAL = int(os.getenv("CACHE_SWEEP_INTERVAL", "3600"))
+
+def strip_thinking(text: str) -> str:
+    """Remove model thinking tags (<think>...</think>)."""
+    return re.sub(r'<think>.*?</think>', '', text, flags=re.DOTALL).strip()
+
+def chunk_cache_key(variant: str, chunk: str) -> str:
+    """Cache key from the chunk's content and the prompt variant that summarizes it."""
+    return hashlib.sha256(f"{CHUNK_PROMPT_VERSION}:{variant}:{chunk}".encode()).hexdigest()
+
+def chunk_variant(variant: str, language: str) -> str:
+    """Cache variant for chunk notes written in `language` ("summary", "summary:hi", ...)."""
+    if language == CHUNK_NOTES_LANGUAGE:
+        return variant
+    return f"{variant}:{language_code(language) or language.strip().lower()}"
+
+def get_cached_chunk_notes(key: str) -> str:
+    """Return cached notes for a chunk, or None."""
+    try:
+        doc = get_store().get("chunk_cache", key)
+    except Exception as e:
+        print(f"⚠️ Chunk cache read failed: {e}")
+        return None
+    if doc is not None and doc.get("expires_at", float("inf")) <= time.time():
+        doc = None
+    record_cache("chunk_notes", doc is not None)
+    return doc.get("notes") if doc else None
+
+def save_chunk_notes(key: str, variant: str, notes: str):
+    """Store the notes generated for one chunk."""
+    try:
+        with span("firestore_write", "chunk_cache"):
+            get_store().set("chunk_cache", key, {
+                "variant": variant,
+                "notes": notes,
+                "created_at": datetime.utcnow().isoformat(),
+                "expires_at": time.time() + CHUNK_CACHE_TTL_DAYS * 86400,
+            })
+    except Exception as e:
+        print(f"⚠️ Chunk cache write failed: {e}")
+
+def sweep_chunk_cache() -> int:
+    """Delete expired chunk notes; returns how many were removed."""
+    with span("cache_sweep", "chunk_cache"):
+        return get_store().delete_expired("chunk_cache", "expires_at", time.time())
+
+async def cache_sweep_loop():
+    """Prune the chunk cache every CACHE_SWEEP_INTERVAL seconds (0 = never)."""
+    if CACHE_SWEEP_INTERVAL <= 0:
+        return
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            removed = await loop.run_in_executor(None, sweep_chunk_cache)
+            if removed:
+                print(f"🧹 Removed {removed} expired chunk cache entries")
+        except Exception as e:
+            print(f"⚠️ Chunk cache sweep failed: {e}")
+        await asyncio.sleep(CACHE_SWEEP_INTERVAL)
+
+def concatenated_notes(heading: str, combined: str, chunk_language: str, output_language: str) -> str:
+    """Fallback when the merge fails: the chunk notes joined as they are.
+
+    Only used when they are already in the output language; otherwise the
+    task fails rather than handing back notes in the wrong language.
+    """
+    if chunk_language.strip().lower() != output_language.strip().lower():
+        raise ValueError(f"Merging the chunk notes into {output_language} failed")
+    return f"# {heading}\n\n{combined}"
+
+# ═══════ Direct Video Cache ═══════
+
+# Gemini direct mode (no transcript) is the slowest and most expensive path, so
+# its notes are cached per video, language and role, and the transcript-like
+# description it writes is cached per video: later requests in another
+# language or for another role run the normal text pipeline on it instead.
+# Bump when DIRECT_VIDEO_PROMPT changes to invalidate the cache
+DIRECT_PROMPT_VERSION = "v2"
+
+def direct_cache_key(video_id: str, language: str, role: str) -> str:
+    return hashlib.sha256(f"{DIRECT_PROMPT_VERSION}:{video_id}:{language.strip().lower()}:{role}".encode()).hexdigest()
+
+def get_cached_direct_notes(video_id: str, language: str, role: str) -> str:
+    """Return cached direct-mode notes for this video/language/role, or None."""
+    try:
+        doc = get_store().get("direct_notes", direct_cache_key(video_id, language, role))
+    except Exception as e:
+        print(f"⚠️ Direct notes cache read failed: {e}")
+        return None
+    record_cache("direct_notes", doc is not None)
+    return doc.get("notes") if doc else None
+
+def get_video_description(video_id: str) -> str:
+    """Return the cached transcript-like description of a video, or None."""
+    try:
+        doc = get_store().get("video_descriptions", video_id)
+    except Exception as e:
+        print(f"⚠️ Video description read failed: {e}")
+        return None
+    hit = bool(doc) and doc.get("version") == DIRECT_PROMPT_VERSION
+    record_cache("video_description", hit)
+    return doc.get("description") if hit else None
+
+def save_direct_result(video_id: str, language: str, role: str, notes: str, description: str = None):
+    """Store direct-mode notes and, if the model wrote one, the video description."""
+    now = datetime.utcnow().isoformat()
+    try:
+        with span("firestore_write", "direct_notes"):
+            get_store().set("direct_notes", direct_cache_key(video_id, language, role), {
+                "video_id": video_id,
+                "language": language,
+                "role": role,
+                "notes": notes,
+                "created_at": now,
+            })
+        if description:
+            with span("firestore_write", "video_descriptions"):
+                get_store().set("video_descriptions", video_id, {
+                    "version": DIRECT_PROMPT_VERSION,
+                    "description": description,
+                    "created_at": now,
+                })
+    except Exception as e:
+        print(f"⚠️ Direct result cache write failed: {e}")
+
 # Prompt for chunked medium-length videos (15-60 min)
 CHUNK_SUMMARY_PROMPT = """You are an expert note-taker. This is PART {chunk_num} of {total_chunks} from a video transcript.
 
@@ -324,60 +565,226 @@ SECTION NOTES TO MERGE:
 {chunk_notes}
 """
 
-async def generate_for_model(prompt: str, model: str, language: str, role_modifier: str) -> str:
-    """Route generation to the selected model (Gemini or Qwen/Groq)."""
+# ═══════ Transcript Q&A ═══════
+
+# Passages for the per-video vector index (smaller than note chunks so a
+# handful of them make one small answer prompt)
+QA_PASSAGE_SIZE = 1500
+QA_PASSAGE_OVERLAP = 200
+QA_MAX_TOP_K = 8
+
+ASK_PROMPT = """Answer the question about a YouTube video using ONLY the transcript excerpts below.
+If the excerpts don't contain the answer, say so in one sentence.
+Answer in **{language}**, concisely, and cite excerpts like [1] where relevant.
+
+Question: {question}
+
+Transcript excerpts:
+{excerpts}"""
+
+def index_transcript(video_id: str, transcript: str):
+    """Build the video's Q&A vector index unless this host already has it."""
+    if load_video_index(video_id) is not None:
+        return
+    passages = chunk_transcript(transcript, QA_PASSAGE_SIZE, QA_PASSAGE_OVERLAP)
+    build_video_index(video_id, passages)
+    print(f"🧭 Indexed {len(passages)} passages for Q&A on {video_id}")
+
+# ═══════ LLM Clients (created lazily, shared across requests) ═══════
+
+# Calls go through the SDKs' async interfaces (`client.aio`, AsyncGroq), so
+# cancelling a call (e.g. the loser of a hedged race) closes its HTTP request
+# instead of leaving it running to completion on an executor thread.
+
+@functools.lru_cache(maxsize=1)
+def get_gemini_client():
+    """Shared Gemini client; importing google.genai is deferred to first use."""
+    from google import genai
+    return genai.Client(api_key=GEMINI_API_KEY)
+
+@functools.lru_cache(maxsize=1)
+def get_groq_client():
+    """Shared async Groq client; importing groq is deferred to first use."""
+    from groq import AsyncGroq
+    return AsyncGroq(api_key=GROQ_API_KEY)
+
+def gemini_generation_config():
+    """Generation settings used for every Gemini call."""
+    from google.genai import types
+    return types.GenerateContentConfig(
+        temperature=0.7,
+        max_output_tokens=8192,
+    )
+
+def _parse_hedge_policy(spec: str) -> dict:
+    """Parse "short=8,medium=20,long=30" into {tier: seconds}."""
+    policy = {}
+    for part in spec.split(","):
+        tier, _, seconds = part.partition("=")
+        if tier.strip() and seconds.strip():
+            try:
+                policy[tier.strip()] = float(seconds)
+            except ValueError:
+                print(f"⚠️ Ignoring invalid HEDGE_POLICY entry: {part!r}")
+    return policy
+
+# Opt-in hedging: seconds to wait for the primary provider (or Groq model)
+# before racing the next one in parallel, per tier. Tiers not listed never
+# hedge and fall back sequentially as before. Example: "long=25,merge=40".
+HEDGE_POLICY = _parse_hedge_policy(os.getenv("HEDGE_POLICY", ""))
+
+async def race_hedged(attempts: list, hedge_after: float = None) -> str:
+    """Run (name, coroutine_factory) attempts as a hedged race.
+
+    The first attempt starts immediately. The next one starts when every
+    running attempt has failed, or — if `hedge_after` is set — when the
+    budget elapses with nothing finished. The first non-empty result wins
+    and the rest are cancelled, which aborts their in-flight requests; tokens
+    a provider already spent on a cancelled request are still billed.
+    """
+    pending = set()
+    names = {}
+    next_index = 0
+
+    def launch():
+        nonlocal next_index
+        name, factory = attempts[next_index]
+        if next_index > 0:
+            record_fallback(attempts[next_index - 1][0], name)
+        task = asyncio.ensure_future(factory())
+        names[task] = name
+        pending.add(task)
+        next_index += 1
+
+    launch()
+    try:
+        while pending:
+            can_hedge = hedge_after is not None and next_index < len(attempts)
+            done, pending = await asyncio.wait(
+                pending, timeout=hedge_after if can_hedge else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                print(f"⏩ No answer from {', '.join(names[t] for t in pending)} in {hedge_after}s, hedging...")
+                record_hedge(attempts[next_index][0])
+                launch()
+                continue
+            for task in done:
+                if not task.cancelled() and task.exception() is None and task.result():
+                    return task.result()
+            if not pending and next_index < len(attempts):
+                launch()
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def generate_for_model(prompt: str, model: str, language: str, role_modifier: str, tier: str = None) -> str:
+    """Route generation to the selected model (Gemini or Qwen/Groq).
+
+    `tier` selects the hedging budget from HEDGE_POLICY.
+    """
+    hedge_after = HEDGE_POLICY.get(tier)
     if model == "qwen":
-        return await generate_notes_with_qwen3_raw(prompt, language, role_modifier)
-    else:
-        # Gemini with Qwen fallback
-        notes = await generate_notes_with_gemini_raw(prompt, language, role_modifier)
-        if not notes:
-            print("⚠️ Gemini failed, falling back to Qwen...")
-            notes = await generate_notes_with_qwen3_raw(prompt, language, role_modifier)
-        return notes
+        return await generate_notes_with_qwen3_raw(prompt, language, role_modifier, hedge_after)
+    # Gemini with Qwen fallback (raced in parallel once the hedge budget passes)
+    return await race_hedged([
+        ("gemini", lambda: generate_notes_with_gemini_raw(prompt, language, role_modifier)),
+        ("groq", lambda: generate_notes_with_qwen3_raw(prompt, language, role_modifier, hedge_after)),
+    ], hedge_after)
+
+GEMINI_MODEL = "gemini-2.0-flash"
+
+def _record_gemini_usage(response):
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        record_tokens("gemini", GEMINI_MODEL, getattr(usage, "prompt_token_count", 0),
+                      getattr(usage, "candidates_token_count", 0))
+
+def _record_groq_usage(model_id: str, response):
+    usage = getattr(response, "usage", None)
+    if usage:
+        record_tokens("groq", model_id, getattr(usage, "prompt_tokens", 0),
+                      getattr(usage, "completion_tokens", 0))
+
+def gemini_truncated(response) -> bool:
+    """True if Gemini stopped because it hit max_output_tokens."""
+    candidates = getattr(response, "candidates", None) or []
+    reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+    return "MAX_TOKENS" in str(getattr(reason, "name", reason) or "")
+
+async def gemini_generate(contents, health_key: str = f"gemini/{GEMINI_MODEL}"):
+    """One Gemini call behind the circuit breaker for `health_key`, retrying 429s.
+
+    Returns the response, or None if the circuit is open, the call failed or
+    the reply was empty.
+    """
+    if not model_health.acquire(health_key):
+        print(f"⏭️ Skipping {health_key}: circuit open")
+        return None
 
-async def generate_notes_with_gemini_raw(prompt: str, language: str = "English", role_modifier: str = "") -> str:
-    """Generate notes using Gemini with a pre-built prompt (no template replacement)."""
     retries = 3
     base_delay = 2
-    loop = asyncio.get_running_loop()
-    
+
+    start = time.perf_counter()
+    try:
+        for attempt in range(retries):
+            try:
+                client = get_gemini_client()
+                with span("llm_call", health_key) as sp:
+                    response = await client.aio.models.generate_content(
+                        model=GEMINI_MODEL,
+                        contents=contents,
+                        config=gemini_generation_config()
+                    )
+                    _record_gemini_usage(response)
+                    if not response.text:
+                        sp.outcome = "empty"
+                if response.text:
+                    model_health.record_success(health_key, time.perf_counter() - start)
+                    return response
+                model_health.record_failure(health_key, time.perf_counter() - start)
+                return None
+            except Exception as e:
+                error_msg = str(e)
+                if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
+                    if attempt < retries - 1:
+                        wait_time = base_delay * (2 ** attempt)
+                        print(f"⚠️ Gemini 429. Retrying in {wait_time}s...")
+                        record_retry("gemini")
+                        await asyncio.sleep(wait_time)
+                        continue
+                print(f"⚠️ Gemini call ({health_key}) failed: {e}")
+                model_health.record_failure(health_key, time.perf_counter() - start, e)
+                return None
+        return None
+    except asyncio.CancelledError:
+        model_health.release(health_key)
+        raise
+
+async def generate_notes_with_gemini_raw(prompt: str, language: str = "English", role_modifier: str = "") -> str:
+    """Generate notes using Gemini with a pre-built prompt (no template replacement)."""
     full_prompt = prompt
     if role_modifier:
         full_prompt = full_prompt + role_modifier
 
-    for attempt in range(retries):
-        try:
-            client = genai.Client(api_key=GEMINI_API_KEY)
-            response = await loop.run_in_executor(
-                None,
-                functools.partial(
-                    client.models.generate_content,
-                    model="gemini-2.0-flash",
-                    contents=full_prompt,
-                    config=types.GenerateContentConfig(
-                        temperature=0.7,
-                        max_output_tokens=8192,
-                    )
-                )
-            )
-            if response.text:
-                return response.text
-            return None
-        except Exception as e:
-            error_msg = str(e)
-            if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
-                if attempt < retries - 1:
-                    wait_time = base_delay * (2 ** attempt)
-                    print(f"⚠️ Gemini 429. Retrying in {wait_time}s...")
-                    await asyncio.sleep(wait_time)
-                    continue
-            print(f"⚠️ Gemini raw prompt failed: {e}")
-            return None
-    return None
+    response = await gemini_generate(full_prompt)
+    return response.text if response else None
+
+# Groq models in order of preference (all free-tier compatible)
+GROQ_MODELS = [
+    "qwen/qwen3-32b",
+    "meta-llama/llama-4-scout-17b-16e-instruct",
+    "mixtral-8x7b-32768",
+]
+
+async def generate_notes_with_qwen3_raw(prompt: str, language: str = "English", role_modifier: str = "",
+                                       hedge_after: float = None) -> str:
+    """Generate notes using Groq with a pre-built prompt (no template replacement).
 
-async def generate_notes_with_qwen3_raw(prompt: str, language: str = "English", role_modifier: str = "") -> str:
-    """Generate notes using Groq with a pre-built prompt (no template replacement)."""
+    Models in GROQ_MODELS are tried in order; with `hedge_after` set, a slow
+    model is raced against the next one instead of waited out.
+    """
     if not GROQ_API_KEY:
         print("⚠️ GROQ_API_KEY not set, skipping Qwen")
         return None
@@ -387,67 +794,254 @@ async def generate_notes_with_qwen3_raw(prompt: str, language: str = "English",
         if role_modifier:
             full_prompt = full_prompt + role_modifier
         
-        client = Groq(api_key=GROQ_API_KEY)
-        models_to_try = [
-            "qwen/qwen3-32b",
-            "meta-llama/llama-4-scout-17b-16e-instruct",
-            "mixtral-8x7b-32768",
-        ]
+        client = get_groq_client()
         messages = [
             {"role": "system", "content": "You are an expert educational note-taker."},
             {"role": "user", "content": full_prompt}
         ]
-        
-        loop = asyncio.get_running_loop()
-        for model_id in models_to_try:
+
+        async def call_model(model_id: str) -> str:
+            if not model_health.acquire(model_id):
+                print(f"⏭️ Skipping Groq model {model_id}: circuit open")
+                return None
+            start = time.perf_counter()
             try:
                 print(f"🤖 Trying Groq model: {model_id}")
-                response = await loop.run_in_executor(
-                    None,
-                    functools.partial(
-                        client.chat.completions.create,
+                with span("llm_call", f"groq/{model_id}") as sp:
+                    response = await client.chat.completions.create(
                         model=model_id,
                         messages=messages,
                         max_tokens=8192,
                         temperature=0.7,
                     )
-                )
-                if response.choices and response.choices[0].message.content:
-                    print(f"✅ Generated with Groq/{model_id}")
-                    return response.choices[0].message.content
+                    _record_groq_usage(model_id, response)
+                    if not (response.choices and response.choices[0].message.content):
+                        sp.outcome = "empty"
+                        model_health.record_failure(model_id, time.perf_counter() - start)
+                        return None
+                model_health.record_success(model_id, time.perf_counter() - start)
+                print(f"✅ Generated with Groq/{model_id}")
+                return response.choices[0].message.content
+            except asyncio.CancelledError:
+                model_health.release(model_id)
+                raise
             except Exception as model_err:
                 print(f"⚠️ Groq model {model_id} failed: {model_err}")
-                continue
-        return None
+                model_health.record_failure(model_id, time.perf_counter() - start, model_err)
+                return None
+
+        # Healthiest models first; open circuits cost nothing until their probe is due
+        models_to_try = model_health.order(GROQ_MODELS)
+        if not models_to_try:
+            print("⚠️ All Groq model circuits are open")
+            return None
+        notes = await race_hedged(
+            [(f"groq/{m}", functools.partial(call_model, m)) for m in models_to_try],
+            hedge_after,
+        )
+        if not notes:
+            print("❌ All Groq models failed.")
+        return notes
     except Exception as e:
         print(f"⚠️ Groq raw prompt failed entirely: {e}")
         return None
 
 
-async def process_note_generation(task_id: str, req: GenerateRequest, user_email: str, user_role: str):
-    """Background task to generate notes — supports any video length."""
+# ═══════ Gemini Direct Video Mode ═══════
+
+DIRECT_TRANSCRIPT_MARKER = "=== TRANSCRIPT ==="
+DIRECT_NOTES_MARKER = "=== NOTES ==="
+
+DIRECT_VIDEO_PROMPT = """Watch this YouTube video: {youtube_url}
+
+Reply with exactly two sections, in this order, each starting with its marker line.
+
+""" + DIRECT_NOTES_MARKER + """
+Comprehensive, professional notes entirely in {language}, with this structure:
+# 📺 Video Notes
+## 🎯 Main Topic
+## 📌 Key Points (numbered, with explanations and examples)
+## 🧠 Important Concepts (table format)
+## ⚡ Quick Summary
+## 🎓 Conclusion
+
+Use emojis, be detailed, include real-world examples.{role_mod}
+
+""" + DIRECT_TRANSCRIPT_MARKER + """
+A detailed, transcript-like account of the video in English (at most ~2500 words): what is said
+and shown, in order, paragraph by paragraph. Keep names, numbers, definitions and examples.
+Do not summarize into bullet points."""
+
+def split_direct_response(text: str) -> tuple:
+    """Split a direct-mode reply into (notes, description, complete).
+
+    The notes come first so a reply cut off at max_output_tokens loses the
+    description, not the notes. `complete` is False when a marker is missing
+    (the text is then returned as notes, uncached); description is None if
+    the model didn't write one.
+    """
+    head, marker, description = text.partition(DIRECT_TRANSCRIPT_MARKER)
+    notes_marker = DIRECT_NOTES_MARKER in head
+    notes = head.replace(DIRECT_NOTES_MARKER, "", 1).strip()
+    return notes, description.strip() or None, bool(marker) and notes_marker
+
+async def generate_direct_video_notes(video_id: str, language: str, role: str, role_mod: str) -> tuple:
+    """One Gemini video-understanding call; returns (notes, description).
+
+    With a missing marker the notes are returned for this task alone, uncached.
+    A reply cut off at max_output_tokens after the notes caches the notes but
+    not the (truncated) description.
+    """
+    prompt = DIRECT_VIDEO_PROMPT.format(
+        youtube_url=f"https://www.youtube.com/watch?v={video_id}", language=language, role_mod=role_mod
+    )
+    response = await gemini_generate(prompt, health_key=f"gemini_direct/{GEMINI_MODEL}")
+    if response is None:
+        return None, None
+    notes, description, complete = split_direct_response(strip_thinking(response.text))
+    if not notes:
+        return None, None
+    if not complete:
+        print(f"⚠️ Direct-mode reply for {video_id} is missing a section, not caching it")
+        return notes, None
+    if gemini_truncated(response):
+        print(f"⚠️ Direct-mode description for {video_id} was cut off, not caching it")
+        description = None
+    save_direct_result(video_id, language, role, notes, description)
+    return notes, description
+
+# In-flight direct calls in this worker, so concurrent tasks for the same
+# video/language/role wait for one Gemini call instead of each making their own
+_direct_inflight = {}
+
+async def direct_video_notes_once(video_id: str, language: str, role: str, role_mod: str) -> tuple:
+    key = direct_cache_key(video_id, language, role)
+    shared = _direct_inflight.get(key)
+    if shared is None:
+        shared = asyncio.ensure_future(generate_direct_video_notes(video_id, language, role, role_mod))
+        _direct_inflight[key] = shared
+        shared.add_done_callback(lambda _: _direct_inflight.pop(key, None))
+    else:
+        print(f"⏳ Waiting for the in-flight direct-video call for {video_id}")
+        record_cache("direct_inflight", True)
+    # A cancelled waiter must not cancel the call the others are waiting for
+    return await asyncio.shield(shared)
+
+
+async def process_note_generation(task_id: str, req: GenerateRequest, user_email: str, user_role: str,
+                                  claimed: bool = False, cost: int = None, metadata=None):
+    """Background task: hold the task lease (renewed by a heartbeat) while generating.
+
+    If this worker dies, the lease expires and another worker's recovery sweep
+    resumes the task from its last chunk checkpoint. `cost` is what admission
+    charged for the task; it is handed back to the user's in-flight cap when
+    the task ends.
+    """
+    try:
+        # Inside the try so the admission hold is returned even if the claim fails
+        if not claimed and not claim_task(task_id):
+            print(f"⏭️ Task {task_id} is owned by another worker, skipping")
+            return
+        async with task_heartbeat(task_id):
+            slot_cost = cost or DEFAULT_JOB_COST
+            if scheduler.busy(slot_cost):
+                update_task_status(task_id, "queued", {"step": "waiting_for_capacity"})
+            async with scheduler.slot(user_email or "", slot_cost):
+                await generate_task_notes(task_id, req, user_email, user_role, metadata)
+    except LeaseLost:
+        print(f"⏭️ Task {task_id} was taken over by another worker")
+    finally:
+        discard_task_step(task_id)
+        if cost and user_email:
+            release(user_email, cost)
+
+
+async def resume_task(task_id: str, task: dict):
+    """Restart an orphaned task (already claimed by the recovery sweep)."""
+    req = GenerateRequest(**task["request"])
+    await process_note_generation(task_id, req, task.get("user_email"), task.get("user_role", "student"),
+                                  claimed=True, cost=task.get("cost"))
+
+
+def admission_cost(metadata) -> tuple:
+    """(cost units, tier) of a job for admission control, from the metadata probe."""
+    if metadata is None:
+        return job_cost(None), None
+    if metadata.unavailable or metadata.is_live or metadata.is_upcoming:
+        return 1, None  # fails in the pre-check
+    if metadata.playable and not metadata.has_captions:
+        return job_cost(None, direct=True), None
+    if not metadata.duration_seconds:
+        return job_cost(None), None
+    plan = estimate_plan(metadata.estimated_chars)
+    return job_cost(plan), plan["tier"]
+
+
+async def generate_task_notes(task_id: str, req: GenerateRequest, user_email: str, user_role: str,
+                              metadata=None):
+    """Generate notes for one task — supports any video length.
+
+    `metadata` is the probe already made at admission; without it the video is probed here.
+    """
     try:
         # Step 1: Extract video ID
         update_task_status(task_id, "processing", {"step": "extracting_video_id"})
-        video_id = extract_video_id(req.youtube_url)
+        with span("extract_video_id"):
+            video_id = extract_video_id(req.youtube_url)
 
-        # Step 2: Fetch transcript (with Gemini direct fallback)
-        update_task_status(task_id, "processing", {"step": "fetching_transcript"})
+        # Step 2: Metadata pre-check (one player request): fail fast on dead or
+        # private videos and skip transcript methods when there are no captions
+        update_task_status(task_id, "processing", {"step": "checking_video"})
+        loop = asyncio.get_running_loop()
+        if metadata is None:
+            metadata = await loop.run_in_executor(None, probe_video, video_id)
+        video_fields = None
+        if metadata is not None:
+            if metadata.unavailable:
+                raise ValueError(f"Video unavailable: {metadata.reason or metadata.status}")
+            if metadata.is_live or metadata.is_upcoming:
+                raise ValueError("Live and upcoming streams have no transcript until the broadcast ends")
+            video_info = metadata.summary()
+            if metadata.duration_seconds:
+                video_info["plan"] = estimate_plan(metadata.estimated_chars)
+            print(f"🔎 {metadata.status}: {metadata.duration_seconds}s, captions {metadata.languages or 'none'}")
+            video_fields = {"video": video_info}
+
+        # Step 3: Fetch transcript (with Gemini direct fallback)
         transcript = None
+        transcript_language = None
         use_gemini_direct = False
-        
-        try:
-            transcript = get_transcript(video_id)
-            if len(transcript) < 50:
-                raise ValueError("Transcript too short")
-        except Exception as transcript_err:
-            print(f"⚠️ All transcript methods failed: {transcript_err}")
-            print("🎬 Falling back to Gemini direct YouTube video processing...")
+
+        if metadata is not None and metadata.playable and not metadata.has_captions:
+            print("🎬 No caption tracks — going straight to Gemini direct video processing")
             use_gemini_direct = True
+        else:
+            update_task_status(task_id, "processing", {"step": "fetching_transcript"}, fields=video_fields)
+            try:
+                transcript, transcript_language = await loop.run_in_executor(
+                    None, get_transcript, video_id, metadata, req.output_language
+                )
+                if len(transcript) < 50:
+                    raise ValueError("Transcript too short")
+            except Exception as transcript_err:
+                print(f"⚠️ All transcript methods failed: {transcript_err}")
+                print("🎬 Falling back to Gemini direct YouTube video processing...")
+                use_gemini_direct = True
         
+        # A description from an earlier direct-mode run stands in for the transcript
+        if use_gemini_direct:
+            direct_notes = get_cached_direct_notes(video_id, req.output_language, user_role)
+            if not direct_notes:
+                description = get_video_description(video_id)
+                if description:
+                    print(f"♻️ Using cached video description ({len(description)} chars) as transcript")
+                    transcript = description
+                    transcript_language = "en"
+                    use_gemini_direct = False
+
         # ═══════ GEMINI DIRECT MODE (no transcript needed) ═══════
         if use_gemini_direct:
-            update_task_status(task_id, "processing", {"step": "gemini_direct_video"})
+            update_task_status(task_id, "processing", {"step": "gemini_direct_video"}, fields=video_fields)
             
             role_instructions = {
                 "child": "\n\n🧒 AUDIENCE: CHILD. Use VERY SIMPLE language, fun analogies, emojis.",
@@ -456,44 +1050,21 @@ async def process_note_generation(task_id: str, req: GenerateRequest, user_email
                 "industry": "\n\n💼 AUDIENCE: PROFESSIONAL. Technical, actionable insights."
             }
             role_mod = role_instructions.get(user_role, role_instructions["student"])
-            
             youtube_url = f"https://www.youtube.com/watch?v={video_id}"
-            direct_prompt = f"""Watch this YouTube video and generate comprehensive, professional notes entirely in {req.output_language}.
-
-YouTube Video: {youtube_url}
 
-Generate notes with this structure:
-# 📺 Video Notes
-## 🎯 Main Topic
-## 📌 Key Points (numbered, with explanations and examples)
-## 🧠 Important Concepts (table format)
-## ⚡ Quick Summary
-## 🎓 Conclusion
-
-Use emojis, be detailed, include real-world examples.{role_mod}"""
-            
-            try:
-                loop = asyncio.get_running_loop()
-                client = genai.Client(api_key=GEMINI_API_KEY)
-                response = await loop.run_in_executor(
-                    None,
-                    functools.partial(
-                        client.models.generate_content,
-                        model="gemini-2.0-flash",
-                        contents=direct_prompt,
-                        config=types.GenerateContentConfig(
-                            temperature=0.7,
-                            max_output_tokens=8192,
-                        )
-                    )
-                )
-                notes = response.text if response.text else None
-            except Exception as gemini_err:
-                print(f"⚠️ Gemini direct also failed: {gemini_err}")
-                notes = None
+            notes = direct_notes
+            if notes:
+                print("♻️ Direct-mode notes reused from cache")
+            else:
+                try:
+                    notes, _ = await direct_video_notes_once(video_id, req.output_language, user_role, role_mod)
+                except Exception as gemini_err:
+                    print(f"⚠️ Gemini direct also failed: {gemini_err}")
+                    notes = None
                 
             if not notes:
                 # Last resort: try Qwen with a simple prompt
+                record_fallback("gemini_direct", "groq")
                 try:
                     notes = await generate_notes_with_qwen3_raw(
                         f"Generate comprehensive notes about a YouTube video (ID: {video_id}). "
@@ -508,7 +1079,7 @@ Use emojis, be detailed, include real-world examples.{role_mod}"""
                 raise ValueError("Could not generate notes — transcript fetch and direct video processing both failed.")
             
             # Strip model thinking tags (<think>...</think>)
-            notes = re.sub(r'<think>.*?</think>', '', notes, flags=re.DOTALL).strip()
+            notes = strip_thinking(notes)
             
             # Save and return
             title_line = notes.split('\n')[0][:80].strip('#').strip() if notes else "Untitled Notes"
@@ -543,9 +1114,23 @@ Use emojis, be detailed, include real-world examples.{role_mod}"""
             raise ValueError("Transcript is too short")
 
         transcript_len = len(transcript)
-        print(f"📏 Transcript length: {transcript_len} chars")
+        print(f"📏 Transcript length: {transcript_len} chars ({transcript_language or 'unknown language'})")
+        # A transcript already in the output language (native or YouTube-translated
+        # track) gets chunk notes in that language too, instead of a round trip
+        # through English that the merge would have to translate back
+        chunk_language = CHUNK_NOTES_LANGUAGE
+        output_code = language_code(req.output_language)
+        if not same_language(output_code, "en") and same_language(transcript_language, output_code):
+            chunk_language = req.output_language
+
+        # Keep the transcript searchable for follow-up questions (/api/ask)
+        try:
+            with span("vector_index"):
+                await asyncio.get_running_loop().run_in_executor(None, index_transcript, video_id, transcript)
+        except Exception as index_err:
+            print(f"⚠️ Q&A indexing failed: {index_err}")
 
-        # Step 3: Determine tier & role modifier
+        # Step 4: Determine tier & role modifier
         role_instructions = {
             "child": "\n\n🧒 AUDIENCE: CHILD (Under 13). Write in VERY SIMPLE language. Use fun analogies, cartoons, stories. Explain like talking to a 10-year-old. Use lots of emojis. Break complex ideas into tiny steps. Add 'Fun Fact!' sections.",
             "student": "\n\n🎓 AUDIENCE: STUDENT. Write in clear, educational language. Include step-by-step explanations, study tips, and exam-oriented key points. Use diagrams descriptions, mnemonics, and practice questions where possible.",
@@ -561,15 +1146,8 @@ Use emojis, be detailed, include real-world examples.{role_mod}"""
             print("📗 Tier: SHORT — sending full transcript")
             update_task_status(task_id, "processing", {"step": "generating_notes_short_video"})
             
-            prompt = GEMINI_PROMPT.replace("{language}", req.output_language).replace("TRANSCRIPT_PLACEHOLDER", transcript)
-            
-            if req.model == "qwen":
-                notes = await generate_notes_with_qwen3(transcript, req.output_language, role_modifier)
-            else:
-                notes = await generate_notes_with_gemini(transcript, GEMINI_API_KEY, req.output_language, role_modifier)
-                if not notes:
-                    print("⚠️ Gemini failed, falling back to Qwen...")
-                    notes = await generate_notes_with_qwen3(transcript, req.output_language, role_modifier)
+            prompt = build_notes_prompt(transcript, req.output_language)
+            notes = await generate_for_model(prompt, req.model, req.output_language, role_modifier, tier="short")
 
         # ═══════ TIER 2: MEDIUM VIDEO (12K-50K chars, ~15-60 min) ═══════
         elif transcript_len <= LONG_THRESHOLD:
@@ -578,95 +1156,125 @@ Use emojis, be detailed, include real-world examples.{role_mod}"""
             total_chunks = len(chunks)
             print(f"📦 Split into {total_chunks} chunks")
             
+            checkpoint = load_checkpoint(task_id)
             chunk_notes_list = []
             for i, chunk in enumerate(chunks, 1):
                 update_task_status(task_id, "processing", {"step": f"generating_chunk_{i}_of_{total_chunks}"})
                 print(f"🔄 Processing chunk {i}/{total_chunks} ({len(chunk)} chars)")
                 
+                variant = chunk_variant("summary", chunk_language)
+                cache_key = chunk_cache_key(variant, chunk)
+                chunk_result = checkpoint.get(cache_key) or get_cached_chunk_notes(cache_key)
+                if chunk_result:
+                    print(f"♻️ Chunk {i} notes reused from checkpoint/cache")
+                    chunk_notes_list.append(chunk_result)
+                    continue
+                
                 chunk_prompt = CHUNK_SUMMARY_PROMPT.format(
                     chunk_num=i, total_chunks=total_chunks,
-                    language=req.output_language, transcript=chunk
+                    language=chunk_language, transcript=chunk
                 )
                 
-                chunk_result = await generate_for_model(chunk_prompt, req.model, req.output_language, role_modifier)
+                with span("chunk", "medium"):
+                    chunk_result = await generate_for_model(chunk_prompt, req.model, chunk_language, "", tier="medium")
                 if chunk_result:
+                    chunk_result = strip_thinking(chunk_result)
+                    save_chunk_notes(cache_key, variant, chunk_result)
+                    save_checkpoint(task_id, cache_key, chunk_result)
                     chunk_notes_list.append(chunk_result)
                 else:
                     print(f"⚠️ Chunk {i} failed, skipping...")
                 
                 # Small delay between chunks to respect rate limits
                 if i < total_chunks:
-                    await asyncio.sleep(2)
+                    await asyncio.sleep(MEDIUM_CHUNK_DELAY)
             
             if not chunk_notes_list:
                 raise ValueError("All chunks failed to generate notes")
             
-            # Merge chunk notes
+            # Merge chunk notes — the only step that depends on language and role
             update_task_status(task_id, "processing", {"step": "merging_notes"})
             combined = "\n\n---\n\n".join(chunk_notes_list)
             
-            if len(chunk_notes_list) == 1:
-                notes = chunk_notes_list[0]
-            else:
-                merge_prompt = MERGE_PROMPT.format(language=req.output_language, chunk_notes=combined)
-                notes = await generate_for_model(merge_prompt, req.model, req.output_language, "")
-                
-                # If merge fails, just concatenate
-                if not notes:
-                    print("⚠️ Merge failed, concatenating chunk notes...")
-                    notes = f"# 📺 Video Notes\n\n{combined}"
+            merge_prompt = MERGE_PROMPT.format(language=req.output_language, chunk_notes=combined)
+            with span("merge", "medium"):
+                notes = await generate_for_model(merge_prompt, req.model, req.output_language, role_modifier, tier="merge")
+            
+            # If merge fails, concatenate (only if the chunks are in the output language)
+            if not notes:
+                print("⚠️ Merge failed, concatenating chunk notes...")
+                notes = concatenated_notes("📺 Video Notes", combined, chunk_language, req.output_language)
 
         # ═══════ TIER 3: LONG VIDEO (> 50K chars, ~> 60 min) ═══════
         else:
             print(f"📕 Tier: LONG — extracting key points only ({transcript_len} chars)")
-            chunks = chunk_transcript(transcript)
+            # Strip caption noise (and optionally rank sentences) before paying for LLM calls
+            with span("compress", TRANSCRIPT_COMPRESSION):
+                compressed = await asyncio.get_running_loop().run_in_executor(None, compress_transcript, transcript)
+            print(f"🗜️ Compressed transcript: {transcript_len} → {len(compressed)} chars")
+            if len(compressed) < transcript_len * TRANSCRIPT_MIN_KEEP:
+                print("⚠️ Compression left almost nothing, using the full transcript")
+                compressed = transcript
+            chunks = chunk_transcript(compressed)
             total_chunks = len(chunks)
             print(f"📦 Split into {total_chunks} chunks (key-points mode)")
             
+            checkpoint = load_checkpoint(task_id)
             chunk_notes_list = []
             for i, chunk in enumerate(chunks, 1):
                 update_task_status(task_id, "processing", {"step": f"extracting_keypoints_{i}_of_{total_chunks}"})
                 print(f"🔑 Extracting key points from chunk {i}/{total_chunks} ({len(chunk)} chars)")
                 
+                variant = chunk_variant("keypoints", chunk_language)
+                cache_key = chunk_cache_key(variant, chunk)
+                chunk_result = checkpoint.get(cache_key) or get_cached_chunk_notes(cache_key)
+                if chunk_result:
+                    print(f"♻️ Chunk {i} key points reused from checkpoint/cache")
+                    chunk_notes_list.append(chunk_result)
+                    continue
+                
                 chunk_prompt = KEY_POINTS_PROMPT.format(
                     chunk_num=i, total_chunks=total_chunks,
-                    language=req.output_language, transcript=chunk
+                    language=chunk_language, transcript=chunk
                 )
                 
-                chunk_result = await generate_for_model(chunk_prompt, req.model, req.output_language, role_modifier)
+                with span("chunk", "long"):
+                    chunk_result = await generate_for_model(chunk_prompt, req.model, chunk_language, "", tier="long")
                 if chunk_result:
+                    chunk_result = strip_thinking(chunk_result)
+                    save_chunk_notes(cache_key, variant, chunk_result)
+                    save_checkpoint(task_id, cache_key, chunk_result)
                     chunk_notes_list.append(chunk_result)
                 else:
                     print(f"⚠️ Chunk {i} key-points failed, skipping...")
                 
                 # Longer delay for long videos to respect rate limits
                 if i < total_chunks:
-                    await asyncio.sleep(3)
+                    await asyncio.sleep(LONG_CHUNK_DELAY)
             
             if not chunk_notes_list:
                 raise ValueError("All chunks failed to extract key points")
             
-            # Merge key points
+            # Merge key points — the only step that depends on language and role
             update_task_status(task_id, "processing", {"step": "merging_key_points"})
             combined = "\n\n---\n\n".join(chunk_notes_list)
             
-            if len(chunk_notes_list) == 1:
-                notes = chunk_notes_list[0]
-            else:
-                merge_prompt = MERGE_PROMPT.format(language=req.output_language, chunk_notes=combined)
-                notes = await generate_for_model(merge_prompt, req.model, req.output_language, "")
-                
-                if not notes:
-                    print("⚠️ Merge failed, concatenating key points...")
-                    notes = f"# 📺 Video Notes (Key Points)\n\n{combined}"
+            merge_prompt = MERGE_PROMPT.format(language=req.output_language, chunk_notes=combined)
+            with span("merge", "long"):
+                notes = await generate_for_model(merge_prompt, req.model, req.output_language, role_modifier, tier="merge")
+            
+            if not notes:
+                print("⚠️ Merge failed, concatenating key points...")
+                notes = concatenated_notes("📺 Video Notes (Key Points)", combined, chunk_language,
+                                           req.output_language)
 
         if not notes:
             raise ValueError("AI generation failed with selected model")
         
         # Strip model thinking tags (<think>...</think>)
-        notes = re.sub(r'<think>.*?</think>', '', notes, flags=re.DOTALL).strip()
+        notes = strip_thinking(notes)
 
-        # Step 4: Save History
+        # Step 5: Save History
         update_task_status(task_id, "processing", {"step": "saving_history"})
         title_line = notes.split('\n')[0][:80].strip('#').strip() if notes else "Untitled Notes"
         
@@ -707,267 +1315,304 @@ def create_token(email: str, name: str) -> str:
     }
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
+# Decoded JWT payloads keyed by raw token, bounded by size and token expiry
+TOKEN_CACHE_SIZE = 1024
+_token_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
 def verify_token(token: str) -> dict:
-    """Verify and decode a JWT token."""
+    """Verify and decode a JWT token (cached until the token expires)."""
+    now = time.time()
+    with _token_cache_lock:
+        cached = _token_cache.get(token)
+        if cached is not None:
+            payload, expires_at = cached
+            if expires_at > now:
+                _token_cache.move_to_end(token)
+                record_cache("jwt", True)
+                return payload
+            del _token_cache[token]
+    record_cache("jwt", False)
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
+    expires_at = payload.get("exp")
+    if isinstance(expires_at, (int, float)):
+        with _token_cache_lock:
+            _token_cache[token] = (payload, float(expires_at))
+            _token_cache.move_to_end(token)
+            while len(_token_cache) > TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+    return payload
+
+def _bearer_payload(request: Request, missing_detail: str) -> dict:
+    auth_header = request.headers.get("Authorization", "")
+    if not auth_header.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail=missing_detail)
+    return verify_token(auth_header[7:])
+
+async def get_current_user(request: Request) -> dict:
+    """FastAPI dependency: parse the Bearer header and return the JWT payload."""
+    return _bearer_payload(request, "Missing token")
+
+async def get_generating_user(request: Request) -> dict:
+    """get_current_user with the 401 message /api/generate has always returned."""
+    return _bearer_payload(request, "Authentication required")
+
+# ═══════ Google ID-Token Verification ═══════
+
+GOOGLE_CERTS_TTL = 3600  # Fallback cache lifetime when Google sends no max-age
+# Where google-auth fetches the signing certs for verify_oauth2_token
+GOOGLE_OAUTH2_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+
+class _CachingGoogleRequest:
+    """google-auth transport that reuses one HTTP session and caches GET responses
+    (Google's signing certs) for as long as their Cache-Control max-age allows."""
+
+    def __init__(self):
+        from google.auth.transport import requests as google_requests
+        self._request = google_requests.Request()
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, url, method="GET", body=None, headers=None, timeout=None, **kwargs):
+        if method != "GET" or body is not None:
+            return self._request(url, method=method, body=body, headers=headers, timeout=timeout, **kwargs)
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(url)
+            if cached and cached[1] > now:
+                record_cache("google_certs", True)
+                return cached[0]
+        record_cache("google_certs", False)
+        response = self._request(url, method=method, headers=headers, timeout=timeout, **kwargs)
+        if response.status == 200:
+            ttl = GOOGLE_CERTS_TTL
+            match = re.search(r"max-age=(\d+)", response.headers.get("cache-control", ""))
+            if match:
+                ttl = int(match.group(1))
+            with self._lock:
+                self._cache[url] = (response, now + ttl)
+        return response
+
+@functools.lru_cache(maxsize=1)
+def google_auth_request() -> _CachingGoogleRequest:
+    """Shared, cert-caching transport for Google ID-token verification."""
+    return _CachingGoogleRequest()
+
+def verify_google_id_token(id_token_str: str) -> dict:
+    """Verify a Google ID token against the cached Google certs."""
+    from google.oauth2 import id_token
+    return id_token.verify_oauth2_token(id_token_str, google_auth_request())
+
+def prewarm_google_certs():
+    """Fetch Google's OAuth2 signing certs once so the first login doesn't pay for it."""
+    try:
+        google_auth_request()(GOOGLE_OAUTH2_CERTS_URL)
+        print("✅ Google OAuth certs pre-warmed")
+    except Exception as e:
+        print(f"⚠️ Failed to pre-warm Google certs: {e}")
+
 def extract_video_id(url: str) -> str:
     """Extract YouTube video ID from various URL formats, including encoded URLs."""
-    # Step 1: Decode any URL-encoded characters (%3F -> ?, %3D -> =, etc.)
-    url = unquote(url).strip()
-    
-    # Step 2: Try parsing as a proper URL first (most reliable)
     try:
-        parsed = urlparse(url)
-        if parsed.hostname in ('www.youtube.com', 'youtube.com', 'm.youtube.com'):
-            if parsed.path == '/watch':
-                qs = parse_qs(parsed.query)
-                if 'v' in qs:
-                    vid = qs['v'][0]
-                    if re.match(r'^[a-zA-Z0-9_-]{11}$', vid):
-                        return vid
-            # Handle /embed/, /shorts/, /v/ paths
-            for prefix in ('/embed/', '/shorts/', '/v/'):
-                if parsed.path.startswith(prefix):
-                    vid = parsed.path[len(prefix):].split('/')[0].split('?')[0]
-                    if re.match(r'^[a-zA-Z0-9_-]{11}$', vid):
-                        return vid
-        elif parsed.hostname == 'youtu.be':
-            vid = parsed.path.lstrip('/').split('/')[0].split('?')[0]
-            if re.match(r'^[a-zA-Z0-9_-]{11}$', vid):
-                return vid
+        return parse_video_id(url)
+    except VideoRefError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def fetch_caption_track(caps: list, egress=None, target: str = None) -> tuple:
+    """Download the best caption track for `target` (a language code) as (text, format, language).
+
+    Native track first, then YouTube's translation (tlang), then English or
+    the first track (see caption_language.rank_tracks). Each is tried as the
+    default timedtext XML, then JSON3; (None, None, None) if nothing parses.
+    `egress` is the identity that fetched the track list; it is tried first,
+    the rest of the pool only if it is blocked.
+    """
+    for choice in rank_tracks(caps, target):
+        if not choice.track.get("baseUrl"):
+            continue
+        full_text, fmt = get_egress_pool().call(
+            lambda identity: _download_caption_track(identity.http, choice.url), prefer=egress
+        )
+        if full_text:
+            return full_text, f"{choice.language}{'/tlang' if choice.tlang else ''} {fmt}", choice.language
+    return None, None, None
+
+def _download_caption_track(http, cap_url: str) -> tuple:
+    # Default XML format, parsed as the body streams in
+    try:
+        with http.stream("GET", cap_url) as cap_resp:
+            if cap_resp.status_code in (403, 429):
+                raise EgressBlocked(f"timedtext HTTP {cap_resp.status_code}")
+            cap_resp.raise_for_status()
+            full_text = parse_caption_stream(cap_resp.iter_bytes(), "xml")
+        if full_text:
+            return full_text, "xml"
+    except CaptionParseError:
+        pass
+
+    try:
+        json3_url = cap_url + ("&fmt=json3" if "fmt=" not in cap_url else "")
+        with http.stream("GET", json3_url) as j3_resp:
+            full_text = parse_caption_stream(j3_resp.iter_bytes(), "json3")
+        if full_text:
+            return full_text, "json3"
     except Exception:
         pass
-    
-    # Step 3: Fallback regex patterns for edge cases
-    patterns = [
-        r'(?:youtube\.com\/watch\?v=)([a-zA-Z0-9_-]{11})',
-        r'(?:youtu\.be\/)([a-zA-Z0-9_-]{11})',
-        r'(?:youtube\.com\/embed\/)([a-zA-Z0-9_-]{11})',
-        r'(?:youtube\.com\/shorts\/)([a-zA-Z0-9_-]{11})',
-        r'(?:youtube\.com\/v\/)([a-zA-Z0-9_-]{11})',
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    raise HTTPException(
-        status_code=400,
-        detail="Invalid YouTube URL. Please provide a valid YouTube video link."
-    )
+    return None, None
 
-def get_transcript(video_id: str) -> str:
-    """Fetch transcript with 3 fallback methods to bypass YouTube cloud IP blocks."""
-    cookies_content = os.getenv("YOUTUBE_COOKIES")
-    proxy_url = os.getenv("YOUTUBE_PROXY")
-    cookie_file_path = None
-    
-    if cookies_content:
+def fetch_transcript_api(api, video_id: str, target: str = None):
+    """youtube-transcript-api fetch of the best transcript for `target` (see rank_tracks).
+
+    Block signals are re-raised for the egress pool; other errors move on to
+    the next choice. None if nothing could be fetched.
+    """
+    try:
+        listed = list(api.list(video_id))
+    except Exception as e:
+        if is_block_signal(e):
+            raise
+        return None
+    tracks = [
+        {"languageCode": t.language_code, "kind": "asr" if t.is_generated else "",
+         "isTranslatable": t.is_translatable, "transcript": t}
+        for t in listed
+    ]
+    for choice in rank_tracks(tracks, target):
+        transcript = choice.track["transcript"]
         try:
-            fd, cookie_file_path = tempfile.mkstemp(suffix=".txt", text=True)
-            with os.fdopen(fd, "w") as f:
-                f.write(cookies_content)
+            return (transcript.translate(choice.tlang) if choice.tlang else transcript).fetch()
         except Exception as e:
-            print(f"⚠️ Failed to create cookie file: {e}")
+            if is_block_signal(e):
+                raise
+    return None
+
+def get_transcript(video_id: str, metadata=None, language: str = None) -> tuple:
+    """Fetch transcript with 3 fallback methods to bypass YouTube cloud IP blocks.
+
+    Returns (text, language code of the text). With `language` (an output
+    language such as "Hindi") a native track in that language is preferred,
+    then YouTube's own translation of another track; otherwise English.
 
+    `metadata` (from probe_video) supplies caption tracks from a player
+    response that was already fetched; they, or a track list cached for the
+    video, are tried before anything else. Every method goes out through the
+    egress pool (see egress.py).
+    """
+    pool = get_egress_pool()
+    target = language_code(language)
     try:
+        # ─── Caption tracks from the metadata probe or the track cache (no extra player call) ───
+        known = None
+        if metadata is not None and metadata.has_captions:
+            known = (metadata.caption_tracks, metadata.egress, f"probed_{metadata.client}")
+        else:
+            cached = cached_tracks(video_id)
+            if cached:
+                known = (*cached, "cached_tracks")
+        if known:
+            caps, egress, label = known
+            try:
+                with span("transcript", label) as sp:
+                    sp.outcome = "miss"
+                    full_text, fmt, text_language = fetch_caption_track(caps, egress, target)
+                    if full_text:
+                        print(f"✅ Known caption tracks ({label} {fmt}): {len(full_text)} chars")
+                        sp.outcome = "ok"
+                        return full_text, text_language
+            except Exception as e:
+                print(f"⚠️ Known caption tracks failed: {e}")
+
         # ─── Method 1: youtube-transcript-api v1.2+ ───
         try:
-            api = YouTubeTranscriptApi()
-            transcript_result = None
-            try:
-                transcript_result = api.fetch(video_id, languages=['en'])
-            except Exception:
-                try:
-                    transcript_result = api.fetch(video_id)
-                except Exception:
-                    pass
-            
-            if transcript_result and transcript_result.snippets:
-                full_text = " ".join([s.text for s in transcript_result.snippets])
-                if full_text.strip():
-                    print(f"✅ Method 1 (youtube-transcript-api): {len(full_text)} chars")
-                    return full_text
+            with span("transcript", "youtube_transcript_api") as sp:
+                sp.outcome = "miss"
+                from youtube_transcript_api import YouTubeTranscriptApi
+
+                transcript_result = pool.call(
+                    lambda identity: fetch_transcript_api(YouTubeTranscriptApi(http_client=identity.session),
+                                                          video_id, target)
+                )
+
+                if transcript_result and transcript_result.snippets:
+                    full_text = decode_snippets(s.text for s in transcript_result.snippets)
+                    if full_text.strip():
+                        print(f"✅ Method 1 (youtube-transcript-api {transcript_result.language_code}): "
+                              f"{len(full_text)} chars")
+                        sp.outcome = "ok"
+                        return full_text, transcript_result.language_code
             
-            raise Exception("Empty result")
+                raise Exception("Empty result")
         except Exception as e:
             print(f"⚠️ Method 1 failed: {e}")
 
         # ─── Method 2: YouTube Innertube Player API (multiple client types) ───
-        innertube_clients = [
-            {
-                "name": "ANDROID",
-                "client": {"clientName": "ANDROID", "clientVersion": "19.09.37", "androidSdkVersion": 30, "hl": "en", "gl": "US"},
-                "ua": "com.google.android.youtube/19.09.37 (Linux; U; Android 11)"
-            },
-            {
-                "name": "IOS",
-                "client": {"clientName": "IOS", "clientVersion": "19.09.3", "deviceModel": "iPhone14,3", "hl": "en", "gl": "US"},
-                "ua": "com.google.ios.youtube/19.09.3 (iPhone14,3; U; CPU iPhone OS 15_6 like Mac OS X)"
-            },
-            {
-                "name": "MWEB",
-                "client": {"clientName": "MWEB", "clientVersion": "2.20241201.00.00", "hl": "en", "gl": "US"},
-                "ua": "Mozilla/5.0 (Linux; Android 11; Pixel 5) AppleWebKit/537.36 Chrome/120.0.0.0 Mobile Safari/537.36"
-            },
-            {
-                "name": "TV_EMBED",
-                "client": {"clientName": "TVHTML5_SIMPLY_EMBEDDED_PLAYER", "clientVersion": "2.0", "hl": "en", "gl": "US"},
-                "ua": "Mozilla/5.0"
-            },
-            {
-                "name": "WEB",
-                "client": {"clientName": "WEB", "clientVersion": "2.20241201.00.00", "hl": "en", "gl": "US"},
-                "ua": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            },
-        ]
-        import xml.etree.ElementTree as ET
-        for ic in innertube_clients:
+        for ic in INNERTUBE_CLIENTS:
             try:
-                print(f"🔄 Trying innertube ({ic['name']})...")
-                resp = httpx.post(
-                    "https://www.youtube.com/youtubei/v1/player?prettyPrint=false",
-                    json={"context": {"client": ic["client"]}, "videoId": video_id},
-                    headers={"Content-Type": "application/json", "User-Agent": ic["ua"]},
-                    timeout=15
-                )
-                if resp.status_code != 200:
-                    continue
-                data = resp.json()
-                caps = data.get("captions", {}).get("playerCaptionsTracklistRenderer", {}).get("captionTracks", [])
-                if not caps:
-                    print(f"  {ic['name']}: no captions")
-                    continue
-                
-                # Prefer English
-                cap_url = None
-                for track in caps:
-                    if track.get("languageCode", "").startswith("en"):
-                        cap_url = track.get("baseUrl")
-                        break
-                if not cap_url:
-                    cap_url = caps[0].get("baseUrl")
-                if not cap_url:
-                    continue
-                
-                # Fetch captions (default XML format)
-                cap_resp = httpx.get(cap_url, timeout=15)
-                cap_resp.raise_for_status()
+                with span("transcript", f"innertube_{ic['name']}") as sp:
+                    sp.outcome = "miss"
+                    print(f"🔄 Trying innertube ({ic['name']})...")
+                    data, identity = fetch_player_response(ic, video_id)
+                    if data is None:
+                        sp.outcome = "http_error"
+                        continue
+                    caps = caption_tracks(data)
+                    if not caps:
+                        print(f"  {ic['name']}: no captions")
+                        sp.outcome = "no_captions"
+                        continue
+                    remember_tracks(video_id, caps, identity)
                 
-                # Try XML parsing
-                try:
-                    root = ET.fromstring(cap_resp.text)
-                    texts = [e.text.strip() for e in root.iter("text") if e.text]
-                    if texts:
-                        full_text = " ".join(texts)
-                        print(f"✅ Method 2 (innertube/{ic['name']}): {len(full_text)} chars")
-                        return full_text
-                except ET.ParseError:
-                    pass
-                
-                # Try JSON3
-                try:
-                    json3_url = cap_url + ("&fmt=json3" if "fmt=" not in cap_url else "")
-                    j3_resp = httpx.get(json3_url, timeout=15)
-                    cap_json = j3_resp.json()
-                    texts = []
-                    for event in cap_json.get("events", []):
-                        for seg in event.get("segs", []):
-                            t = seg.get("utf8", "").strip()
-                            if t and t != "\n":
-                                texts.append(t)
-                    if texts:
-                        full_text = " ".join(texts)
-                        print(f"✅ Method 2 (innertube/{ic['name']} JSON3): {len(full_text)} chars")
-                        return full_text
-                except Exception:
-                    pass
+                    full_text, fmt, text_language = fetch_caption_track(caps, identity, target)
+                    if full_text:
+                        print(f"✅ Method 2 (innertube/{ic['name']} {fmt}): {len(full_text)} chars")
+                        sp.outcome = "ok"
+                        return full_text, text_language
                     
             except Exception as e:
                 print(f"  {ic['name']}: {e}")
         print("⚠️ Method 2 (all innertube clients) failed")
 
-        # ─── Method 3: yt-dlp fallback ───
+        # ─── Method 3: yt-dlp fallback (pooled extractor, subtitles only) ───
         try:
-            print("🔄 Trying yt-dlp fallback...")
-            url = f"https://www.youtube.com/watch?v={video_id}"
-            ydl_opts = {
-                'skip_download': True,
-                'writesubtitles': True,
-                'writeautomaticsub': True,
-                'subtitleslangs': ['en'],
-                'quiet': True,
-                'no_warnings': True,
-                'ignore_no_formats_error': True,
-                'format': 'best',
-            }
-            if cookie_file_path:
-                ydl_opts['cookiefile'] = cookie_file_path
-            if proxy_url:
-                ydl_opts['proxy'] = proxy_url
-
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                subs = info.get('subtitles') or info.get('automatic_captions')
-                
-                if subs:
-                    sub_entries = subs.get('en') or next(iter(subs.values()), None)
-                    if sub_entries:
-                        sub_url = None
-                        for entry in sub_entries:
-                            if entry.get('ext') == 'json3':
-                                sub_url = entry.get('url')
-                                break
-                        if not sub_url:
-                            for entry in sub_entries:
-                                if entry.get('ext') == 'vtt':
-                                    sub_url = entry.get('url')
-                                    break
-                        if not sub_url and sub_entries:
-                            sub_url = sub_entries[0].get('url')
-                        
-                        if sub_url:
-                            sub_resp = httpx.get(sub_url, timeout=15)
-                            sub_resp.raise_for_status()
-                            content = sub_resp.text
-                            
-                            try:
-                                sub_json = json.loads(content)
-                                events = sub_json.get('events', [])
-                                texts = []
-                                for event in events:
-                                    for seg in event.get('segs', []):
-                                        text = seg.get('utf8', '').strip()
-                                        if text and text != '\n':
-                                            texts.append(text)
-                                if texts:
-                                    full_text = " ".join(texts)
-                                    print(f"✅ Method 3 (yt-dlp): {len(full_text)} chars")
-                                    return full_text
-                            except (json.JSONDecodeError, AttributeError):
-                                pass
-                            
-                            lines = content.split('\n')
-                            text_lines = []
-                            for line in lines:
-                                line = line.strip()
-                                if not line or '-->' in line or line.startswith('WEBVTT') or line.startswith('Kind:') or line.startswith('Language:') or line.isdigit():
-                                    continue
-                                clean = re.sub(r'<[^>]+>', '', line)
-                                if clean.strip():
-                                    text_lines.append(clean.strip())
-                            if text_lines:
-                                full_text = " ".join(text_lines)
-                                print(f"✅ Method 3 (yt-dlp VTT): {len(full_text)} chars")
-                                return full_text
-                    
-                    raise Exception("Found subtitles but couldn't extract text")
-                else: 
+            with span("transcript", "yt_dlp") as sp:
+                sp.outcome = "miss"
+                print("🔄 Trying yt-dlp fallback...")
+                tracks = fetch_subtitle_tracks(video_id)
+                candidates = rank_subtitle_languages(tracks, target)
+                if not candidates:
                     raise Exception("No subtitles found via yt-dlp")
+
+                for sub_language, sub_entries, _ in candidates:
+                    if not sub_entries:
+                        continue
+                    # Prefer JSON3, then VTT, then whatever is listed first
+                    chosen = (next((e for e in sub_entries if e.get('ext') == 'json3'), None)
+                              or next((e for e in sub_entries if e.get('ext') == 'vtt'), None)
+                              or sub_entries[0])
+                    sub_url = chosen.get('url')
+                    sub_ext = chosen.get('ext') or 'vtt'
+                    if not sub_url:
+                        continue
+                    try:
+                        def download(identity):
+                            with identity.http.stream("GET", sub_url) as sub_resp:
+                                sub_resp.raise_for_status()
+                                return parse_caption_stream(sub_resp.iter_bytes(), sub_ext)
+
+                        full_text = pool.call(download, prefer=tracks["egress"])
+                        if full_text:
+                            print(f"✅ Method 3 (yt-dlp {sub_language} {sub_ext}): {len(full_text)} chars")
+                            sp.outcome = "ok"
+                            return full_text, sub_language
+                    except CaptionParseError as parse_err:
+                        print(f"⚠️ yt-dlp {sub_language} {sub_ext} captions unreadable: {parse_err}")
+
+                raise Exception("Found subtitles but couldn't extract text")
         except Exception as e:
             print(f"⚠️ Method 3 (yt-dlp) failed: {e}")
 
@@ -980,13 +1625,6 @@ def get_transcript(video_id: str) -> str:
         if "Could not retrieve a transcript" in error_msg:
             raise HTTPException(status_code=404, detail="No transcript available (Captions disabled).")
         raise HTTPException(status_code=500, detail=f"Failed to fetch transcript: {error_msg}")
-    
-    finally:
-        if cookie_file_path and os.path.exists(cookie_file_path):
-            try:
-                os.remove(cookie_file_path)
-            except Exception as e:
-                print(f"⚠️ Failed to remove temp cookie file: {e}")
 
 
 
@@ -1052,125 +1690,24 @@ Here is the transcript to analyze:
 TRANSCRIPT_PLACEHOLDER
 """
 
-async def generate_notes_with_gemini(transcript: str, api_key: str, language: str = "English", role_modifier: str = "") -> str:
-    """Generate detailed notes using Google Gemini AI (Non-blocking)."""
-    retries = 3
-    base_delay = 2
-    loop = asyncio.get_running_loop()
-
-    for attempt in range(retries):
-        try:
-            client = genai.Client(api_key=GEMINI_API_KEY)
-            prompt = GEMINI_PROMPT.replace("{language}", language).replace("TRANSCRIPT_PLACEHOLDER", transcript)
-            if role_modifier:
-                prompt = prompt + role_modifier
-
-            # Run blocking call in executor
-            response = await loop.run_in_executor(
-                None,
-                functools.partial(
-                    client.models.generate_content,
-                    model="gemini-2.0-flash",
-                    contents=prompt,
-                    config=types.GenerateContentConfig(
-                        temperature=0.7,
-                        max_output_tokens=8192,
-                    )
-                )
-            )
-
-            if response.text:
-                return response.text
-            return None
-
-        except Exception as e:
-            error_msg = str(e)
-            if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
-                if attempt < retries - 1:
-                    wait_time = base_delay * (2 ** attempt)
-                    print(f"⚠️ Gemini 429. Retrying in {wait_time}s...")
-                    await asyncio.sleep(wait_time)
-                    continue
-            print(f"⚠️ Gemini failed: {e}")
-            # Fallback
-            print("🔄 Switching to Qwen fallback...")
-            return await generate_notes_with_qwen3(transcript, language, role_modifier)
-    
-    return await generate_notes_with_qwen3(transcript, language, role_modifier)
-
-
-async def generate_notes_with_qwen3(transcript: str, language: str = "English", role_modifier: str = "") -> str:
-    """Fallback: Generate notes using Qwen3 via Groq Cloud API (Non-blocking)."""
-    if not GROQ_API_KEY:
-        print("⚠️ GROQ_API_KEY not set, skipping Qwen")
-        return None
-
-    try:
-        prompt = GEMINI_PROMPT.replace("{language}", language).replace("TRANSCRIPT_PLACEHOLDER", transcript)
-        if role_modifier:
-            prompt = prompt + role_modifier
-
-        client = Groq(api_key=GROQ_API_KEY)
-
-        # Try Groq models in order of preference (all free-tier compatible)
-        models_to_try = [
-            "qwen/qwen3-32b",
-            "meta-llama/llama-4-scout-17b-16e-instruct",
-            "mixtral-8x7b-32768",
-        ]
-
-        messages = [
-            {"role": "system", "content": "You are an expert educational note-taker."},
-            {"role": "user", "content": prompt}
-        ]
-
-        last_error = None
-        loop = asyncio.get_running_loop()
-
-        for model_id in models_to_try:
-            try:
-                print(f"🤖 Trying Groq model: {model_id}")
-                response = await loop.run_in_executor(
-                    None,
-                    functools.partial(
-                        client.chat.completions.create,
-                        model=model_id,
-                        messages=messages,
-                        max_tokens=8192,
-                        temperature=0.7,
-                    )
-                )
-
-                if response.choices and response.choices[0].message.content:
-                    print(f"✅ Successfully generated with Groq/{model_id}")
-                    return response.choices[0].message.content
-                    
-            except Exception as model_err:
-                last_error = model_err
-                print(f"⚠️ Groq model {model_id} failed: {model_err}")
-                continue
-
-        print(f"❌ All Groq models failed. Last error: {last_error}")
-        return None
-
-    except Exception as e:
-        print(f"⚠️ Groq generation failed entirely: {e}")
-        return None
+def build_notes_prompt(transcript: str, language: str) -> str:
+    """Fill GEMINI_PROMPT for a single-pass (short video) generation."""
+    return GEMINI_PROMPT.replace("{language}", language).replace("TRANSCRIPT_PLACEHOLDER", transcript)
 
 @app.get("/", response_class=HTMLResponse)
-async def root():
-    """Redirect to login page."""
-    return """<html><head><meta http-equiv="refresh" content="0;url=/static/login.html"></head></html>"""
+async def root(request: Request):
+    """Serve login page."""
+    return page_response("login.html", request)
 
 @app.get("/login", response_class=HTMLResponse)
-async def login_page():
+async def login_page(request: Request):
     """Serve login page."""
-    return """<html><head><meta http-equiv="refresh" content="0;url=/static/login.html"></head></html>"""
+    return page_response("login.html", request)
 
 @app.get("/dashboard", response_class=HTMLResponse)
-async def dashboard_page():
+async def dashboard_page(request: Request):
     """Serve dashboard page."""
-    return """<html><head><meta http-equiv="refresh" content="0;url=/static/dashboard.html"></head></html>"""
+    return page_response("dashboard.html", request)
 
 @app.post("/api/signup")
 @limiter.limit("5/minute")
@@ -1248,11 +1785,9 @@ async def google_login(request: Request):
         if not id_token_str:
             raise HTTPException(status_code=400, detail="Missing Google credential")
 
-        # Verify the ID token
-        from google.oauth2 import id_token
-        from google.auth.transport import requests as google_requests
-
-        idinfo = id_token.verify_oauth2_token(id_token_str, google_requests.Request())
+        # Verify the ID token (certs are cached, so this is normally CPU-only)
+        loop = asyncio.get_running_loop()
+        idinfo = await loop.run_in_executor(None, verify_google_id_token, id_token_str)
 
         email = idinfo.get("email")
         name = idinfo.get("name", email.split("@")[0])
@@ -1302,16 +1837,11 @@ async def google_login(request: Request):
 
 @app.post("/api/generate")
 @limiter.limit("5/minute")
-async def generate_notes(req: GenerateRequest, request: Request, background_tasks: BackgroundTasks):
+async def generate_notes(req: GenerateRequest, request: Request, background_tasks: BackgroundTasks,
+                         payload: dict = Depends(get_generating_user)):
     """Start asynchronous note generation."""
     
     # 1. Auth
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Authentication required")
-        
-    token = auth_header.split(" ")[1]
-    payload = verify_token(token)
     user_email = payload.get("sub")
     
     # 2. Validation
@@ -1322,26 +1852,86 @@ async def generate_notes(req: GenerateRequest, request: Request, background_task
     user_data = get_user(user_email)
     user_role = user_data.get("role", "student") if user_data else "student"
 
-    # 4. Create Task
+    # 4. Admission: estimate the job's cost from the video metadata and charge
+    # it to the user's quotas (429 + Retry-After when over budget). An empty
+    # budget is refused before probing; a slow probe is priced as unknown length
+    # and the background task probes again.
+    video_id = extract_video_id(req.youtube_url)
+    try:
+        check_budget(user_email)
+        try:
+            metadata = await asyncio.wait_for(
+                asyncio.get_running_loop().run_in_executor(None, probe_video, video_id),
+                timeout=ADMISSION_PROBE_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Metadata probe for {video_id} timed out, assuming cost {DEFAULT_JOB_COST}")
+            metadata = None
+        cost, tier = admission_cost(metadata)
+        admit(user_email, cost, tier)
+    except AdmissionDenied as e:
+        raise HTTPException(status_code=429, detail=e.reason, headers={"Retry-After": str(e.retry_after)})
+
+    # 5. Create Task
     task_id = str(uuid.uuid4())
-    update_task_status(task_id, "queued")
+    request_fields = {"youtube_url": req.youtube_url, "output_language": req.output_language, "model": req.model}
+    task_fields = new_task_fields(request_fields, user_email, user_role)
+    task_fields["cost"] = cost
+    update_task_status(task_id, "queued", fields=task_fields)
     
-    # 5. Queue Background Task
-    background_tasks.add_task(process_note_generation, task_id, req, user_email, user_role)
+    # 6. Queue Background Task
+    background_tasks.add_task(process_note_generation, task_id, req, user_email, user_role,
+                              cost=cost, metadata=metadata)
     
     return {"task_id": task_id, "status": "queued", "message": "Generation started"}
 
+@app.post("/api/ask")
+@limiter.limit("10/minute")
+async def ask_video(req: AskRequest, request: Request, payload: dict = Depends(get_current_user)):
+    """Answer a question about a video from its most relevant transcript passages."""
+    question = req.question.strip()
+    if not question:
+        raise HTTPException(status_code=400, detail="Question required")
+    video_id = extract_video_id(req.youtube_url)
+    loop = asyncio.get_running_loop()
+
+    index = await loop.run_in_executor(None, load_video_index, video_id)
+    if index is None:
+        # Not indexed on this host yet: fetch the transcript only, no notes pipeline
+        try:
+            transcript, _ = await loop.run_in_executor(None, get_transcript, video_id, None, req.output_language)
+        except Exception as e:
+            print(f"⚠️ Transcript unavailable for Q&A on {video_id}: {e}")
+            raise HTTPException(status_code=404, detail="No transcript available for this video")
+        await loop.run_in_executor(None, index_transcript, video_id, transcript)
+        index = load_video_index(video_id)
+
+    top_k = max(1, min(req.top_k, QA_MAX_TOP_K))
+    with span("vector_search"):
+        hits = index.search(question, top_k)
+    excerpts = "\n\n".join(f"[{n}] {text}" for n, (_, _, text) in enumerate(hits, 1))
+    prompt = ASK_PROMPT.format(language=req.output_language, question=question, excerpts=excerpts)
+
+    with span("ask"):
+        answer = await generate_for_model(prompt, req.model, req.output_language, "", tier="short")
+    if not answer:
+        raise HTTPException(status_code=502, detail="AI generation failed with selected model")
+
+    return {
+        "video_id": video_id,
+        "answer": strip_thinking(answer),
+        "sources": [
+            {"ref": n, "passage": i, "score": round(score, 4), "text": text}
+            for n, (i, score, text) in enumerate(hits, 1)
+        ],
+    }
+
 @app.get("/api/tasks/{task_id}")
-async def get_task_status(task_id: str):
-    """Poll for task status."""
-    if not db:
-        return {"status": "failed", "error": "Database disconnected"}
-        
-    doc = db.collection("tasks").document(task_id).get()
-    if not doc.exists:
+async def get_task_status(task_id: str, request: Request):
+    """Poll for task status (304 while nothing has changed)."""
+    task = get_store().get("tasks", task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
-        
-    return doc.to_dict()
+    return etag_json_response(request, TaskStatusResponse.model_validate(task))
 
 
 @app.get("/api/health")
@@ -1349,25 +1939,27 @@ async def health_check():
     """Health check endpoint."""
     return {"status": "healthy", "service": "YouTube Transcripter", "version": "1.0.0"}
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus metrics: stage latencies, task step durations, tokens, retries, fallbacks, cache hits."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 # ═══════ Page Routes ═══════
 
 @app.get("/profile", response_class=HTMLResponse)
-async def profile_page():
-    return """<html><head><meta http-equiv="refresh" content="0;url=/static/profile.html"></head></html>"""
+async def profile_page(request: Request):
+    return page_response("profile.html", request)
 
 @app.get("/history", response_class=HTMLResponse)
-async def history_page():
-    return """<html><head><meta http-equiv="refresh" content="0;url=/static/history.html"></head></html>"""
+async def history_page(request: Request):
+    return page_response("history.html", request)
 
 # ═══════ Profile API ═══════
 
 @app.get("/api/profile")
-async def get_profile(request: Request):
+async def get_profile(payload: dict = Depends(get_current_user)):
     """Get user profile data."""
-    auth_header = request.headers.get("Authorization", "")
-    if not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing token")
-    payload = verify_token(auth_header.split(" ")[1])
     email = payload.get("sub")
 
     user = get_user(email)
@@ -1384,12 +1976,8 @@ async def get_profile(request: Request):
     }
 
 @app.put("/api/profile")
-async def update_profile(req: ProfileUpdateRequest, request: Request):
+async def update_profile(req: ProfileUpdateRequest, payload: dict = Depends(get_current_user)):
     """Update user profile."""
-    auth_header = request.headers.get("Authorization", "")
-    if not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing token")
-    payload = verify_token(auth_header.split(" ")[1])
     email = payload.get("sub")
 
     user = get_user(email)
@@ -1406,23 +1994,12 @@ async def update_profile(req: ProfileUpdateRequest, request: Request):
     return {"message": "Profile updated", "role": req.role}
 
 @app.post("/api/upload-photo")
-async def upload_photo(request: Request, photo: UploadFile = File(...)):
-    """Upload profile photo."""
-    auth_header = request.headers.get("Authorization", "")
-    if not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing token")
-    payload = verify_token(auth_header.split(" ")[1])
+async def upload_photo(photo: UploadFile = File(...), payload: dict = Depends(get_current_user)):
+    """Upload profile photo (stored as resized WebP thumbnails)."""
     email = payload.get("sub")
 
-    UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
-    ext = Path(photo.filename).suffix or ".jpg"
-    filename = f"{uuid.uuid4().hex}{ext}"
-    filepath = UPLOADS_DIR / filename
-
-    with open(filepath, "wb") as f:
-        shutil.copyfileobj(photo.file, f)
-
-    photo_url = f"/static/uploads/{filename}"
+    stored = await save_photo(photo)
+    photo_url = stored["photo_url"]
 
     # Save to user profile
     user = get_user(email)
@@ -1430,29 +2007,40 @@ async def upload_photo(request: Request, photo: UploadFile = File(...)):
         user["photo_url"] = photo_url
         save_user(email, user)
 
-    return {"photo_url": photo_url}
+    return stored
 
 # ═══════ History API ═══════
 
 @app.get("/api/history")
-async def get_history(request: Request):
+async def get_history(request: Request, payload: dict = Depends(get_current_user)):
     """Get user's note history."""
-    auth_header = request.headers.get("Authorization", "")
-    if not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing token")
-    payload = verify_token(auth_header.split(" ")[1])
     email = payload.get("sub")
 
     history = get_user_history(email)
-    return {"history": history}
+    return etag_json_response(request, HistoryResponse(history=history))
+
+@app.get("/api/history/search")
+async def search_history(q: str, page: int = 1, page_size: int = 20,
+                         payload: dict = Depends(get_current_user)):
+    """Full-text search over the user's notes (title + notes), best matches first."""
+    email = payload.get("sub")
+    if page < 1 or not 1 <= page_size <= 50:
+        raise HTTPException(status_code=400, detail="page must be >= 1 and page_size 1-50")
+
+    index = get_history_index()
+    if index is None:
+        raise HTTPException(status_code=503, detail="Search is unavailable")
+
+    def run_search():
+        index.ensure_user(email, get_user_history)
+        return index.search(email, q, page, page_size)
+
+    with span("history_search"):
+        return FastJSONResponse(await asyncio.get_running_loop().run_in_executor(None, run_search))
 
 @app.delete("/api/history/{note_id}")
-async def delete_history_item(note_id: str, request: Request):
+async def delete_history_item(note_id: str, payload: dict = Depends(get_current_user)):
     """Delete a specific note from history."""
-    auth_header = request.headers.get("Authorization", "")
-    if not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing token")
-    payload = verify_token(auth_header.split(" ")[1])
     email = payload.get("sub")
 
     delete_history_item_db(email, note_id)
@@ -1461,6 +2049,7 @@ async def delete_history_item(note_id: str, request: Request):
 @app.get("/api/cron/check-inactivity")
 async def check_inactivity():
     """Check for users inactive for >24h and send emails."""
+    db = get_db()
     if not db:
         return {"message": "Database not connected"}
         
@@ -1486,8 +2075,50 @@ async def check_inactivity():
             
     return {"message": f"Checked inactivity. Emails sent: {count}"}
 
+# ═══════ Startup ═══════
+
+# Warm heavy imports, Firebase and API clients in a background thread after
+# startup, so /api/health answers immediately and first requests stay fast.
+PREWARM_ON_STARTUP = os.getenv("PREWARM_ON_STARTUP", "1") != "0"
+
+def prewarm():
+    """Import heavy SDKs and open connections ahead of the first real request."""
+    start = time.perf_counter()
+    get_db()
+    get_store()
+    for module in ("yt_dlp", "youtube_transcript_api", "google.genai", "groq"):
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            print(f"⚠️ Pre-warm import of {module} failed: {e}")
+    for factory in (get_gemini_client, get_groq_client, get_egress_pool):
+        try:
+            factory()
+        except Exception as e:
+            print(f"⚠️ Pre-warm of {factory.__name__} failed: {e}")
+    prewarm_google_certs()
+    print(f"🔥 Pre-warm finished in {time.perf_counter() - start:.2f}s")
+
+# Strong references to long-running startup tasks (the loop only keeps weak ones)
+_background_tasks = set()
+
+@app.on_event("startup")
+async def on_startup():
+    """Per-worker startup; Firebase and SDKs load lazily or via background pre-warm."""
+    if PREWARM_ON_STARTUP:
+        loop = asyncio.get_running_loop()
+        loop.run_in_executor(None, prewarm)
+    # Pick up tasks whose worker died mid-job (see task_recovery.py), prune expired caches
+    for loop_coro in (recovery_loop(resume_task), cache_sweep_loop()):
+        task = asyncio.create_task(loop_coro)
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
 if __name__ == "__main__":
     import uvicorn
     print("🚀 Starting YouTube Transcripter...")
     print("📍 Open http://localhost:8000 in your browser")
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    # WEB_CONCURRENCY > 1 runs several workers (no auto-reload); see gunicorn.conf.py
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    uvicorn.run("main:app", host="0.0.0.0", port=int(os.getenv("PORT", "8000")),
+                reload=workers == 1, workers=workers)
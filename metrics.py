@@ -0,0 +1,187 @@
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Print a line per finished span (stage, detail, outcome, duration) for debugging
+METRICS_LOG_SPANS = os.getenv("METRICS_LOG_SPANS", "0") == "1"
+
+# Latency buckets (seconds) covering fast cache hits up to multi-minute LLM calls
+_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160, 320)
+
+STAGE_SECONDS = Histogram(
+    "ytt_stage_duration_seconds",
+    "Duration of a pipeline stage (transcript method, LLM call, merge, DB write, ...)",
+    ["stage", "detail", "outcome"],
+    buckets=_BUCKETS,
+)
+TASK_STEP_SECONDS = Histogram(
+    "ytt_task_step_duration_seconds",
+    "Time a generation task spent in each update_task_status step",
+    ["step"],
+    buckets=_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "ytt_llm_tokens_total",
+    "Tokens reported by LLM providers",
+    ["provider", "model", "kind"],
+)
+RETRIES = Counter(
+    "ytt_retries_total",
+    "Retries after a retryable upstream error (e.g. 429)",
+    ["provider"],
+)
+FALLBACKS = Counter(
+    "ytt_fallbacks_total",
+    "Falling back from one provider/model/method to the next",
+    ["source", "target"],
+)
+HEDGES = Counter(
+    "ytt_hedges_total",
+    "Hedged requests fired because the running attempt exceeded its latency budget",
+    ["target"],
+)
+CACHE_LOOKUPS = Counter(
+    "ytt_cache_lookups_total",
+    "Cache lookups by cache name and result (hit/miss)",
+    ["cache", "result"],
+)
+EGRESS_REQUESTS = Counter(
+    "ytt_egress_requests_total",
+    "YouTube requests per egress identity (proxy + cookie jar) by result (ok/blocked)",
+    ["identity", "outcome"],
+)
+MODEL_CIRCUIT_OPEN = Gauge(
+    "ytt_model_circuit_open",
+    "1 while a model's circuit breaker is open or half-open",
+    ["model"],
+    multiprocess_mode="max",
+)
+
+# Chunk numbers in step names ("generating_chunk_3_of_8") would explode label
+# cardinality, so they are folded to N.
+_DIGITS_RE = re.compile(r"\d+")
+
+
+def step_label(step: str) -> str:
+    return _DIGITS_RE.sub("N", step)
+
+
+class Span:
+    """A timed stage. Set `outcome` to record something other than ok/error."""
+
+    __slots__ = ("stage", "detail", "outcome", "duration")
+
+    def __init__(self, stage: str, detail: str):
+        self.stage = stage
+        self.detail = detail
+        self.outcome = "ok"
+        self.duration = 0.0
+
+
+@contextmanager
+def span(stage: str, detail: str = ""):
+    """Time a block and record it in ytt_stage_duration_seconds.
+
+    An exception escaping the block marks the span as "error" and is re-raised.
+    With METRICS_LOG_SPANS=1 every span is also printed.
+    """
+    s = Span(stage, detail)
+    start = time.perf_counter()
+    try:
+        yield s
+    except BaseException:
+        s.outcome = "error"
+        raise
+    finally:
+        s.duration = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage, detail, s.outcome).observe(s.duration)
+        if METRICS_LOG_SPANS:
+            print(f"⏱️ stage={stage} detail={detail or '-'} outcome={s.outcome} duration_ms={s.duration * 1000:.1f}")
+
+
+def record_tokens(provider: str, model: str, prompt_tokens, completion_tokens):
+    if prompt_tokens:
+        LLM_TOKENS.labels(provider, model, "prompt").inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(provider, model, "completion").inc(completion_tokens)
+
+
+def record_retry(provider: str):
+    RETRIES.labels(provider).inc()
+
+
+def record_fallback(source: str, target: str):
+    FALLBACKS.labels(source, target).inc()
+
+
+def record_hedge(target: str):
+    HEDGES.labels(target).inc()
+
+
+def set_circuit_state(model: str, state: str):
+    MODEL_CIRCUIT_OPEN.labels(model).set(0 if state == "closed" else 1)
+
+
+def record_egress(identity: str, outcome: str):
+    EGRESS_REQUESTS.labels(identity, outcome).inc()
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+# ═══════ Task step timing ═══════
+
+_task_steps = {}
+_task_steps_lock = threading.Lock()
+
+
+def close_task_step(task_id: str, next_step: str = None) -> dict:
+    """Finish the task's current step and start `next_step` (None = task done).
+
+    Returns {step: seconds} for the step that just ended, or {} if none.
+    """
+    now = time.perf_counter()
+    with _task_steps_lock:
+        previous = _task_steps.pop(task_id, None)
+        if next_step:
+            _task_steps[task_id] = (next_step, now)
+    if not previous:
+        return {}
+    step, started = previous
+    duration = now - started
+    TASK_STEP_SECONDS.labels(step_label(step)).observe(duration)
+    return {step: round(duration, 3)}
+
+
+def discard_task_step(task_id: str):
+    """Forget a task's open step without recording it (task cancelled or taken over)."""
+    with _task_steps_lock:
+        _task_steps.pop(task_id, None)
+
+
+# ═══════ Exposition ═══════
+
+def render_metrics():
+    """Return (body, content_type) for the /metrics endpoint.
+
+    With several workers, set PROMETHEUS_MULTIPROC_DIR so every worker's
+    samples are aggregated instead of only the one answering the scrape.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import anyio
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from fastapi.staticfiles import StaticFiles
+
+from metrics import span
+from static_assets import IMMUTABLE_CACHE_CONTROL
+
+# Profile photo uploads. The upload is streamed to a temp file under a size
+# cap while being hashed; the content hash names the stored thumbnails, so the
+# same photo is processed and stored once and its URLs never change (they are
+# served with immutable cache headers). Originals are not kept.
+PHOTOS_DIR = Path(os.getenv("PHOTOS_DIR", "static/uploads/photos"))
+PHOTOS_URL = "/media/photos"
+PHOTO_MAX_BYTES = int(os.getenv("PHOTO_MAX_BYTES", str(5 * 1024 * 1024)))
+PHOTO_WORKERS = int(os.getenv("PHOTO_WORKERS", "2"))
+# Square thumbnail edges in px: nav-sized and the 110px profile avatar at 2x
+THUMBNAIL_SIZES = (96, 224)
+AVATAR_SIZE = 224
+WEBP_QUALITY = 80
+# Decoding bombs: refuse images with more pixels than this
+MAX_PIXELS = 40_000_000
+
+UPLOAD_CHUNK = 64 * 1024
+# Room for multipart boundaries and part headers on top of the photo itself
+MULTIPART_OVERHEAD = 64 * 1024
+UPLOAD_PATH = "/api/upload-photo"
+
+_executor = ThreadPoolExecutor(max_workers=PHOTO_WORKERS, thread_name_prefix="photos")
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Photo too large (max {PHOTO_MAX_BYTES // (1024 * 1024)} MB)")
+
+
+class UploadSizeLimitMiddleware:
+    """Cap the request body of photo uploads before it reaches the multipart parser.
+
+    Starlette spools the whole multipart body to disk before the handler runs,
+    so the handler's own check would only fire after a huge upload has been
+    received. A Content-Length over the cap is refused without reading the
+    body; otherwise the stream is counted and cut off at the cap (the 413 is
+    raised from the parser and passes through FastAPI's body handling).
+    """
+
+    def __init__(self, app, path: str = UPLOAD_PATH, max_bytes: int = PHOTO_MAX_BYTES + MULTIPART_OVERHEAD):
+        self.app = app
+        self.path = path
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > self.max_bytes:
+            error = _too_large()
+            response = JSONResponse({"detail": error.detail}, status_code=error.status_code,
+                                    headers={"Connection": "close"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise _too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles for content-addressed files: cache forever."""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+def thumbnail_path(digest: str, size: int) -> Path:
+    return PHOTOS_DIR / f"{digest}-{size}.webp"
+
+
+def thumbnail_urls(digest: str) -> dict:
+    return {str(size): f"{PHOTOS_URL}/{digest}-{size}.webp" for size in THUMBNAIL_SIZES}
+
+
+def make_thumbnails(source: str, digest: str):
+    """Write square WebP thumbnails of an image file (runs in the photo pool)."""
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+    try:
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+            PHOTOS_DIR.mkdir(parents=True, exist_ok=True)
+            for size in THUMBNAIL_SIZES:
+                thumb = ImageOps.fit(image, (size, size), Image.LANCZOS)
+                target = thumbnail_path(digest, size)
+                # Unique per call: identical uploads may be processed by two threads at once
+                tmp = target.with_suffix(f".{uuid.uuid4().hex}.tmp")
+                thumb.save(tmp, "WEBP", quality=WEBP_QUALITY, method=4)
+                os.replace(tmp, target)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError("Not a usable image (JPEG, PNG, WebP or GIF expected)") from e
+
+
+async def _spool(upload: UploadFile, path: str) -> str:
+    """Stream the upload to `path` and return its sha256; 413 past PHOTO_MAX_BYTES."""
+    digest = hashlib.sha256()
+    size = 0
+    async with await anyio.open_file(path, "wb") as out:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > PHOTO_MAX_BYTES:
+                raise _too_large()
+            digest.update(chunk)
+            await out.write(chunk)
+    if not size:
+        raise HTTPException(status_code=400, detail="Empty file")
+    return digest.hexdigest()
+
+
+async def save_photo(upload: UploadFile) -> dict:
+    """Store an uploaded photo's thumbnails; returns {"photo_url", "thumbnails"}."""
+    fd, tmp_path = tempfile.mkstemp(prefix="upload-", suffix=".part")
+    os.close(fd)
+    try:
+        with span("photo_upload", "spool"):
+            digest = await _spool(upload, tmp_path)
+        if all(thumbnail_path(digest, size).exists() for size in THUMBNAIL_SIZES):
+            print(f"♻️ Photo {digest[:12]} already stored")
+        else:
+            try:
+                with span("photo_upload", "thumbnails"):
+                    await asyncio.get_running_loop().run_in_executor(_executor, make_thumbnails, tmp_path, digest)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    urls = thumbnail_urls(digest)
+    return {"photo_url": urls[str(AVATAR_SIZE)], "thumbnails": urls}
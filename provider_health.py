@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+from collections import deque
+
+from metrics import set_circuit_state
+
+# Rolling window used for error rate / latency
+HEALTH_WINDOW = int(os.getenv("MODEL_HEALTH_WINDOW", "20"))
+HEALTH_WINDOW_SECONDS = 600
+# Open the circuit after this many consecutive failures...
+FAILURE_THRESHOLD = int(os.getenv("MODEL_FAILURE_THRESHOLD", "3"))
+# ...or when at least half of the last MIN_SAMPLES+ calls failed
+ERROR_RATE_THRESHOLD = 0.5
+MIN_SAMPLES = 5
+# Cool-down before a half-open probe; doubles on every failed probe
+BASE_COOLDOWN = float(os.getenv("MODEL_BASE_COOLDOWN", "30"))
+MAX_COOLDOWN = 600.0
+# Decommissioned / unknown models stay open much longer
+FATAL_COOLDOWN = 3600.0
+# Latency that costs as much ordering score as a 100% error rate
+LATENCY_SCALE = 60.0
+
+FATAL_MARKERS = ("decommissioned", "model_not_found", "does not exist")
+# HTTP status of an unknown model (groq's status_code, google-genai's code)
+FATAL_STATUS = 404
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+def is_fatal_error(error) -> bool:
+    """True for errors that won't go away by retrying (model removed or unknown)."""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if status == FATAL_STATUS:
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in FATAL_MARKERS)
+
+
+class ModelHealth:
+    """Rolling outcomes and circuit state for one model."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.samples = deque(maxlen=HEALTH_WINDOW)  # (timestamp, ok, latency)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.cooldown = BASE_COOLDOWN
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+    def _recent(self, now: float):
+        return [s for s in self.samples if now - s[0] <= HEALTH_WINDOW_SECONDS]
+
+    def error_rate(self, now: float) -> float:
+        recent = self._recent(now)
+        if not recent:
+            return 0.0
+        return sum(1 for _, ok, _ in recent if not ok) / len(recent)
+
+    def mean_latency(self, now: float) -> float:
+        latencies = [lat for _, ok, lat in self._recent(now) if ok]
+        return sum(latencies) / len(latencies) if latencies else 0.0
+
+    def score(self, now: float) -> float:
+        """Lower is better."""
+        return self.error_rate(now) + self.mean_latency(now) / LATENCY_SCALE
+
+
+class HealthRegistry:
+    """Per-model circuit breakers with half-open probes and health-based ordering."""
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name: str) -> ModelHealth:
+        health = self._models.get(name)
+        if health is None:
+            health = self._models[name] = ModelHealth(name)
+        return health
+
+    def _set_state(self, health: ModelHealth, state: str):
+        if health.state != state:
+            print(f"🔌 Circuit for {health.name}: {health.state} → {state}")
+            health.state = state
+            set_circuit_state(health.name, state)
+
+    def order(self, names: list) -> list:
+        """Models worth trying, healthiest first (ties keep the given preference).
+
+        Open circuits are left out until their cool-down ends; they then come
+        last, as a single half-open probe.
+        """
+        now = time.time()
+        ready, probes = [], []
+        with self._lock:
+            for index, name in enumerate(names):
+                health = self._get(name)
+                if health.state == CLOSED:
+                    ready.append((round(health.score(now), 1), index, name))
+                elif not health.probe_in_flight and now - health.opened_at >= health.cooldown:
+                    probes.append(name)
+        return [name for _, _, name in sorted(ready)] + probes
+
+    def acquire(self, name: str) -> bool:
+        """Whether a call to `name` may go out now (claims the probe if half-open)."""
+        now = time.time()
+        with self._lock:
+            health = self._get(name)
+            if health.state == CLOSED:
+                return True
+            if health.probe_in_flight or now - health.opened_at < health.cooldown:
+                return False
+            self._set_state(health, HALF_OPEN)
+            health.probe_in_flight = True
+            return True
+
+    def record_success(self, name: str, latency: float):
+        with self._lock:
+            health = self._get(name)
+            if health.state == HALF_OPEN:
+                health.samples.clear()  # recovered: don't let old failures re-trip it
+            health.samples.append((time.time(), True, latency))
+            health.consecutive_failures = 0
+            health.probe_in_flight = False
+            health.cooldown = BASE_COOLDOWN
+            self._set_state(health, CLOSED)
+
+    def record_failure(self, name: str, latency: float, error=None):
+        now = time.time()
+        with self._lock:
+            health = self._get(name)
+            health.samples.append((now, False, latency))
+            health.consecutive_failures += 1
+            if error is not None and is_fatal_error(error):
+                health.cooldown = FATAL_COOLDOWN
+                self._open(health, now)
+            elif health.state == HALF_OPEN:
+                health.cooldown = min(health.cooldown * 2, MAX_COOLDOWN)
+                self._open(health, now)
+            elif health.state == CLOSED and self._should_trip(health, now):
+                self._open(health, now)
+
+    def release(self, name: str):
+        """Give back a half-open probe that never completed (e.g. cancelled)."""
+        with self._lock:
+            health = self._get(name)
+            health.probe_in_flight = False
+            if health.state == HALF_OPEN:
+                self._set_state(health, OPEN)
+
+    def _should_trip(self, health: ModelHealth, now: float) -> bool:
+        if health.consecutive_failures >= FAILURE_THRESHOLD:
+            return True
+        recent = health._recent(now)
+        return len(recent) >= MIN_SAMPLES and health.error_rate(now) >= ERROR_RATE_THRESHOLD
+
+    def _open(self, health: ModelHealth, now: float):
+        health.opened_at = now
+        health.probe_in_flight = False
+        self._set_state(health, OPEN)
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        with self._lock:
+            return {
+                name: {
+                    "state": h.state,
+                    "error_rate": round(h.error_rate(now), 3),
+                    "mean_latency": round(h.mean_latency(now), 3),
+                    "consecutive_failures": h.consecutive_failures,
+                }
+                for name, h in self._models.items()
+            }
+
+
+model_health = HealthRegistry()
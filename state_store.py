@@ -0,0 +1,305 @@
+import abc
+import copy
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Callable, Optional
+
+from firebase_config import get_db
+
+# Where shared job state lives: "firestore", "sqlite", "memory" or "auto"
+# (auto = Firestore when Firebase is configured, else a local SQLite file that
+# every worker on the host can see).
+STATE_STORE = os.getenv("STATE_STORE", "auto").lower()
+STATE_STORE_PATH = os.getenv(
+    "STATE_STORE_PATH",
+    os.path.join(tempfile.gettempdir(), "yt_transcripter_state.db"),
+)
+
+
+def _deep_merge(base: dict, updates: dict) -> dict:
+    """Merge `updates` into `base` the way Firestore's set(merge=True) does."""
+    for key, value in updates.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _deep_merge(base[key], value)
+        else:
+            base[key] = copy.deepcopy(value)
+    return base
+
+
+class DocumentStore(abc.ABC):
+    """Minimal collection/document API shared by every backend."""
+
+    name = "base"
+
+    @abc.abstractmethod
+    def get(self, collection: str, doc_id: str) -> Optional[dict]:
+        ...
+
+    @abc.abstractmethod
+    def set(self, collection: str, doc_id: str, data: dict, merge: bool = False):
+        ...
+
+    @abc.abstractmethod
+    def delete(self, collection: str, doc_id: str):
+        ...
+
+    @abc.abstractmethod
+    def update_if(self, collection: str, doc_id: str, update_fn: Callable) -> Optional[dict]:
+        """Atomically read a document and merge in `update_fn(current)`.
+
+        `update_fn` gets the current data (or None) and returns the fields to
+        merge, or None to leave the document untouched. Returns what was merged.
+        """
+
+    @abc.abstractmethod
+    def query(self, collection: str, field: str, values: list) -> list:
+        """Return [(doc_id, data)] for documents whose top-level `field` is in `values`."""
+
+    @abc.abstractmethod
+    def delete_expired(self, collection: str, field: str, before: float) -> int:
+        """Delete documents whose numeric top-level `field` is below `before`; returns the count."""
+
+
+class FirestoreStore(DocumentStore):
+    """Documents stored in Firestore — already shared across workers and hosts."""
+
+    name = "firestore"
+
+    def __init__(self, db):
+        self.db = db
+
+    def get(self, collection: str, doc_id: str) -> Optional[dict]:
+        doc = self.db.collection(collection).document(doc_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    def set(self, collection: str, doc_id: str, data: dict, merge: bool = False):
+        self.db.collection(collection).document(doc_id).set(data, merge=merge)
+
+    def delete(self, collection: str, doc_id: str):
+        self.db.collection(collection).document(doc_id).delete()
+
+    def update_if(self, collection: str, doc_id: str, update_fn: Callable) -> Optional[dict]:
+        from firebase_admin import firestore
+
+        ref = self.db.collection(collection).document(doc_id)
+
+        @firestore.transactional
+        def run(transaction):
+            snapshot = ref.get(transaction=transaction)
+            updates = update_fn(snapshot.to_dict() if snapshot.exists else None)
+            if updates is not None:
+                transaction.set(ref, updates, merge=True)
+            return updates
+
+        return run(self.db.transaction())
+
+    def query(self, collection: str, field: str, values: list) -> list:
+        docs = self.db.collection(collection).where(field, "in", list(values)).stream()
+        return [(d.id, d.to_dict()) for d in docs]
+
+    def delete_expired(self, collection: str, field: str, before: float) -> int:
+        removed = 0
+        while True:
+            docs = list(self.db.collection(collection).where(field, "<", before).limit(500).stream())
+            if not docs:
+                return removed
+            batch = self.db.batch()
+            for doc in docs:
+                batch.delete(doc.reference)
+            batch.commit()
+            removed += len(docs)
+
+
+class SQLiteStore(DocumentStore):
+    """Documents stored as JSON in a local SQLite file (WAL mode), so all workers
+    on one host share state without any external service."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " collection TEXT NOT NULL,"
+            " doc_id TEXT NOT NULL,"
+            " data TEXT NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (collection, doc_id))"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, collection: str, doc_id: str) -> Optional[dict]:
+        row = self._conn().execute(
+            "SELECT data FROM documents WHERE collection = ? AND doc_id = ?",
+            (collection, doc_id),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, collection: str, doc_id: str, data: dict, merge: bool = False):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if merge:
+                row = conn.execute(
+                    "SELECT data FROM documents WHERE collection = ? AND doc_id = ?",
+                    (collection, doc_id),
+                ).fetchone()
+                if row:
+                    data = _deep_merge(json.loads(row[0]), data)
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (collection, doc_id, data, updated_at) VALUES (?, ?, ?, ?)",
+                (collection, doc_id, json.dumps(data), time.time()),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, collection: str, doc_id: str):
+        self._conn().execute(
+            "DELETE FROM documents WHERE collection = ? AND doc_id = ?",
+            (collection, doc_id),
+        )
+
+    def update_if(self, collection: str, doc_id: str, update_fn: Callable) -> Optional[dict]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT data FROM documents WHERE collection = ? AND doc_id = ?",
+                (collection, doc_id),
+            ).fetchone()
+            current = json.loads(row[0]) if row else None
+            updates = update_fn(copy.deepcopy(current))
+            if updates is not None:
+                data = _deep_merge(current or {}, updates)
+                conn.execute(
+                    "INSERT OR REPLACE INTO documents (collection, doc_id, data, updated_at) VALUES (?, ?, ?, ?)",
+                    (collection, doc_id, json.dumps(data), time.time()),
+                )
+            conn.execute("COMMIT")
+            return updates
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def query(self, collection: str, field: str, values: list) -> list:
+        values = list(values)
+        placeholders = ", ".join("?" for _ in values)
+        rows = self._conn().execute(
+            f"SELECT doc_id, data FROM documents WHERE collection = ? "
+            f"AND json_extract(data, ?) IN ({placeholders})",
+            (collection, f"$.{field}", *values),
+        ).fetchall()
+        return [(doc_id, json.loads(data)) for doc_id, data in rows]
+
+    def delete_expired(self, collection: str, field: str, before: float) -> int:
+        return self._conn().execute(
+            "DELETE FROM documents WHERE collection = ? AND json_extract(data, ?) < ?",
+            (collection, f"$.{field}", before),
+        ).rowcount
+
+
+class MemoryStore(DocumentStore):
+    """Process-local documents — single worker only (dev, benchmarks)."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._docs = {}
+        self._lock = threading.Lock()
+
+    def get(self, collection: str, doc_id: str) -> Optional[dict]:
+        with self._lock:
+            doc = self._docs.get((collection, doc_id))
+            return copy.deepcopy(doc) if doc is not None else None
+
+    def set(self, collection: str, doc_id: str, data: dict, merge: bool = False):
+        with self._lock:
+            existing = self._docs.get((collection, doc_id))
+            if merge and existing is not None:
+                _deep_merge(existing, data)
+            else:
+                self._docs[(collection, doc_id)] = copy.deepcopy(data)
+
+    def delete(self, collection: str, doc_id: str):
+        with self._lock:
+            self._docs.pop((collection, doc_id), None)
+
+    def update_if(self, collection: str, doc_id: str, update_fn: Callable) -> Optional[dict]:
+        with self._lock:
+            current = self._docs.get((collection, doc_id))
+            updates = update_fn(copy.deepcopy(current))
+            if updates is not None:
+                if current is None:
+                    self._docs[(collection, doc_id)] = copy.deepcopy(updates)
+                else:
+                    _deep_merge(current, updates)
+            return updates
+
+    def query(self, collection: str, field: str, values: list) -> list:
+        values = list(values)
+        with self._lock:
+            return [
+                (doc_id, copy.deepcopy(data))
+                for (coll, doc_id), data in self._docs.items()
+                if coll == collection and data.get(field) in values
+            ]
+
+    def delete_expired(self, collection: str, field: str, before: float) -> int:
+        with self._lock:
+            expired = [
+                key for key, data in self._docs.items()
+                if key[0] == collection and isinstance(data.get(field), (int, float)) and data[field] < before
+            ]
+            for key in expired:
+                del self._docs[key]
+            return len(expired)
+
+
+_store: Optional[DocumentStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> DocumentStore:
+    """Return the process-wide state store, creating it on first use."""
+    global _store
+    if _store is not None:
+        return _store
+    with _store_lock:
+        if _store is None:
+            _store = _create_store()
+            print(f"✅ State store: {_store.name}")
+    return _store
+
+
+def set_store(store: DocumentStore):
+    """Replace the state store (e.g. with a MemoryStore in benchmarks)."""
+    global _store
+    _store = store
+
+
+def _create_store() -> DocumentStore:
+    if STATE_STORE == "memory":
+        return MemoryStore()
+    if STATE_STORE == "sqlite":
+        return SQLiteStore(STATE_STORE_PATH)
+    db = get_db()
+    if db is not None:
+        return FirestoreStore(db)
+    if STATE_STORE == "firestore":
+        print("⚠️ STATE_STORE=firestore but Firestore is unavailable, using SQLite")
+    return SQLiteStore(STATE_STORE_PATH)
@@ -207,6 +207,11 @@ function initForm() {
 
             const data = await res.json();
 
+            if (res.status === 429) {
+                const wait = Math.ceil(Number(res.headers.get('Retry-After') || 60) / 60);
+                throw new Error(`${data.detail || 'Too many requests'} (about ${wait} min)`);
+            }
+
             if (!res.ok) {
                 throw new Error(data.detail || 'Failed to start generation');
             }
@@ -3,6 +3,7 @@
 document.addEventListener('DOMContentLoaded', () => {
     checkAuth();
     loadHistory();
+    initSearch();
     initModal();
     initLogout();
 });
@@ -113,11 +114,11 @@ async function loadHistory() {
     }
 }
 
-function renderHistory() {
+function renderHistory(items = historyData) {
     const container = document.getElementById('historyList');
     container.innerHTML = '';
 
-    historyData.forEach((item, i) => {
+    items.forEach((item, i) => {
         const card = document.createElement('div');
         card.className = 'history-card';
         card.style.animationDelay = `${i * 0.05}s`;
@@ -135,7 +136,8 @@ function renderHistory() {
                 ${thumbUrl ? `<img src="${thumbUrl}" alt="thumbnail">` : ''}
             </div>
             <div class="card-info">
-                <div class="card-title">${escapeHtml(item.title || 'Untitled')}</div>
+                <div class="card-title">${item.title_highlight || escapeHtml(item.title || 'Untitled')}</div>
+                ${item.snippet ? `<div class="card-snippet">${item.snippet}</div>` : ''}
                 <div class="card-meta">
                     <span>📅 ${date}</span>
                     <span>🌍 ${item.language || 'English'}</span>
@@ -148,7 +150,8 @@ function renderHistory() {
         // Open modal on card click
         card.addEventListener('click', (e) => {
             if (e.target.closest('.card-delete')) return;
-            openModal(item);
+            // Search results carry a snippet only; open the full note
+            openModal(historyData.find(n => n.id === item.id) || item);
         });
 
         // Delete button
@@ -161,6 +164,39 @@ function renderHistory() {
     });
 }
 
+// ─── Search ───
+
+let searchTimer = null;
+
+function initSearch() {
+    const input = document.getElementById('historySearch');
+    if (!input) return;
+    input.addEventListener('input', () => {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(() => searchHistory(input.value.trim()), 250);
+    });
+}
+
+async function searchHistory(query) {
+    if (!query) {
+        renderHistory();
+        return;
+    }
+    try {
+        const token = localStorage.getItem('yt_token');
+        const res = await fetch(`/api/history/search?q=${encodeURIComponent(query)}&page_size=50`, {
+            headers: { 'Authorization': `Bearer ${token}` }
+        });
+        if (!res.ok) return;
+        const data = await res.json();
+        // Ignore responses for queries the user has already typed past
+        if (document.getElementById('historySearch').value.trim() !== query) return;
+        renderHistory(data.results || []);
+    } catch (err) {
+        console.error('Search failed:', err);
+    }
+}
+
 function escapeHtml(str) {
     return str.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;')
         .replace(/"/g, '&quot;');
@@ -0,0 +1,167 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+from api_responses import negotiate_encoding
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Fingerprinted, precompressed static assets and directly served pages.
+# `python static_assets.py` (run at build time) copies every CSS/JS file under
+# static/ to static/dist/ with a content hash in its name, next to .gz and .br
+# variants, and writes a manifest. Pages are served straight from their routes
+# with asset references rewritten to the fingerprinted URLs, so a page load is
+# one HTML round-trip plus assets the browser may cache forever.
+STATIC_DIR = Path("static")
+DIST_DIR = STATIC_DIR / "dist"
+MANIFEST_PATH = DIST_DIR / "manifest.json"
+ASSETS_URL = "/assets"
+ASSET_DIRS = ("css", "js")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Pages change with every deploy: always revalidate (cheap with the ETag)
+PAGE_CACHE_CONTROL = "no-cache"
+FINGERPRINT_LENGTH = 12
+
+_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+_MEDIA_TYPES = {".css": "text/css; charset=utf-8", ".js": "text/javascript; charset=utf-8"}
+# href="/static/css/style.css" or src="/static/js/app.js?v=2.0"
+_ASSET_REF_RE = re.compile(r'(href|src)="/static/((?:css|js)/[^"?#]+)(?:\?[^"]*)?"')
+
+
+def _compress(data: bytes) -> dict:
+    """{"gzip": bytes, "br": bytes} variants worth sending (smaller than the original)."""
+    variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(data, quality=11)
+    return {encoding: body for encoding, body in variants.items() if len(body) < len(data)}
+
+
+def _write_atomic(path: Path, data: bytes):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def build_assets() -> dict:
+    """Write fingerprinted + precompressed copies of all assets; returns the manifest."""
+    manifest = {}
+    for folder in ASSET_DIRS:
+        (DIST_DIR / folder).mkdir(parents=True, exist_ok=True)
+        for source in sorted((STATIC_DIR / folder).glob("*")):
+            if source.suffix not in _MEDIA_TYPES:
+                continue
+            data = source.read_bytes()
+            fingerprint = hashlib.sha256(data).hexdigest()[:FINGERPRINT_LENGTH]
+            name = f"{folder}/{source.stem}.{fingerprint}{source.suffix}"
+            target = DIST_DIR / name
+            if not target.exists():
+                _write_atomic(target, data)
+                for encoding, body in _compress(data).items():
+                    _write_atomic(target.with_name(target.name + _SUFFIXES[encoding]), body)
+            manifest[f"{folder}/{source.name}"] = name
+    _write_atomic(MANIFEST_PATH, json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest
+
+
+def _sources_changed() -> bool:
+    """True if any CSS/JS source is newer than the manifest (e.g. edited in development)."""
+    built_at = MANIFEST_PATH.stat().st_mtime
+    return any(
+        source.stat().st_mtime > built_at
+        for folder in ASSET_DIRS
+        for source in (STATIC_DIR / folder).glob("*")
+        if source.suffix in _MEDIA_TYPES
+    )
+
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def get_manifest() -> dict:
+    """The build manifest; (re)built on first use if missing or older than the sources."""
+    global _manifest
+    if _manifest is None:
+        with _manifest_lock:
+            if _manifest is None:
+                try:
+                    if _sources_changed():
+                        raise ValueError("sources changed since the last build")
+                    _manifest = json.loads(MANIFEST_PATH.read_text())
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ Static asset manifest missing or stale ({e}), building assets now")
+                    _manifest = build_assets()
+    return _manifest
+
+
+def asset_url(name: str) -> str:
+    """URL for an asset such as "css/style.css" (unversioned /static URL if unknown)."""
+    fingerprinted = get_manifest().get(name)
+    return f"{ASSETS_URL}/{fingerprinted}" if fingerprinted else f"/static/{name}"
+
+
+def _preferred_encoding(request: Request, available) -> str:
+    offered = [encoding for encoding in ("br", "gzip") if encoding in available]
+    return negotiate_encoding(request.headers.get("accept-encoding", ""), offered)
+
+
+def asset_response(path: str, request: Request) -> Response:
+    """Serve a fingerprinted asset, precompressed when the client accepts it."""
+    if path not in set(get_manifest().values()):
+        return Response(status_code=404)
+    target = DIST_DIR / path
+    available = [e for e, suffix in _SUFFIXES.items() if target.with_name(target.name + suffix).exists()]
+    encoding = _preferred_encoding(request, available)
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        target = target.with_name(target.name + _SUFFIXES[encoding])
+    return FileResponse(target, media_type=_MEDIA_TYPES[Path(path).suffix], headers=headers)
+
+
+class _Page:
+    __slots__ = ("bodies", "etag")
+
+    def __init__(self, html: bytes):
+        self.bodies = {"": html, **_compress(html)}
+        self.etag = '"' + hashlib.sha256(html).hexdigest()[:FINGERPRINT_LENGTH] + '"'
+
+
+_pages = {}
+
+
+def _render(name: str) -> _Page:
+    page = _pages.get(name)
+    if page is None:
+        html = (STATIC_DIR / name).read_text(encoding="utf-8")
+        html = _ASSET_REF_RE.sub(lambda m: f'{m.group(1)}="{asset_url(m.group(2))}"', html)
+        page = _pages[name] = _Page(html.encode("utf-8"))
+    return page
+
+
+def page_response(name: str, request: Request) -> Response:
+    """Serve static/<name> with fingerprinted asset URLs (rendered once per worker)."""
+    page = _render(name)
+    headers = {"Cache-Control": PAGE_CACHE_CONTROL, "ETag": page.etag, "Vary": "Accept-Encoding"}
+    if page.etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    encoding = _preferred_encoding(request, page.bodies)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(page.bodies[encoding], media_type="text/html; charset=utf-8", headers=headers)
+
+
+if __name__ == "__main__":
+    built = build_assets()
+    print(f"Built {len(built)} assets into {DIST_DIR}{'' if brotli else ' (gzip only: brotli not installed)'}")
@@ -0,0 +1,203 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from state_store import get_store
+
+# Identifies this worker process in task leases
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+# A task whose lease is older than this is considered orphaned
+TASK_LEASE_SECONDS = int(os.getenv("TASK_LEASE_SECONDS", "120"))
+HEARTBEAT_INTERVAL = TASK_LEASE_SECONDS / 3
+# How often each worker looks for orphaned tasks (0 = only at startup)
+RECOVERY_SWEEP_INTERVAL = int(os.getenv("RECOVERY_SWEEP_INTERVAL", "300"))
+# Give up on a task after this many (re)starts
+MAX_TASK_ATTEMPTS = int(os.getenv("MAX_TASK_ATTEMPTS", "3"))
+
+ACTIVE_STATUSES = ("queued", "processing")
+
+# Strong references to resumed tasks (the event loop only keeps weak ones)
+_resumed_tasks = set()
+
+
+def new_task_fields(request: dict, user_email: str, user_role: str) -> dict:
+    """Fields stored on a new task so any worker can resume it later."""
+    now = time.time()
+    return {
+        "request": request,
+        "user_email": user_email,
+        "user_role": user_role,
+        "attempts": 0,
+        "lease_owner": WORKER_ID,
+        "lease_expires_at": now + TASK_LEASE_SECONDS,
+    }
+
+
+def claim_task(task_id: str) -> bool:
+    """Take (or keep) the lease on an active task. False if another worker holds it."""
+    now = time.time()
+
+    def claim(task):
+        if not task or task.get("status") not in ACTIVE_STATUSES:
+            return None
+        owner = task.get("lease_owner")
+        if owner and owner != WORKER_ID and task.get("lease_expires_at", 0) > now:
+            return None
+        return {
+            "lease_owner": WORKER_ID,
+            "lease_expires_at": now + TASK_LEASE_SECONDS,
+            "attempts": task.get("attempts", 0) + 1,
+        }
+
+    try:
+        return get_store().update_if("tasks", task_id, claim) is not None
+    except Exception as e:
+        print(f"⚠️ Failed to claim task {task_id}: {e}")
+        return False
+
+
+def _renew_lease(task_id: str) -> bool:
+    def renew(task):
+        if not task or task.get("lease_owner") != WORKER_ID:
+            return None
+        return {"lease_expires_at": time.time() + TASK_LEASE_SECONDS}
+
+    return get_store().update_if("tasks", task_id, renew) is not None
+
+
+def _release_lease(task_id: str):
+    def release(task):
+        if not task or task.get("lease_owner") != WORKER_ID:
+            return None
+        return {"lease_owner": None, "lease_expires_at": 0}
+
+    try:
+        get_store().update_if("tasks", task_id, release)
+    except Exception as e:
+        print(f"⚠️ Failed to release task {task_id}: {e}")
+
+
+class LeaseLost(Exception):
+    """Another worker took over the task, so this one stopped working on it."""
+
+
+@asynccontextmanager
+async def task_heartbeat(task_id: str):
+    """Keep renewing this worker's lease on a task while the block runs.
+
+    If a renewal finds the lease gone (it expired and another worker's sweep
+    claimed the task), the block is cancelled and LeaseLost is raised, so two
+    workers never keep writing the same task.
+    """
+    loop = asyncio.get_running_loop()
+    owner = asyncio.current_task()
+    lost = False
+
+    async def beat():
+        nonlocal lost
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                renewed = await loop.run_in_executor(None, _renew_lease, task_id)
+            except Exception as e:
+                print(f"⚠️ Heartbeat for task {task_id} failed: {e}")
+                continue
+            if not renewed:
+                print(f"⚠️ Lost lease on task {task_id}, stopping")
+                lost = True
+                owner.cancel()
+                return
+
+    heartbeat = asyncio.create_task(beat())
+    try:
+        yield
+    except asyncio.CancelledError:
+        if not lost:
+            raise
+        # The cancellation was ours; Python 3.11+ counts it on the task
+        if hasattr(owner, "uncancel"):
+            owner.uncancel()
+        raise LeaseLost(task_id) from None
+    finally:
+        heartbeat.cancel()
+        await loop.run_in_executor(None, _release_lease, task_id)
+
+
+# ═══════ Checkpoints ═══════
+
+def load_checkpoint(task_id: str) -> dict:
+    """Chunk notes already completed for a task, keyed by chunk cache key."""
+    try:
+        task = get_store().get("tasks", task_id) or {}
+    except Exception as e:
+        print(f"⚠️ Failed to load checkpoint for {task_id}: {e}")
+        return {}
+    return task.get("checkpoint") or {}
+
+
+def save_checkpoint(task_id: str, chunk_key: str, notes: str):
+    """Persist one completed chunk so a restarted job doesn't pay for it again."""
+    try:
+        get_store().set("tasks", task_id, {"checkpoint": {chunk_key: notes}}, merge=True)
+    except Exception as e:
+        print(f"⚠️ Failed to checkpoint task {task_id}: {e}")
+
+
+# ═══════ Recovery sweeper ═══════
+
+def find_orphaned_tasks() -> list:
+    """Active tasks whose lease has expired (their worker died or restarted)."""
+    now = time.time()
+    orphaned = []
+    for task_id, task in get_store().query("tasks", "status", list(ACTIVE_STATUSES)):
+        if task.get("lease_expires_at", 0) < now:
+            orphaned.append((task_id, task))
+    return orphaned
+
+
+async def recover_orphaned_tasks(resume) -> int:
+    """Claim orphaned tasks and hand them to `resume(task_id, task)`.
+
+    Tasks that can't be resumed (no stored request, too many attempts) are
+    marked failed instead of staying "processing" forever.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        orphaned = await loop.run_in_executor(None, find_orphaned_tasks)
+    except Exception as e:
+        print(f"⚠️ Recovery sweep failed: {e}")
+        return 0
+
+    resumed = 0
+    for task_id, task in orphaned:
+        if not task.get("request") or task.get("attempts", 0) >= MAX_TASK_ATTEMPTS:
+            get_store().set("tasks", task_id, {
+                "status": "failed",
+                "error": "Task was interrupted by a server restart and could not be resumed.",
+            }, merge=True)
+            print(f"🪦 Task {task_id} could not be resumed, marked failed")
+            continue
+        if not await loop.run_in_executor(None, claim_task, task_id):
+            continue
+        done_chunks = len(task.get("checkpoint") or {})
+        print(f"♻️ Resuming orphaned task {task_id} ({done_chunks} chunks checkpointed)")
+        resumed_task = asyncio.create_task(resume(task_id, task))
+        _resumed_tasks.add(resumed_task)
+        resumed_task.add_done_callback(_resumed_tasks.discard)
+        resumed += 1
+    return resumed
+
+
+async def recovery_loop(resume):
+    """Sweep once at startup, then every RECOVERY_SWEEP_INTERVAL seconds."""
+    # Let a restarting deployment settle so leases held by live peers are renewed first
+    await asyncio.sleep(5)
+    while True:
+        await recover_orphaned_tasks(resume)
+        if RECOVERY_SWEEP_INTERVAL <= 0:
+            return
+        await asyncio.sleep(RECOVERY_SWEEP_INTERVAL)
@@ -0,0 +1,22 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# The app's modules live at the repo root, as in the benchmarks
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def clock(request, monkeypatch):
+    """A controllable clock patched over one module's `time` function.
+
+    The target is a (module, function name) pair, e.g. (egress, "monotonic"):
+    given by indirect parametrization, or by a `clock_target` fixture in the
+    test module. Set or advance `clock.value` to move time.
+    """
+    module, name = getattr(request, "param", None) or request.getfixturevalue("clock_target")
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(module, "time", SimpleNamespace(**{name: lambda: now.value}))
+    return now
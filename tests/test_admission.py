@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+import admission
+from admission import AdmissionDenied, FairScheduler, job_cost
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _job(scheduler, user, cost, order, hold):
+    async with scheduler.slot(user, cost):
+        order.append(user)
+        await hold.wait()
+
+
+async def _drain(scheduler, jobs, order, hold):
+    """Start jobs in submission order, then release them one at a time."""
+    tasks = []
+    for user, cost in jobs:
+        tasks.append(asyncio.create_task(_job(scheduler, user, cost, order, hold)))
+        await asyncio.sleep(0)
+    hold.set()
+    await asyncio.gather(*tasks)
+
+
+def test_backlog_does_not_starve_other_users():
+    async def scenario():
+        scheduler = FairScheduler(capacity=1)
+        order = []
+        # A queues four jobs before B's single job arrives
+        await _drain(scheduler, [("a", 1)] * 4 + [("b", 1)], order, asyncio.Event())
+        return order
+
+    # b's job is tagged like a's first one, so it runs next, not last
+    assert run(scenario()) == ["a", "b", "a", "a", "a"]
+
+
+def test_expensive_jobs_cost_more_turns():
+    async def scenario():
+        scheduler = FairScheduler(capacity=4)
+        order = []
+        hold = asyncio.Event()
+        # Capacity is full, so everything after the first job queues by finish tag
+        await _drain(scheduler, [("a", 4), ("a", 4), ("b", 1), ("b", 1), ("b", 1)], order, hold)
+        return order
+
+    # b's three cheap jobs finish (virtually) before a's second expensive one
+    assert run(scenario()) == ["a", "b", "b", "b", "a"]
+
+
+def test_capacity_is_shared():
+    async def scenario():
+        scheduler = FairScheduler(capacity=3)
+        hold = asyncio.Event()
+        order = []
+        tasks = [asyncio.create_task(_job(scheduler, u, 1, order, hold)) for u in "abcd"]
+        await asyncio.sleep(0.01)
+        running = list(order)
+        busy = scheduler.busy(1)
+        hold.set()
+        await asyncio.gather(*tasks)
+        return running, busy, scheduler.in_use
+
+    running, busy, in_use = run(scenario())
+    assert running == ["a", "b", "c"]
+    assert busy
+    assert in_use == 0
+
+
+def test_job_larger_than_capacity_still_runs():
+    async def scenario():
+        scheduler = FairScheduler(capacity=2)
+        async with scheduler.slot("a", 10):
+            return scheduler.in_use
+
+    assert run(scenario()) == 2
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        scheduler = FairScheduler(capacity=1)
+        hold = asyncio.Event()
+        order = []
+        first = asyncio.create_task(_job(scheduler, "a", 1, order, hold))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(_job(scheduler, "b", 1, order, hold))
+        later = asyncio.create_task(_job(scheduler, "c", 1, order, hold))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        hold.set()
+        await asyncio.gather(first, later)
+        return order, scheduler.in_use, scheduler.queue
+
+    order, in_use, queue = run(scenario())
+    assert order == ["a", "c"]
+    assert in_use == 0
+    assert queue == []
+
+
+def test_cancelled_running_job_frees_capacity():
+    async def scenario():
+        scheduler = FairScheduler(capacity=1)
+        hold = asyncio.Event()
+        order = []
+        running = asyncio.create_task(_job(scheduler, "a", 1, order, hold))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(_job(scheduler, "b", 1, order, hold))
+        await asyncio.sleep(0)
+        running.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await running
+        hold.set()
+        await queued
+        return order, scheduler.in_use
+
+    assert run(scenario()) == (["a", "b"], 0)
+
+
+def test_job_cost():
+    assert job_cost(None) == admission.DEFAULT_JOB_COST
+    assert job_cost(None, direct=True) == admission.DIRECT_JOB_COST
+    assert job_cost({"tier": "short", "chunks": 1}) == 1
+    assert job_cost({"tier": "long", "chunks": 19}) == 20
+
+
+def test_check_budget_refuses_an_empty_budget():
+    user = "test-check-budget@example.com"
+    admission.check_budget(user)
+    admission.admit(user, admission._budget.amount)
+    try:
+        with pytest.raises(AdmissionDenied) as denied:
+            admission.check_budget(user)
+        assert denied.value.retry_after >= 1
+    finally:
+        admission.release(user, admission._budget.amount)
@@ -0,0 +1,70 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
+from fastapi.testclient import TestClient
+
+import api_responses
+from api_responses import CompressionMiddleware, negotiate_encoding
+
+BODY = {"notes": "x" * 5000}
+
+
+@pytest.mark.parametrize("header, encoding", [
+    ("gzip, deflate, br", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("gzip;q=0", ""),
+    ("br;q=0.0, gzip;q=0", ""),
+    ("gzip;q=0.5, br;q=0.4", "gzip"),
+    ("*", "br"),
+    ("*;q=0", ""),
+    ("gzip, *;q=0", "gzip"),
+    ("identity", ""),
+    ("BR", "br"),
+    ("", ""),
+])
+def test_negotiate_encoding(header, encoding):
+    assert negotiate_encoding(header, ("br", "gzip")) == encoding
+
+
+def make_client():
+    app = FastAPI()
+
+    @app.get("/json")
+    def json_body():
+        return JSONResponse(BODY)
+
+    @app.get("/partial")
+    def partial():
+        return Response("x" * 5000, status_code=206, media_type="text/plain",
+                        headers={"Content-Range": "bytes 0-4999/10000"})
+
+    app.add_middleware(CompressionMiddleware)
+    return TestClient(app)
+
+
+def test_refused_encoding_is_not_used():
+    client = make_client()
+    response = client.get("/json", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == BODY
+
+
+def test_accepted_encoding_is_used():
+    client = make_client()
+    response = client.get("/json", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json() == BODY
+
+
+def test_partial_content_passes_through():
+    client = make_client()
+    response = client.get("/partial", headers={"Accept-Encoding": "gzip, br"})
+    assert response.status_code == 206
+    assert "content-encoding" not in response.headers
+    assert response.headers["content-range"] == "bytes 0-4999/10000"
+
+
+def test_gzip_only_without_brotli(monkeypatch):
+    monkeypatch.setattr(api_responses, "brotli", None)
+    response = make_client().get("/json", headers={"Accept-Encoding": "br, gzip"})
+    assert response.headers["content-encoding"] == "gzip"
@@ -0,0 +1,156 @@
+import pytest
+
+import egress
+from egress import EgressBlocked, EgressIdentity, EgressPool, is_block_signal, parse_netscape_cookies
+
+
+@pytest.fixture
+def clock_target():
+    return egress, "monotonic"
+
+
+def make_pool(count=3, strategy="least_blocked"):
+    return EgressPool([EgressIdentity(f"id-{n}") for n in range(count)], strategy=strategy)
+
+
+def names(identities):
+    return [i.name for i in identities]
+
+
+def test_round_robin_rotates(clock):
+    pool = make_pool(strategy="round_robin")
+    firsts = [pool.candidates(limit=1)[0].name for _ in range(4)]
+    assert firsts == ["id-0", "id-1", "id-2", "id-0"]
+
+
+def test_least_blocked_spreads_concurrent_callers(clock):
+    pool = make_pool()
+    firsts = []
+    for _ in range(3):
+        firsts.append(pool.candidates(limit=1)[0].name)
+        clock.value += 1
+    assert sorted(firsts) == ["id-0", "id-1", "id-2"]
+
+
+def test_least_blocked_prefers_identity_blocked_longest_ago(clock):
+    pool = make_pool()
+    a, b, c = pool.identities
+    pool.report_block(a)
+    clock.value += 10
+    pool.report_block(b)
+    clock.value += 10_000  # both rested
+    assert names(pool.candidates()) == ["id-2", "id-0", "id-1"]
+
+
+def test_blocked_identity_rests_then_returns(clock):
+    pool = make_pool()
+    first = pool.identities[0]
+    pool.report_block(first, "429")
+    assert first.blocked_until == clock.value + egress.EGRESS_BACKOFF
+    # Resting identities go last
+    assert pool.candidates()[-1] is first
+    clock.value += egress.EGRESS_BACKOFF
+    # Rested again: ahead of identities that are resting now
+    for other in pool.identities[1:]:
+        pool.report_block(other)
+    assert pool.candidates()[0] is first
+
+
+def test_backoff_doubles_caps_and_resets(clock):
+    pool = make_pool(count=1)
+    identity = pool.identities[0]
+    rests = []
+    for _ in range(8):
+        pool.report_block(identity)
+        rests.append(identity.blocked_until - clock.value)
+    assert rests[:3] == [egress.EGRESS_BACKOFF, egress.EGRESS_BACKOFF * 2, egress.EGRESS_BACKOFF * 4]
+    assert max(rests) == egress.EGRESS_MAX_BACKOFF
+    assert identity.consecutive_blocks == 8
+    pool.report_success(identity)
+    assert identity.backoff == egress.EGRESS_BACKOFF
+    assert identity.consecutive_blocks == 0
+
+
+def test_exhausted_pool_uses_soonest_available(clock):
+    pool = make_pool()
+    a, b, c = pool.identities
+    pool.report_block(a)
+    pool.report_block(a)  # longer rest
+    pool.report_block(b)
+    pool.report_block(c)
+    assert names(pool.candidates()) == ["id-1", "id-2", "id-0"]
+
+
+def test_prefer_goes_first_unless_resting(clock):
+    pool = make_pool()
+    preferred = pool.identities[2]
+    assert pool.candidates(prefer=preferred)[0] is preferred
+    pool.report_block(preferred)
+    assert pool.candidates(prefer=preferred)[0] is not preferred
+
+
+def test_call_moves_to_next_identity_on_block(clock):
+    pool = make_pool()
+    tried = []
+
+    def fetch(identity):
+        tried.append(identity.name)
+        if len(tried) == 1:
+            raise EgressBlocked("Sign in to confirm you're not a bot")
+        return identity.name
+
+    result = pool.call(fetch)
+    assert result == tried[1]
+    assert tried[0] != tried[1]
+    first = next(i for i in pool.identities if i.name == tried[0])
+    assert first.blocks == 1 and first.blocked_until > clock.value
+
+
+def test_call_reraises_other_errors_at_once(clock):
+    pool = make_pool()
+    calls = []
+
+    def fetch(identity):
+        calls.append(identity)
+        raise ValueError("Video unavailable")
+
+    with pytest.raises(ValueError):
+        pool.call(fetch)
+    assert len(calls) == 1
+    assert all(i.blocks == 0 for i in pool.identities)
+
+
+def test_call_raises_last_block_when_all_blocked(clock):
+    pool = make_pool()
+
+    def fetch(identity):
+        raise RuntimeError(f"HTTP Error 429: Too Many Requests ({identity.name})")
+
+    with pytest.raises(RuntimeError, match="429"):
+        pool.call(fetch, limit=2)
+    assert sum(i.blocks for i in pool.identities) == 2
+
+
+@pytest.mark.parametrize("error, blocked", [
+    (EgressBlocked("x"), True),
+    (RuntimeError("HTTP Error 429: Too Many Requests"), True),
+    (RuntimeError("Sign in to confirm you're not a bot"), True),
+    (type("RequestBlocked", (Exception,), {})("blocked"), True),
+    (RuntimeError("Video unavailable"), False),
+    (TimeoutError("timed out"), False),
+])
+def test_is_block_signal(error, blocked):
+    assert is_block_signal(error) is blocked
+
+
+def test_parse_netscape_cookies():
+    text = (
+        "# Netscape HTTP Cookie File\n"
+        ".youtube.com\tTRUE\t/\tTRUE\t1999999999\tSID\tabc\n"
+        "#HttpOnly_.youtube.com\tTRUE\t/\tFALSE\t0\tHSID\tdef\n"
+        "malformed line\n"
+    )
+    assert parse_netscape_cookies(text) == [
+        (".youtube.com", "/", True, 1999999999, "SID", "abc"),
+        (".youtube.com", "/", False, 0, "HSID", "def"),
+    ]
@@ -0,0 +1,122 @@
+import pytest
+
+import provider_health
+from provider_health import CLOSED, HALF_OPEN, OPEN, HealthRegistry, is_fatal_error
+
+
+@pytest.fixture
+def clock_target():
+    return provider_health, "time"
+
+
+def state(registry, name):
+    return registry.snapshot()[name]["state"]
+
+
+def trip(registry, name):
+    for _ in range(provider_health.FAILURE_THRESHOLD):
+        assert registry.acquire(name)
+        registry.record_failure(name, 1.0)
+
+
+class StatusError(Exception):
+    def __init__(self, message, **attrs):
+        super().__init__(message)
+        self.__dict__.update(attrs)
+
+
+def test_consecutive_failures_open_the_circuit(clock):
+    registry = HealthRegistry()
+    for _ in range(provider_health.FAILURE_THRESHOLD - 1):
+        registry.record_failure("m", 1.0)
+    assert state(registry, "m") == CLOSED
+    registry.record_failure("m", 1.0)
+    assert state(registry, "m") == OPEN
+    assert not registry.acquire("m")
+
+
+def test_success_resets_consecutive_failures(clock):
+    registry = HealthRegistry()
+    for _ in range(provider_health.FAILURE_THRESHOLD - 1):
+        registry.record_failure("m", 1.0)
+    registry.record_success("m", 1.0)
+    registry.record_failure("m", 1.0)
+    assert state(registry, "m") == CLOSED
+
+
+def test_error_rate_opens_the_circuit(clock):
+    registry = HealthRegistry()
+    # Alternating outcomes never reach the consecutive threshold, but half fail
+    for _ in range(provider_health.MIN_SAMPLES):
+        registry.record_success("m", 1.0)
+        registry.record_failure("m", 1.0)
+    assert state(registry, "m") == OPEN
+
+
+def test_half_open_probe_success_closes(clock):
+    registry = HealthRegistry()
+    trip(registry, "m")
+    clock.value += provider_health.BASE_COOLDOWN
+    assert registry.acquire("m")
+    assert state(registry, "m") == HALF_OPEN
+    # Only one probe at a time
+    assert not registry.acquire("m")
+    registry.record_success("m", 1.0)
+    assert state(registry, "m") == CLOSED
+    assert registry.snapshot()["m"]["error_rate"] == 0.0
+
+
+def test_half_open_probe_failure_doubles_cooldown(clock):
+    registry = HealthRegistry()
+    trip(registry, "m")
+    clock.value += provider_health.BASE_COOLDOWN
+    assert registry.acquire("m")
+    registry.record_failure("m", 1.0)
+    assert state(registry, "m") == OPEN
+    clock.value += provider_health.BASE_COOLDOWN
+    assert not registry.acquire("m")
+    clock.value += provider_health.BASE_COOLDOWN
+    assert registry.acquire("m")
+
+
+def test_released_probe_can_be_retried(clock):
+    registry = HealthRegistry()
+    trip(registry, "m")
+    clock.value += provider_health.BASE_COOLDOWN
+    assert registry.acquire("m")
+    registry.release("m")
+    assert state(registry, "m") == OPEN
+    assert registry.acquire("m")
+
+
+def test_fatal_error_opens_for_long(clock):
+    registry = HealthRegistry()
+    registry.record_failure("m", 1.0, StatusError("Not Found", status_code=404))
+    assert state(registry, "m") == OPEN
+    clock.value += provider_health.MAX_COOLDOWN
+    assert not registry.acquire("m")
+    clock.value += provider_health.FATAL_COOLDOWN
+    assert registry.acquire("m")
+
+
+def test_order_prefers_healthy_models_and_probes_last(clock):
+    registry = HealthRegistry()
+    registry.record_success("slow", 60.0)
+    registry.record_success("fast", 1.0)
+    trip(registry, "broken")
+    assert registry.order(["slow", "broken", "fast"]) == ["fast", "slow"]
+    clock.value += provider_health.BASE_COOLDOWN
+    assert registry.order(["broken", "slow", "fast"]) == ["fast", "slow", "broken"]
+
+
+@pytest.mark.parametrize("error, fatal", [
+    (StatusError("Not Found", status_code=404), True),
+    (StatusError("NOT_FOUND", code=404), True),
+    (RuntimeError("The model `x` has been decommissioned"), True),
+    (RuntimeError("model_not_found"), True),
+    (RuntimeError("request 404ab timed out after 404 ms"), False),
+    (StatusError("Too Many Requests", status_code=429), False),
+    (StatusError("boom", code="ECONNRESET"), False),
+])
+def test_is_fatal_error(error, fatal):
+    assert is_fatal_error(error) is fatal
@@ -0,0 +1,51 @@
+import pytest
+
+from transcript_compress import clean_transcript, compress_transcript, drop_near_duplicates, split_sentences
+
+
+@pytest.mark.parametrize("text, cleaned", [
+    ("so the the cat sat", "so the cat sat"),
+    ("we start here we start here and go", "we start here and go"),
+    ("[Music] hello [Applause] world ♪ la ♪", "hello world la"),
+    ("so, um, we begin uh now", "so, we begin now"),
+    ("I think, you know, it works", "I think, it works"),
+    ("Hmm, let me see", "let me see"),
+])
+def test_clean_removes_noise(text, cleaned):
+    assert clean_transcript(text) == cleaned
+
+
+@pytest.mark.parametrize("text", [
+    # Repeats across a sentence end are two sentences, not a stutter
+    "The answer is no. No one knew.",
+    "It was good. Good things happen.",
+    "Is it? It is.",
+    # Numbers and units
+    "The value is 1 1 and then 2024, 2024",
+    "Use a 10 mm bolt.",
+    # "you know" / "I mean" as real words
+    "What do you know about it? I mean it.",
+    "You know the answer.",
+    # Bracketed text that isn't a caption marker
+    "[John] said hi",
+    "uh-oh",
+])
+def test_clean_keeps_meaning(text):
+    assert clean_transcript(text) == text
+
+
+def test_split_sentences_falls_back_to_word_windows():
+    text = " ".join(["word"] * 60)
+    assert len(split_sentences(text)) == 3
+    assert split_sentences("One. Two! Three?") == ["One.", "Two!", "Three?"]
+
+
+def test_drop_near_duplicates():
+    sentences = ["we talk about gradient descent today", "we talk about gradient descent today",
+                 "something else entirely here"]
+    assert drop_near_duplicates(sentences) == [sentences[0], sentences[2]]
+
+
+def test_off_returns_the_text_unchanged():
+    text = "so the the [Music] um text"
+    assert compress_transcript(text, mode="off") == text
@@ -0,0 +1,87 @@
+import pytest
+
+import video_metadata
+from video_metadata import INNERTUBE_CLIENTS, probe_video
+
+CAPTIONS = {"captions": {"playerCaptionsTracklistRenderer": {"captionTracks": [
+    {"baseUrl": "https://example.com/caps", "languageCode": "en"},
+]}}}
+
+
+def answer(status, reason="", captions=False):
+    data = {"playabilityStatus": {"status": status, "reason": reason},
+            "videoDetails": {"title": "t", "lengthSeconds": "60"}}
+    if captions:
+        data.update(CAPTIONS)
+    return data
+
+
+@pytest.fixture
+def player(monkeypatch):
+    """Set per-client player responses (dict, None for an HTTP error, or an exception)."""
+    answers = {}
+    calls = []
+
+    def fetch(client, video_id):
+        calls.append(client["name"])
+        result = answers.get(client["name"])
+        if isinstance(result, Exception):
+            raise result
+        return result, None
+
+    monkeypatch.setattr(video_metadata, "fetch_player_response", fetch)
+    monkeypatch.setattr(video_metadata, "remember_tracks", lambda *args: None)
+    return answers, calls
+
+
+def names():
+    return [client["name"] for client in INNERTUBE_CLIENTS]
+
+
+def test_one_client_error_is_not_trusted(player):
+    answers, calls = player
+    first, *rest = names()
+    answers[first] = answer("ERROR", "Video unavailable")
+    for name in rest:
+        answers[name] = None
+    assert probe_video("vid") is None
+    assert calls == names()
+
+
+def test_one_client_error_then_playable(player):
+    answers, _ = player
+    first, second, *_ = names()
+    answers[first] = answer("ERROR", "Video unavailable")
+    answers[second] = answer("OK", captions=True)
+    metadata = probe_video("vid")
+    assert metadata.playable and metadata.has_captions
+
+
+def test_two_clients_agree_on_unavailable(player):
+    answers, calls = player
+    first, second, *_ = names()
+    answers[first] = answer("ERROR", "Video unavailable")
+    answers[second] = answer("LOGIN_REQUIRED", "This video is private")
+    metadata = probe_video("vid")
+    assert metadata.unavailable
+    assert calls == [first, second]
+
+
+def test_lone_error_does_not_hide_other_answers(player):
+    answers, _ = player
+    first, second, *rest = names()
+    answers[first] = answer("ERROR")
+    answers[second] = answer("LOGIN_REQUIRED", "Sign in to confirm you're not a bot")
+    for name in rest:
+        answers[name] = RuntimeError("timeout")
+    metadata = probe_video("vid")
+    assert metadata.status == "LOGIN_REQUIRED"
+    assert not metadata.unavailable
+
+
+def test_playable_without_captions_falls_back_to_first_playable(player):
+    answers, _ = player
+    for name in names():
+        answers[name] = answer("OK")
+    metadata = probe_video("vid")
+    assert metadata.playable and not metadata.has_captions
@@ -0,0 +1,97 @@
+import pytest
+
+from video_ref import VideoRef, VideoRefError, parse_timestamp, parse_video_id, parse_video_ref, parse_video_refs
+
+VIDEO_ID = "dQw4w9WgXcQ"
+
+
+@pytest.mark.parametrize("text", [
+    f"https://www.youtube.com/watch?v={VIDEO_ID}",
+    f"http://youtube.com/watch?v={VIDEO_ID}",
+    f"youtube.com/watch?v={VIDEO_ID}",
+    f"https://m.youtube.com/watch?v={VIDEO_ID}",
+    f"https://music.youtube.com/watch?v={VIDEO_ID}",
+    f"https://www.youtube.com/watch?feature=share&v={VIDEO_ID}",
+    f"https://youtu.be/{VIDEO_ID}",
+    f"https://youtu.be/{VIDEO_ID}?si=abc123",
+    f"https://www.youtube.com/shorts/{VIDEO_ID}",
+    f"https://www.youtube.com/embed/{VIDEO_ID}",
+    f"https://www.youtube.com/live/{VIDEO_ID}?feature=share",
+    f"https://www.youtube.com/v/{VIDEO_ID}",
+    f"https://www.youtube-nocookie.com/embed/{VIDEO_ID}",
+    f"  https://www.youtube.com/watch?v={VIDEO_ID}  ",
+    f"https%3A%2F%2Fwww.youtube.com%2Fwatch%3Fv%3D{VIDEO_ID}",
+    f"Check this out: https://youtu.be/{VIDEO_ID} it's great",
+    VIDEO_ID,
+])
+def test_url_forms(text):
+    assert parse_video_id(text) == VIDEO_ID
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("90", 90),
+    ("90s", 90),
+    ("1m30s", 90),
+    ("1h2m3s", 3723),
+    ("2h", 7200),
+    ("abc", None),
+    ("", None),
+])
+def test_parse_timestamp(value, seconds):
+    assert parse_timestamp(value) == seconds
+
+
+@pytest.mark.parametrize("text, start", [
+    (f"https://www.youtube.com/watch?v={VIDEO_ID}&t=90", 90),
+    (f"https://youtu.be/{VIDEO_ID}?t=1m30s", 90),
+    (f"https://www.youtube.com/watch?v={VIDEO_ID}#t=45s", 45),
+    (f"https://www.youtube.com/embed/{VIDEO_ID}?start=30", 30),
+    (f"https://www.youtube.com/watch?v={VIDEO_ID}&t=bogus", None),
+])
+def test_start_time(text, start):
+    assert parse_video_ref(text).start_seconds == start
+
+
+def test_playlist_and_canonical_url():
+    ref = parse_video_ref(f"https://www.youtube.com/watch?v={VIDEO_ID}&list=PLabc123_-&t=1m")
+    assert ref == VideoRef(VIDEO_ID, "PLabc123_-", 60)
+    assert ref.url == f"https://www.youtube.com/watch?v={VIDEO_ID}&list=PLabc123_-&t=60s"
+
+
+def test_playlist_link_is_rejected():
+    with pytest.raises(VideoRefError, match="playlist"):
+        parse_video_ref("https://www.youtube.com/playlist?list=PLabc123")
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "   ",
+    "https://vimeo.com/123456",
+    "https://www.youtube.com/watch?v=short",
+    "https://www.youtube.com/@channel",
+    "not a link",
+])
+def test_invalid(text):
+    with pytest.raises(VideoRefError):
+        parse_video_ref(text)
+
+
+def test_invalid_is_value_error():
+    assert issubclass(VideoRefError, ValueError)
+
+
+def test_bulk_dedupes_and_reports_invalid():
+    result = parse_video_refs([
+        f"https://youtu.be/{VIDEO_ID}",
+        "",
+        "https://example.com",
+        f"https://www.youtube.com/watch?v={VIDEO_ID}&t=10",
+        "https://youtu.be/aaaaaaaaaaa",
+    ])
+    assert [ref.video_id for ref in result.refs] == [VIDEO_ID, "aaaaaaaaaaa"]
+    assert [(index, text) for index, text, _ in result.invalid] == [(2, "https://example.com")]
+
+
+def test_bulk_keeps_repeats_when_not_unique():
+    result = parse_video_refs([VIDEO_ID, VIDEO_ID], unique=False)
+    assert len(result.refs) == 2
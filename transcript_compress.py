@@ -0,0 +1,166 @@
+import os
+import re
+import zlib
+from collections import deque
+
+# "off", "clean" (markers/fillers/duplicates) or "textrank" (clean + extractive
+# sentence selection down to TRANSCRIPT_COMPRESS_RATIO of the original length)
+TRANSCRIPT_COMPRESSION = os.getenv("TRANSCRIPT_COMPRESSION", "clean").lower()
+TRANSCRIPT_COMPRESS_RATIO = float(os.getenv("TRANSCRIPT_COMPRESS_RATIO", "0.6"))
+
+# Below this share of the original, the compressed text is discarded (the
+# transcript was mostly markers, or the filters misfired) and the original used
+TRANSCRIPT_MIN_KEEP = 0.1
+
+# Caption markers like [Music], [Applause], (laughter), [ __ ], ♪ ... ♪
+_MARKERS = (
+    "music", "applause", "laughter", "laughs", "laughing", "inaudible", "silence", "cheering",
+    "cheers", "crosstalk", "foreign", "noise", "background noise", "sound effects", "__",
+)
+_MARKER_RE = re.compile(
+    r"[\[(]\s*(?:" + "|".join(re.escape(m) for m in _MARKERS) + r")\s*[\])]|[♪♫]+",
+    re.IGNORECASE,
+)
+# Hesitation sounds ("um", "uh", "hmm"), with a trailing comma if present. Words
+# that can carry meaning ("mm" as millimetres, "you know", "I mean") are only
+# dropped when set off by commas.
+_FILLER_RE = re.compile(r"\b(?:um+|uh+|uhm+|erm+|hmm+)\b(?![-'])(?:,(?=\s))?\s*", re.IGNORECASE)
+_ASIDE_RE = re.compile(r",\s*(?:you know|i mean),", re.IGNORECASE)
+# The same 1-6 word phrase repeated back to back within a sentence ("the the",
+# rolling captions). Only plain spaces may separate the copies, so punctuation
+# ("no. No one") and numbers ("1 1") are left alone.
+_REPEAT_RE = re.compile(r"\b([^\W\d_]+(?: [^\W\d_]+){0,5}?)(?: \1\b)+", re.IGNORECASE)
+_SPACES_RE = re.compile(r"\s+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"\w+")
+
+# Auto-captions are often unpunctuated; such text is split into word windows
+_WINDOW_WORDS = 25
+# Sentences compared for near-duplicates, and the similarity that counts as one
+_DEDUPE_LOOKBACK = 50
+_NEAR_DUPLICATE = 0.8
+# TextRank settings
+_HASH_DIM = 4096
+_TEXTRANK_BLOCK = 1000
+_DAMPING = 0.85
+_ITERATIONS = 30
+
+
+def clean_transcript(text: str) -> str:
+    """Drop caption markers, filler words and back-to-back repeated phrases."""
+    text = _MARKER_RE.sub(" ", text)
+    text = _FILLER_RE.sub("", text)
+    text = _ASIDE_RE.sub(",", text)
+    text = _SPACES_RE.sub(" ", text)
+    text = _REPEAT_RE.sub(r"\1", text)
+    return text.strip()
+
+
+def split_sentences(text: str) -> list:
+    """Split on sentence punctuation, or into fixed word windows if there is none."""
+    sentences = [s for s in _SENTENCE_RE.split(text) if s]
+    if len(sentences) > 1 and len(text) / len(sentences) < 600:
+        return sentences
+    words = text.split()
+    return [" ".join(words[i:i + _WINDOW_WORDS]) for i in range(0, len(words), _WINDOW_WORDS)]
+
+
+def _shingles(sentence: str) -> frozenset:
+    """Hashed word bigrams (unigrams for very short sentences)."""
+    words = _WORD_RE.findall(sentence.lower())
+    if len(words) < 3:
+        return frozenset(zlib.crc32(w.encode()) for w in words)
+    return frozenset(zlib.crc32(f"{a} {b}".encode()) for a, b in zip(words, words[1:]))
+
+
+def drop_near_duplicates(sentences: list) -> list:
+    """Remove sentences that (nearly) repeat one of the recent ones."""
+    kept = []
+    seen_exact = set()
+    recent = deque(maxlen=_DEDUPE_LOOKBACK)
+    for sentence in sentences:
+        shingles = _shingles(sentence)
+        if not shingles:
+            continue
+        key = hash(shingles)
+        if key in seen_exact:
+            continue
+        if any(len(shingles & other) / len(shingles | other) >= _NEAR_DUPLICATE for other in recent):
+            continue
+        seen_exact.add(key)
+        recent.append(shingles)
+        kept.append(sentence)
+    return kept
+
+
+def _textrank_scores(sentences: list):
+    """TextRank over hashed bag-of-words vectors (cosine similarity)."""
+    import numpy as np
+
+    n = len(sentences)
+    vectors = np.zeros((n, _HASH_DIM), dtype=np.float32)
+    for i, sentence in enumerate(sentences):
+        for word in _WORD_RE.findall(sentence.lower()):
+            vectors[i, zlib.crc32(word.encode()) % _HASH_DIM] += 1.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.maximum(norms, 1e-9)
+
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, 0.0)
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    transition = np.divide(similarity, row_sums, out=np.full_like(similarity, 1.0 / n), where=row_sums > 0)
+
+    scores = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(_ITERATIONS):
+        scores = (1 - _DAMPING) / n + _DAMPING * (transition.T @ scores)
+    return scores
+
+
+def select_sentences(sentences: list, target_chars: int) -> list:
+    """Keep the highest-ranked sentences (in original order) up to target_chars.
+
+    Ranking runs per block of sentences so memory stays bounded and every
+    part of a long video keeps its proportional share.
+    """
+    total = sum(len(s) + 1 for s in sentences)
+    if total <= target_chars:
+        return sentences
+    keep_ratio = target_chars / total
+    kept = []
+    for start in range(0, len(sentences), _TEXTRANK_BLOCK):
+        block = sentences[start:start + _TEXTRANK_BLOCK]
+        if len(block) < 3:
+            kept.extend(block)
+            continue
+        scores = _textrank_scores(block)
+        budget = keep_ratio * sum(len(s) + 1 for s in block)
+        chosen = set()
+        used = 0
+        for index in sorted(range(len(block)), key=lambda i: -scores[i]):
+            if used >= budget:
+                break
+            chosen.add(index)
+            used += len(block[index]) + 1
+        kept.extend(block[i] for i in sorted(chosen))
+    return kept
+
+
+def compress_transcript(text: str, mode: str = None, ratio: float = None) -> str:
+    """Shrink a transcript before chunking. Pure CPU, no network.
+
+    mode "clean" removes markers, fillers and (near-)duplicate sentences;
+    "textrank" additionally keeps only the top-ranked sentences up to
+    `ratio` of the original length. Needs NumPy; falls back to "clean".
+    """
+    mode = (mode or TRANSCRIPT_COMPRESSION).lower()
+    ratio = TRANSCRIPT_COMPRESS_RATIO if ratio is None else ratio
+    if mode == "off":
+        return text
+
+    sentences = drop_near_duplicates(split_sentences(clean_transcript(text)))
+    if mode == "textrank" and 0 < ratio < 1:
+        try:
+            sentences = select_sentences(sentences, int(len(text) * ratio))
+        except ImportError:
+            print("⚠️ NumPy not installed, skipping TextRank compression")
+    return " ".join(sentences)
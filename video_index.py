@@ -0,0 +1,163 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
+
+# Per-video vector indexes of transcript passages, used to answer follow-up
+# questions without re-running the notes pipeline. Each index is a float16
+# .npy matrix (memory-mapped on load) plus a .json file with the passages.
+VIDEO_INDEX_DIR = os.getenv(
+    "VIDEO_INDEX_DIR",
+    os.path.join(tempfile.gettempdir(), "yt_transcripter_vectors"),
+)
+# "hashing" (deterministic, no model download) or a sentence-transformers model name
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "hashing")
+HASHING_DIM = int(os.getenv("HASHING_DIM", "1024"))
+# Loaded indexes kept in memory per worker
+VIDEO_INDEX_CACHE_SIZE = 64
+
+_WORD_RE = re.compile(r"\w+")
+_SAFE_RE = re.compile(r"[^A-Za-z0-9_-]+")
+
+
+class HashingEmbedder:
+    """Signed feature hashing of word unigrams and bigrams, log-scaled and L2-normalized."""
+
+    def __init__(self, dim: int = HASHING_DIM):
+        self.dim = dim
+        self.key = f"hashing{dim}"
+
+    def embed(self, texts: list):
+        import numpy as np
+
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = _WORD_RE.findall(text.lower())
+            features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            if not features:
+                continue
+            hashes = np.fromiter((zlib.crc32(f.encode()) for f in features), dtype=np.uint32, count=len(features))
+            signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+            np.add.at(vectors[row], hashes % self.dim, signs)
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+
+class SentenceTransformerEmbedder:
+    """A local sentence-transformers model (optional dependency)."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+        self.key = _SAFE_RE.sub("_", model_name)
+
+    def embed(self, texts: list):
+        import numpy as np
+
+        vectors = self.model.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+@lru_cache(maxsize=1)
+def get_embedder():
+    """The configured embedder; falls back to hashing if the model can't load."""
+    if EMBEDDING_MODEL == "hashing":
+        return HashingEmbedder()
+    try:
+        return SentenceTransformerEmbedder(EMBEDDING_MODEL)
+    except Exception as e:
+        print(f"⚠️ Embedding model {EMBEDDING_MODEL} unavailable ({e}), using hashing vectorizer")
+        return HashingEmbedder()
+
+
+class VideoIndex:
+    """Passages of one video's transcript and their embeddings."""
+
+    def __init__(self, video_id: str, passages: list, vectors):
+        self.video_id = video_id
+        self.passages = passages
+        self.vectors = vectors
+
+    def search(self, query: str, top_k: int = 4) -> list:
+        """Return [(passage_index, score, text)] for the best-matching passages."""
+        import numpy as np
+
+        if not self.passages:
+            return []
+        query_vector = get_embedder().embed([query])[0]
+        scores = np.asarray(self.vectors, dtype=np.float32) @ query_vector
+        k = min(top_k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(int(i), float(scores[i]), self.passages[i]) for i in best]
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _paths(video_id: str) -> tuple:
+    base = os.path.join(VIDEO_INDEX_DIR, f"{_SAFE_RE.sub('_', video_id)}.{get_embedder().key}")
+    return base + ".npy", base + ".json"
+
+
+def _remember(index: VideoIndex):
+    with _cache_lock:
+        _cache[index.video_id] = index
+        _cache.move_to_end(index.video_id)
+        while len(_cache) > VIDEO_INDEX_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def load_video_index(video_id: str) -> Optional[VideoIndex]:
+    """Load a video's index (memory-mapped), or None if it hasn't been built here."""
+    with _cache_lock:
+        index = _cache.get(video_id)
+        if index is not None:
+            _cache.move_to_end(video_id)
+            return index
+    import numpy as np
+
+    vectors_path, passages_path = _paths(video_id)
+    if not (os.path.exists(vectors_path) and os.path.exists(passages_path)):
+        return None
+    try:
+        with open(passages_path, encoding="utf-8") as f:
+            passages = json.load(f)["passages"]
+        vectors = np.load(vectors_path, mmap_mode="r")
+    except Exception as e:
+        print(f"⚠️ Failed to load vector index for {video_id}: {e}")
+        return None
+    index = VideoIndex(video_id, passages, vectors)
+    _remember(index)
+    return index
+
+
+def build_video_index(video_id: str, passages: list) -> VideoIndex:
+    """Embed transcript passages and write the index for a video (atomically)."""
+    import numpy as np
+
+    embedder = get_embedder()
+    vectors = embedder.embed(passages).astype(np.float16)
+    vectors_path, passages_path = _paths(video_id)
+    os.makedirs(VIDEO_INDEX_DIR, exist_ok=True)
+
+    tmp_suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(vectors_path + tmp_suffix, "wb") as f:
+        np.save(f, vectors)
+    with open(passages_path + tmp_suffix, "w", encoding="utf-8") as f:
+        json.dump({"video_id": video_id, "embedder": embedder.key, "passages": passages}, f)
+    # Passages first: a reader only trusts the index once the vectors exist
+    os.replace(passages_path + tmp_suffix, passages_path)
+    os.replace(vectors_path + tmp_suffix, vectors_path)
+
+    index = VideoIndex(video_id, passages, vectors)
+    _remember(index)
+    return index
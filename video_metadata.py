@@ -0,0 +1,190 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+from caption_language import remember_tracks
+from egress import BLOCK_STATUSES, EgressBlocked, get_egress_pool
+from metrics import span
+
+INNERTUBE_PLAYER_URL = "https://www.youtube.com/youtubei/v1/player?prettyPrint=false"
+
+# Innertube clients, in the order they are tried
+INNERTUBE_CLIENTS = [
+    {
+        "name": "ANDROID",
+        "client": {"clientName": "ANDROID", "clientVersion": "19.09.37", "androidSdkVersion": 30, "hl": "en", "gl": "US"},
+        "ua": "com.google.android.youtube/19.09.37 (Linux; U; Android 11)"
+    },
+    {
+        "name": "IOS",
+        "client": {"clientName": "IOS", "clientVersion": "19.09.3", "deviceModel": "iPhone14,3", "hl": "en", "gl": "US"},
+        "ua": "com.google.ios.youtube/19.09.3 (iPhone14,3; U; CPU iPhone OS 15_6 like Mac OS X)"
+    },
+    {
+        "name": "MWEB",
+        "client": {"clientName": "MWEB", "clientVersion": "2.20241201.00.00", "hl": "en", "gl": "US"},
+        "ua": "Mozilla/5.0 (Linux; Android 11; Pixel 5) AppleWebKit/537.36 Chrome/120.0.0.0 Mobile Safari/537.36"
+    },
+    {
+        "name": "TV_EMBED",
+        "client": {"clientName": "TVHTML5_SIMPLY_EMBEDDED_PLAYER", "clientVersion": "2.0", "hl": "en", "gl": "US"},
+        "ua": "Mozilla/5.0"
+    },
+    {
+        "name": "WEB",
+        "client": {"clientName": "WEB", "clientVersion": "2.20241201.00.00", "hl": "en", "gl": "US"},
+        "ua": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    },
+]
+
+# Clients that must agree a video is unavailable before the task fails on it;
+# one client's ERROR alone can be a client-specific glitch
+UNAVAILABLE_QUORUM = 2
+
+# Rough caption density, used to predict the tier before the transcript exists
+CAPTION_CHARS_PER_SECOND = 14
+
+
+def fetch_player_response(client: dict, video_id: str) -> tuple:
+    """POST one innertube player request through the egress pool.
+
+    Returns (data, identity): data is None unless YouTube answered 200, and
+    identity is the egress identity that got the answer (its caption URLs
+    should be fetched through the same one). A 403/429 or a bot check moves
+    the request to the next identity; EgressBlocked if all were blocked.
+    """
+    def attempt(identity):
+        resp = identity.http.post(
+            INNERTUBE_PLAYER_URL,
+            json={"context": {"client": client["client"]}, "videoId": video_id},
+            headers={"Content-Type": "application/json", "User-Agent": client["ua"]},
+        )
+        if resp.status_code in BLOCK_STATUSES:
+            raise EgressBlocked(f"innertube HTTP {resp.status_code}")
+        if resp.status_code != 200:
+            return None, identity
+        data = resp.json()
+        if "not a bot" in data.get("playabilityStatus", {}).get("reason", ""):
+            raise EgressBlocked(data["playabilityStatus"]["reason"])
+        return data, identity
+
+    return get_egress_pool().call(attempt)
+
+
+def caption_tracks(player_response: dict) -> list:
+    return (player_response.get("captions", {})
+            .get("playerCaptionsTracklistRenderer", {})
+            .get("captionTracks", []))
+
+
+@dataclass
+class VideoMetadata:
+    """What the innertube player response says about a video before any transcript fetch."""
+
+    video_id: str
+    status: str                      # playabilityStatus.status: OK, ERROR, LOGIN_REQUIRED, UNPLAYABLE, ...
+    reason: str = ""
+    title: str = ""
+    duration_seconds: int = 0
+    is_live: bool = False
+    is_upcoming: bool = False
+    caption_tracks: list = field(default_factory=list)
+    client: str = ""
+    egress: object = None            # EgressIdentity that fetched the caption URLs
+
+    @property
+    def playable(self) -> bool:
+        return self.status == "OK"
+
+    @property
+    def unavailable(self) -> bool:
+        """Removed, nonexistent or private — no method will ever get a transcript.
+
+        LOGIN_REQUIRED alone isn't enough: cloud IPs get "confirm you're not a
+        bot" and age gates under the same status, and cookies may still work.
+        """
+        reason = self.reason.lower()
+        return self.status == "ERROR" or (self.status == "LOGIN_REQUIRED" and "private" in reason)
+
+    @property
+    def has_captions(self) -> bool:
+        return bool(self.caption_tracks)
+
+    @property
+    def languages(self) -> list:
+        return sorted({t.get("languageCode", "") for t in self.caption_tracks} - {""})
+
+    @property
+    def estimated_chars(self) -> int:
+        return self.duration_seconds * CAPTION_CHARS_PER_SECOND
+
+    def summary(self) -> dict:
+        """JSON-friendly view stored on the task."""
+        return {
+            "title": self.title,
+            "duration_seconds": self.duration_seconds,
+            "has_captions": self.has_captions,
+            "caption_languages": self.languages,
+            "is_live": self.is_live,
+        }
+
+
+def _parse(video_id: str, client_name: str, data: dict, egress=None) -> VideoMetadata:
+    playability = data.get("playabilityStatus", {})
+    details = data.get("videoDetails", {})
+    try:
+        duration = int(details.get("lengthSeconds") or 0)
+    except ValueError:
+        duration = 0
+    return VideoMetadata(
+        video_id=video_id,
+        status=playability.get("status", "UNKNOWN"),
+        reason=playability.get("reason", ""),
+        title=details.get("title", ""),
+        duration_seconds=duration,
+        is_live=bool(details.get("isLive") or (details.get("isLiveContent") and not duration)),
+        is_upcoming=bool(details.get("isUpcoming")),
+        caption_tracks=caption_tracks(data),
+        client=client_name,
+        egress=egress,
+    )
+
+
+def probe_video(video_id: str) -> Optional[VideoMetadata]:
+    """Cheap pre-check from the innertube player response (no transcript download).
+
+    Clients are tried until one reports a playable video with captions. Falls
+    back to the first playable answer, then to the first other answer. An
+    "unavailable" verdict is only returned once UNAVAILABLE_QUORUM clients
+    agree; otherwise it is ignored so the transcript methods still get a try.
+    None if no usable answer came back (the caller should carry on as before).
+    """
+    first_answer = None
+    first_playable = None
+    unavailable = []
+    for client in INNERTUBE_CLIENTS:
+        try:
+            with span("metadata_probe", client["name"]) as sp:
+                data, identity = fetch_player_response(client, video_id)
+                if data is None:
+                    sp.outcome = "http_error"
+                    continue
+                metadata = _parse(video_id, client["name"], data, identity)
+                sp.outcome = metadata.status.lower()
+        except Exception as e:
+            print(f"  probe {client['name']}: {e}")
+            continue
+        if metadata.playable and metadata.has_captions:
+            remember_tracks(video_id, metadata.caption_tracks, identity)
+            return metadata
+        if metadata.unavailable:
+            unavailable.append(metadata)
+            if len(unavailable) >= UNAVAILABLE_QUORUM:
+                return unavailable[0]
+            continue
+        if metadata.playable and first_playable is None:
+            first_playable = metadata
+        if first_answer is None:
+            first_answer = metadata
+    if unavailable and not (first_playable or first_answer):
+        print(f"  probe: only {unavailable[0].client} reports {video_id} unavailable, not trusting it")
+    return first_playable or first_answer
@@ -0,0 +1,179 @@
+import re
+from dataclasses import dataclass
+from typing import Iterable, NamedTuple, Optional
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+# Parsing of YouTube video references (watch/short/embed/live URLs, youtu.be
+# links, bare IDs) into a video ID plus the optional playlist and start time.
+# Canonical URLs are matched by one precompiled regex; anything else goes
+# through a single urlsplit and, as a last resort, a search for an embedded
+# YouTube URL. Errors are VideoRefError (a ValueError); callers decide how to
+# report them.
+
+_ID = r"[A-Za-z0-9_-]{11}"
+_ID_RE = re.compile(_ID)
+_PLAYLIST_RE = re.compile(r"[A-Za-z0-9_-]{2,64}")
+
+# https://www.youtube.com/watch?v=ID, youtu.be/ID, /shorts/ID, ... optionally followed by params
+_FAST_RE = re.compile(
+    r"(?:https?://)?(?:(?:www|m|music)\.)?"
+    r"(?:youtube\.com/(?:watch\?v=|shorts/|embed/|live/|v/)|youtu\.be/)"
+    r"(" + _ID + r")/?(?:[?&#]([^\s]*))?"
+)
+# Parameters we keep, from the query string or a #t= fragment
+_PARAM_RE = re.compile(r"(?:^|[?&#])(list|t|start)=([^&#]*)")
+# Any of the above inside other text (e.g. a pasted sentence or a redirect URL)
+_SEARCH_RE = re.compile(
+    r"(?:youtube(?:-nocookie)?\.com/(?:watch\?(?:[^#\s]*&)?v=|shorts/|embed/|live/|v/)|youtu\.be/)"
+    r"(" + _ID + r")(?![A-Za-z0-9_-])"
+)
+_TIME_RE = re.compile(r"(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s?)?")
+
+_YOUTUBE_HOSTS = frozenset({"youtube.com", "youtube-nocookie.com"})
+_HOST_PREFIXES = ("www.", "m.", "music.")
+_PATH_PREFIXES = ("/shorts/", "/embed/", "/live/", "/v/")
+
+
+class VideoRefError(ValueError):
+    """The text doesn't reference a YouTube video."""
+
+
+@dataclass(frozen=True)
+class VideoRef:
+    video_id: str
+    playlist_id: Optional[str] = None
+    start_seconds: Optional[int] = None
+
+    @property
+    def url(self) -> str:
+        """Canonical watch URL, keeping the playlist and start time."""
+        url = f"https://www.youtube.com/watch?v={self.video_id}"
+        if self.playlist_id:
+            url += f"&list={self.playlist_id}"
+        if self.start_seconds:
+            url += f"&t={self.start_seconds}s"
+        return url
+
+
+def parse_timestamp(value: str) -> Optional[int]:
+    """Seconds from a t/start value: "90", "90s", "1m30s", "1h2m3s". None if invalid."""
+    match = _TIME_RE.fullmatch(value.strip())
+    if not match or not any(match.groups()):
+        return None
+    hours, minutes, seconds = (int(g) if g else 0 for g in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def _from_url(text: str) -> Optional[VideoRef]:
+    try:
+        parts = urlsplit(text if "//" in text else "https://" + text)
+        host = (parts.hostname or "").lower()
+    except ValueError:
+        return None
+    for prefix in _HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+
+    params = dict(parse_qsl(parts.query))
+    if parts.fragment.startswith("t="):
+        params.setdefault("t", parts.fragment[2:])
+
+    video_id = None
+    if host in _YOUTUBE_HOSTS:
+        if parts.path in ("/watch", "/watch/"):
+            video_id = params.get("v")
+        else:
+            for prefix in _PATH_PREFIXES:
+                if parts.path.startswith(prefix):
+                    video_id = parts.path[len(prefix):].split("/", 1)[0]
+                    break
+            if video_id is None and parts.path == "/playlist" and "list" in params:
+                raise VideoRefError("This is a playlist link; open one of its videos instead")
+    elif host == "youtu.be":
+        video_id = parts.path.lstrip("/").split("/", 1)[0]
+    if not video_id or not _ID_RE.fullmatch(video_id):
+        return None
+    return _make_ref(video_id, params)
+
+
+def _make_ref(video_id: str, params: dict) -> VideoRef:
+    playlist_id = params.get("list")
+    if playlist_id and not _PLAYLIST_RE.fullmatch(playlist_id):
+        playlist_id = None
+    start = params.get("t") or params.get("start")
+    return VideoRef(video_id, playlist_id, parse_timestamp(start) if start else None)
+
+
+def _fast_ref(text: str) -> Optional[VideoRef]:
+    """Canonical URL matched by one regex, parameters picked out by another."""
+    match = _FAST_RE.fullmatch(text)
+    if not match:
+        return None
+    video_id, rest = match.groups()
+    if not rest:
+        return VideoRef(video_id)
+    if "%" in rest:
+        return None
+    return _make_ref(video_id, dict(_PARAM_RE.findall(rest)))
+
+
+def parse_video_ref(text: str) -> VideoRef:
+    """Parse a YouTube link (or bare video ID) into a VideoRef."""
+    text = (text or "").strip()
+    if not text:
+        raise VideoRefError("Empty video link")
+
+    ref = _fast_ref(text)
+    if ref is not None:
+        return ref
+    if len(text) == 11 and _ID_RE.fullmatch(text):
+        return VideoRef(text)
+
+    if "%" in text:
+        text = unquote(text)
+        ref = _fast_ref(text)
+        if ref is not None:
+            return ref
+    ref = _from_url(text)
+    if ref is not None:
+        return ref
+
+    # Last resort: a YouTube URL somewhere inside the text
+    match = _SEARCH_RE.search(text)
+    if match:
+        return VideoRef(match.group(1))
+    raise VideoRefError("Invalid YouTube URL. Please provide a valid YouTube video link.")
+
+
+def parse_video_id(text: str) -> str:
+    return parse_video_ref(text).video_id
+
+
+class BulkResult(NamedTuple):
+    refs: list      # VideoRef per distinct video, in first-seen order
+    invalid: list   # (index, text, reason) for lines that didn't parse
+
+
+def parse_video_refs(texts: Iterable[str], unique: bool = True) -> BulkResult:
+    """Parse many links at once (e.g. a pasted list or a playlist export).
+
+    Blank lines are skipped. With `unique`, repeated videos keep their first reference.
+    """
+    refs = []
+    invalid = []
+    seen = set()
+    for index, text in enumerate(texts):
+        if not text or text.isspace():
+            continue
+        try:
+            ref = parse_video_ref(text)
+        except VideoRefError as e:
+            invalid.append((index, text, str(e)))
+            continue
+        if unique:
+            if ref.video_id in seen:
+                continue
+            seen.add(ref.video_id)
+        refs.append(ref)
+    return BulkResult(refs, invalid)
@@ -0,0 +1,81 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from egress import get_egress_pool
+
+# yt-dlp runs on a small dedicated pool: each worker thread keeps one
+# YoutubeDL instance per egress identity for its lifetime (instances aren't
+# thread-safe, and re-creating them per request repeats extractor and cookie
+# setup). The pool grows with the number of egress identities.
+YTDLP_WORKERS = int(os.getenv("YTDLP_WORKERS", "2"))  # per egress identity
+YTDLP_TIMEOUT = float(os.getenv("YTDLP_TIMEOUT", "60"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_local = threading.local()
+
+
+def _ydl_options(identity) -> dict:
+    """Options for subtitle discovery only: no formats, manifests or player JS."""
+    opts = {
+        "skip_download": True,
+        "quiet": True,
+        "no_warnings": True,
+        "ignore_no_formats_error": True,
+        "extractor_args": {"youtube": {"skip": ["dash", "hls"], "player_skip": ["js"]}},
+    }
+    if identity.cookie_file:
+        opts["cookiefile"] = identity.cookie_file
+    if identity.proxy:
+        opts["proxy"] = identity.proxy
+    return opts
+
+
+def _get_ydl(identity):
+    instances = getattr(_local, "ydl", None)
+    if instances is None:
+        instances = _local.ydl = {}
+    ydl = instances.get(identity.name)
+    if ydl is None:
+        import yt_dlp
+        ydl = instances[identity.name] = yt_dlp.YoutubeDL(_ydl_options(identity))
+    return ydl
+
+
+def _extract_subtitles(video_id: str, identity) -> dict:
+    # process=False returns the extractor's raw info: subtitle URLs are there,
+    # but format sorting/selection and subtitle post-processing are skipped.
+    info = _get_ydl(identity).extract_info(
+        f"https://www.youtube.com/watch?v={video_id}", download=False, process=False
+    ) or {}
+    return {
+        "subtitles": info.get("subtitles") or {},
+        "automatic_captions": info.get("automatic_captions") or {},
+    }
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = YTDLP_WORKERS * len(get_egress_pool())
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="yt-dlp")
+    return _executor
+
+
+def fetch_subtitle_tracks(video_id: str) -> dict:
+    """{"subtitles": {lang: [entries]}, "automatic_captions": {...}, "egress": identity} for a video.
+
+    Blocks the caller until a pooled extractor is free and the extraction
+    finishes or times out; a blocked identity hands over to the next one.
+    `egress` is the identity whose extraction succeeded (subtitle URLs should
+    be downloaded through it).
+    """
+    def attempt(identity):
+        tracks = _get_executor().submit(_extract_subtitles, video_id, identity).result(timeout=YTDLP_TIMEOUT)
+        return {**tracks, "egress": identity}
+
+    return get_egress_pool().call(attempt)